@@ -0,0 +1,217 @@
+"""
+algo_cli.py — Algo Builder en ligne de commande (cron, batch)
+Même chaîne que le bouton LANCER, sans Streamlit :
+charger_donnees -> filtres -> calculer_colonnes -> calculer_scores -> evaluate_<mode>
+
+    python -m algo_cli --du 2026-01-01 --au 2026-03-31 --algo "🏇 Trio Optimisé" --mode trio --sortie exports
+    python -m algo_cli --du 2026-02-14 --formule "IA_Gagnant * 50 + Borda" --pastille Haute
+
+KPIs en JSON (stdout ou kpis_*.json), pronostics par course en CSV (;) dans --sortie.
+Les traces des filtres partent sur stderr ; --profil y ajoute le temps et les lignes
+de chaque étape (repris dans le JSON, clé « profil »), --profil-memoire le pic mémoire.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+import db
+from engine import (
+    charger_donnees, preparer_dataframe,
+    calculer_colonnes, calculer_scores, colonnes_requises, CourseIndex
+)
+from formule import compiler_formule
+from utils_algo import FORMULES_PRESET
+from filtres_plan import PlanFiltres
+from filtres_course import predicats_base, predicats_course, FILTRES_COURSE_DEFAUT
+from filtres_cheval import predicats_cheval, FILTRES_CHEVAL_DEFAUT
+from filtres_avance import predicats_avance, FILTRES_AVANCE_DEFAUT
+from algo_eval import EVALUATEURS, PASTILLE_MAP
+from profilage import Profileur, mesurer
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+def plan_filtres(filtres_c, filtres_ch, filtres_av):
+    """Tous les filtres qui retirent des chevaux (hippo/disc/partants compris) en un plan."""
+    return PlanFiltres(predicats_base(filtres_c) + predicats_course(filtres_c)
+                       + predicats_cheval(filtres_ch) + predicats_avance(filtres_av))
+
+
+def preparer_algo(run_query, date_start, date_end, colonnes,
+                  filtres_c=None, filtres_ch=None, filtres_av=None, profileur=None):
+    """Chargement + filtres + calculer_colonnes -> (df, filtres_av complétés), df None si vide."""
+    filtres_c = {**FILTRES_COURSE_DEFAUT, **(filtres_c or {})}
+    filtres_ch = {**FILTRES_CHEVAL_DEFAUT, **(filtres_ch or {})}
+    filtres_av = {**FILTRES_AVANCE_DEFAUT, **(filtres_av or {})}
+
+    raw_data = mesurer(profileur, "charger_donnees", charger_donnees, run_query, date_start, date_end, colonnes,
+                       (filtres_c, filtres_ch, filtres_av))
+    if raw_data is None or raw_data.empty:
+        return None, filtres_av
+    df = mesurer(profileur, "preparer_dataframe", preparer_dataframe, raw_data, colonnes)
+    plan = plan_filtres(filtres_c, filtres_ch, filtres_av)
+    df = mesurer(profileur, "filtres", plan.appliquer, df)
+    if df.empty:
+        return None, filtres_av
+    return mesurer(profileur, "calculer_colonnes", calculer_colonnes, df), filtres_av
+
+
+def executer_algo(run_query, date_start, date_end, formule_raw, mode,
+                  filtres_c=None, filtres_ch=None, filtres_av=None, profileur=None):
+    """Chaîne complète de l'Algo Builder -> résultat evaluate_<mode>, None si aucune donnée."""
+    colonnes = colonnes_requises(compiler_formule(formule_raw).variables)
+    df, filtres_av = preparer_algo(run_query, date_start, date_end, colonnes,
+                                   filtres_c, filtres_ch, filtres_av, profileur)
+    if df is None:
+        return None
+    df = mesurer(profileur, "calculer_scores", calculer_scores, df, formule_raw)
+    index = mesurer(profileur, "CourseIndex", CourseIndex, df)
+    return mesurer(profileur, f"evaluate_{mode}", EVALUATEURS[mode], df, filtres_av, index)
+
+
+def resoudre_formule(algo, run_query):
+    """Nom d'algo -> formule : presets, table algos, puis algos.json."""
+    if algo in FORMULES_PRESET:
+        return FORMULES_PRESET[algo]
+    algos_db = run_query("SELECT formule FROM algos WHERE nom = ?", (algo,))
+    if algos_db is not None and not algos_db.empty:
+        return algos_db['formule'].iloc[0]
+    json_path = os.path.join(PROJECT_ROOT, "algos.json")
+    if os.path.exists(json_path):
+        with open(json_path, encoding='utf-8') as f:
+            data = json.load(f)
+        for nom, a in {**data.get('presets', {}), **data.get('custom', {})}.items():
+            if nom.strip() == algo.strip():
+                return a['formule'] if isinstance(a, dict) else a
+    return None
+
+
+# =====================================================
+# ARGUMENTS
+# =====================================================
+def _plage(defaut):
+    return lambda v: tuple(type(defaut[0])(x) for x in v)
+
+
+def construire_filtres(args):
+    """Arguments -> (filtres_c, filtres_ch, filtres_av) au format des render_filtres_*."""
+    filtres = [dict(FILTRES_COURSE_DEFAUT), dict(FILTRES_CHEVAL_DEFAUT), dict(FILTRES_AVANCE_DEFAUT)]
+    valeurs = {
+        'hippo': [h.strip().upper() for h in args.hippo] if args.hippo else None,
+        'disc': args.disc,
+        'partants': tuple(args.partants) if args.partants else None,
+        'pastille': [p for p in PASTILLE_MAP if PASTILLE_MAP[p] in args.pastille] if args.pastille else None,
+        'confiance_on': True if args.concordance is not None or args.unanime else None,
+        'seuil_conc': args.concordance,
+        'unanime': True if args.unanime else None,
+        'folie_cote_min': args.folie_cote,
+        'folie_taux_min': args.folie_taux,
+    }
+    if args.filtres:
+        valeurs.update(json.loads(args.filtres))
+    for cle, v in valeurs.items():
+        if v is None:
+            continue
+        cible = next((f for f in filtres if cle in f), None)
+        if cible is None:
+            raise SystemExit(f"Filtre inconnu : {cle}")
+        # Les plages sont comparées à des tuples par les prédicats de filtres
+        cible[cle] = _plage(cible[cle])(v) if isinstance(cible[cle], tuple) else v
+    return tuple(filtres)
+
+
+def ajouter_filtres(p):
+    """Options de filtre communes aux outils en ligne de commande."""
+    p.add_argument("--hippo", nargs="+", help="Hippodromes")
+    p.add_argument("--disc", nargs="+", help="Disciplines (A M P O)")
+    p.add_argument("--partants", nargs=2, type=int, metavar=("MIN", "MAX"))
+    p.add_argument("--pastille", nargs="+", choices=sorted(PASTILLE_MAP.values()))
+    p.add_argument("--concordance", type=int, help="Duo : concordance minimale")
+    p.add_argument("--unanime", action="store_true", help="Duo : unanimité F=IA=H")
+    p.add_argument("--folie-cote", type=int, help="Trio : cote minimale du coup de folie")
+    p.add_argument("--folie-taux", type=int, help="Trio : taux placé minimal du coup de folie")
+    p.add_argument("--filtres", help='Autres filtres en JSON, ex. \'{"distance": [2000, 2800], "d4": 2}\'')
+    p.add_argument("--db", default=db.DB_PATH, help="Base SQLite")
+
+
+def requeteur(db_path):
+    """run_query sur db_path, erreurs sur stderr."""
+    return lambda q, params=(), commit=False: db.run_query(
+        q, params, commit, on_error=lambda m: print(m, file=sys.stderr), db_path=db_path
+    )
+
+
+def parser():
+    p = argparse.ArgumentParser(prog="python -m algo_cli", description="Algo Builder sans Streamlit")
+    p.add_argument("--du", default=str(pd.Timestamp.now().date()), help="Date de début (AAAA-MM-JJ)")
+    p.add_argument("--au", help="Date de fin (défaut : --du)")
+    algo = p.add_mutually_exclusive_group(required=True)
+    algo.add_argument("--algo", help="Nom d'un preset ou d'un algo sauvegardé")
+    algo.add_argument("--formule", help="Formule Algo Builder")
+    p.add_argument("--mode", choices=sorted(EVALUATEURS), default="simple")
+    ajouter_filtres(p)
+    p.add_argument("--sortie", help="Dossier des exports (kpis JSON + CSV pronostics)")
+    p.add_argument("--profil", action="store_true", help="Temps et lignes par étape (stderr + JSON)")
+    p.add_argument("--profil-memoire", action="store_true", help="--profil + pic mémoire par étape (tracemalloc, lent)")
+    return p
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def main(argv=None):
+    args = parser().parse_args(argv)
+    date_start, date_end = args.du, args.au or args.du
+    run_query = requeteur(args.db)
+
+    formule_raw = args.formule or resoudre_formule(args.algo, run_query)
+    if not formule_raw:
+        print(f"Algo introuvable : {args.algo}", file=sys.stderr)
+        return 2
+    filtres_c, filtres_ch, filtres_av = construire_filtres(args)
+
+    prof = Profileur(memoire=args.profil_memoire) if args.profil or args.profil_memoire else None
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        res = executer_algo(run_query, date_start, date_end, formule_raw, args.mode,
+                            filtres_c, filtres_ch, filtres_av, prof)
+    duree = round(time.perf_counter() - t0, 3)
+    if prof:
+        prof.fin()
+        print("Profil par étape :\n" + prof.texte(), file=sys.stderr)
+    if res is None:
+        print("Aucune donnée après filtres.", file=sys.stderr)
+        return 1
+
+    sortie = {
+        'du': date_start, 'au': date_end, 'mode': args.mode,
+        'algo': args.algo, 'formule': formule_raw,
+        'courses_terminees': len(res['export']), 'courses_en_attente': len(res['attente']),
+        'duree_s': duree, 'kpis': res['kpis'],
+    }
+    if prof:
+        sortie['profil'] = prof.etapes
+    texte = json.dumps(sortie, ensure_ascii=False, indent=2, default=str)
+    if args.sortie:
+        os.makedirs(args.sortie, exist_ok=True)
+        suffixe = f"{args.mode}_{date_start}_{date_end}"
+        with open(os.path.join(args.sortie, f"kpis_{suffixe}.json"), 'w', encoding='utf-8') as f:
+            f.write(texte)
+        pd.DataFrame(res['export']).to_csv(os.path.join(args.sortie, f"pronos_{suffixe}.csv"), index=False, sep=';')
+        pd.DataFrame(res['attente']).to_csv(os.path.join(args.sortie, f"attente_{suffixe}.csv"), index=False, sep=';')
+        print(f"Exports écrits dans {args.sortie} ({duree}s)", file=sys.stderr)
+    else:
+        print(texte)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,552 @@
+"""
+algo_eval.py — Calcul pur des modes Algo Builder (sans Streamlit)
+Chaque evaluate_<mode>(df, params) renvoie un dict :
+  'courses' : détail par course terminée (affichage)
+  'kpis'    : compteurs / mises / gains agrégés
+  'export'  : lignes du CSV
+  'attente' : courses sans résultat
+Les render_* des algo_mode_* ne font plus qu'afficher ce résultat ;
+params reprend les clés de render_filtres_avance (pastille, confiance_on...).
+"""
+import math
+import numpy as np
+import pandas as pd
+from engine import CourseIndex
+from strategies import (
+    get_pastille_duo, confiance_par_course, courses_retenues, top4_borda_lot,
+    calculer_confiance_simple_lot, calculer_confiance_duo_lot,
+    calculer_confiance_trio_lot, calculer_confiance_borda4_lot,
+)
+
+
+PASTILLE_MAP = {"🟢 Haute": "Haute", "🟡 Moyenne": "Moyenne", "🔴 Basse": "Basse"}
+
+
+def _preparer(df, params, index, courses):
+    params = params or {}
+    if index is None:
+        index = CourseIndex(df)
+    if courses is None:
+        _, courses_avec, courses_sans = index.get_courses()
+    else:
+        courses_avec, courses_sans = courses
+    pastilles_actives = [PASTILLE_MAP[p] for p in (params.get('pastille') or []) if p in PASTILLE_MAP]
+    return params, index, courses_avec, courses_sans, pastilles_actives
+
+
+# =====================================================
+# LIGNES EN TABLEAUX
+# Les boucles par course lisent des listes alignées sur index.df
+# (une conversion par colonne) au lieu de filtrer un DataFrame par course.
+# Positions = positions dans index.df, comme CourseIndex.top_k.
+# =====================================================
+class _Lignes:
+    """Colonnes de index.df en listes Python + tops par course (positions, sans bourrage)."""
+
+    def __init__(self, index, colonnes):
+        self.index = index
+        self.debuts, self.fins = index.debuts.tolist(), index.fins.tolist()
+        n = len(index.df)
+        self.presentes = {c for c in colonnes if c in index.df.columns}
+        for c in colonnes:
+            valeurs = index.df[c].tolist() if c in self.presentes else [math.nan] * n
+            setattr(self, c.lower(), valeurs)
+
+    def bornes(self, cid):
+        r = self.index.rang(cid)
+        return r, self.debuts[r], self.fins[r]
+
+    def top(self, col, k, plus_petit=False):
+        """Positions des k premiers de chaque course ; colonne absente : k premières lignes (head)."""
+        if col in self.index.df.columns:
+            return [[p for p in ligne if p >= 0] for ligne in self.index.top_k(col, k, plus_petit).tolist()]
+        return [list(range(d, min(d + k, f))) for d, f in zip(self.debuts, self.fins)]
+
+    def nums(self, positions):
+        return [int(self.numero[p]) for p in positions]
+
+    def num(self, positions, i):
+        """= safe_num(lignes, i)."""
+        if len(positions) <= i or pd.isna(self.numero[positions[i]]):
+            return 0
+        return int(self.numero[positions[i]])
+
+    def cote_ou_0(self, p):
+        return float(self.cote[p]) if pd.notna(self.cote[p]) else 0
+
+    def places(self, d, f, jusqua):
+        """Numéros classés entre 1 et jusqua."""
+        return {int(self.numero[p]) for p in range(d, f) if 1 <= self.classement[p] <= jusqua}
+
+    def premieres(self, d, f):
+        """{Numéro: première position} de la course (= df_c[df_c['Numero'] == n].iloc[0])."""
+        pos = {}
+        for p in range(d, f):
+            pos.setdefault(self.numero[p], p)
+        return pos
+
+    def arrivee(self, d, f):
+        """Positions des chevaux classés, dans l'ordre du classement (tri de get_arrivee)."""
+        classes = [p for p in range(d, f) if self.classement[p] > 0]
+        ordre = np.argsort(np.array([self.classement[p] for p in classes]), kind='quicksort')
+        return [classes[i] for i in ordre.tolist()]
+
+    def texte_arrivee(self, d, f):
+        """= get_arrivee(df_c)."""
+        return " - ".join(str(int(self.numero[p])) for p in self.arrivee(d, f)) or None
+
+    def folie(self, d, f, exclus, method, cote_min, tp_min):
+        """Position du coup de folie (règles de get_folie_v2), None si aucun."""
+        if 'Cote' not in self.presentes:
+            return None
+        pool = [p for p in range(d, f) if self.numero[p] not in exclus and self.cote[p] > cote_min]
+        if 'Taux_Place' in self.presentes:
+            pool = [p for p in pool if self.taux_place[p] >= tp_min] or pool
+        if method == 'score' and 'SCORE' in self.presentes:
+            return _extreme(pool, self.score, plus_petit=False)
+        if 'ELO_Cheval_Rank' in self.presentes:
+            return _extreme(pool, self.elo_cheval_rank, plus_petit=True)
+        return pool[0] if pool else None
+
+
+def _extreme(positions, valeurs, plus_petit):
+    """Première position du max (min), NaN en dernier, comme nlargest(1) / nsmallest(1)."""
+    meilleure = None
+    for p in positions:
+        v = valeurs[p]
+        if v != v:
+            continue
+        if meilleure is None or (v < valeurs[meilleure] if plus_petit else v > valeurs[meilleure]):
+            meilleure = p
+    if meilleure is None and positions:
+        return positions[0]
+    return meilleure
+
+
+def _resume_pastilles(rows):
+    return {lbl: sum(1 for r in rows if r['Conf_Label'] == lbl) for lbl in ('Haute', 'Moyenne', 'Basse')}
+
+
+def _roi(gain, mise):
+    return round((gain - mise) / mise * 100, 1) if mise > 0 else 0
+
+
+# =====================================================
+# SIMPLE (1 cheval)
+# =====================================================
+def evaluate_simple(df, params=None, index=None, courses=None):
+    params, index, courses_avec, courses_sans, pastilles_actives = _preparer(df, params, index, courses)
+    table_conf = calculer_confiance_simple_lot(index)
+    conf = confiance_par_course(table_conf)
+    lg = _Lignes(index, ['Numero', 'classement', 'Cote', 'Cheval', 'Rapport_SG', 'Rapport_SP'])
+    sg = lg.rapport_sg if 'Rapport_SG' in lg.presentes else [0] * len(index.df)
+    sp = lg.rapport_sp if 'Rapport_SP' in lg.presentes else [0] * len(index.df)
+    top_f = lg.top('SCORE', 1)
+    top_ib = lg.top('IA_Borda_Rank', 1, plus_petit=True)
+    top_h = lg.top('HYBRIDE', 1)
+
+    st_f = {'g': 0, 't3': 0, 'n': 0, 'skip': 0, 'total': 0,
+            'mise_g': 0, 'gain_g': 0, 'mise_p': 0, 'gain_p': 0}
+    st_ib = {'g': 0, 't3': 0, 'n': 0, 'mise_g': 0, 'gain_g': 0, 'mise_p': 0, 'gain_p': 0}
+    st_hyb = {'g': 0, 't3': 0, 'n': 0, 'mise_g': 0, 'gain_g': 0, 'mise_p': 0, 'gain_p': 0}
+    rows_disp = []
+
+    for cid in courses_avec:
+        r, d, f = lg.bornes(cid)
+        top1 = lg.places(d, f, 1)
+        top3 = lg.places(d, f, 3)
+        g = next((p for p in range(d, f) if lg.classement[p] == 1), None)
+
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+
+        # Filtre pastille
+        if pastilles_actives and conf_label not in pastilles_actives:
+            st_f['total'] += 1
+            st_f['skip'] += 1
+            continue
+
+        nf = int(lg.numero[top_f[r][0]])
+        nib = int(lg.numero[top_ib[r][0]])
+        nh = int(lg.numero[top_h[r][0]])
+        premieres = lg.premieres(d, f)
+
+        st_f['total'] += 1
+
+        for n, sx in [(nf, st_f), (nib, st_ib), (nh, st_hyb)]:
+            sx['n'] += 1; sx['mise_g'] += 1; sx['mise_p'] += 1
+            p = premieres.get(n)
+            if n in top1:
+                sx['g'] += 1
+                if p is not None:
+                    rsg = float(sg[p] or 0)
+                    sx['gain_g'] += rsg if rsg > 0 else lg.cote_ou_0(p)
+            if n in top3:
+                sx['t3'] += 1
+                if p is not None:
+                    rsp = float(sp[p] or 0)
+                    sx['gain_p'] += rsp if rsp > 0 else round(lg.cote_ou_0(p) / 3, 1)
+
+        def v(n):
+            return "🥇" if n in top1 else ("✅" if n in top3 else "❌")
+
+        rsg_real = float(sg[g] or 0) if g is not None else 0
+        rsp_real = float(sp[g] or 0) if g is not None else 0
+        rows_disp.append({
+            'Course': cid, 'Conf': conf_icon, 'Conf_Label': conf_label,
+            'Formule': f"{v(nf)} N°{nf}", 'IA+B': f"{v(nib)} N°{nib}",
+            'Hybride': f"{v(nh)} N°{nh}",
+            'Gagnant': f"N°{int(lg.numero[g])} {lg.cheval[g]}" if g is not None else "?",
+            'Cote': round(float(lg.cote[g]), 1) if g is not None and pd.notna(lg.cote[g]) else 0,
+            'R.SG': rsg_real, 'R.SP': rsp_real
+        })
+
+    for sx in (st_f, st_ib, st_hyb):
+        sx['roi_g'] = _roi(sx['gain_g'], sx['mise_g'])
+        sx['roi_p'] = _roi(sx['gain_p'], sx['mise_p'])
+
+    attente = []
+    for cid in courses_retenues(table_conf, courses_sans, pastilles_actives):
+        r = index.rang(cid)
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+        bf, bib, bh = top_f[r][0], top_ib[r][0], top_h[r][0]
+        attente.append({
+            'Course': cid, 'Conf': conf_icon,
+            'Formule': f"N°{int(lg.numero[bf])} {lg.cheval[bf]}",
+            'IA+B': f"N°{int(lg.numero[bib])} {lg.cheval[bib]}",
+            'Hybride': f"N°{int(lg.numero[bh])} {lg.cheval[bh]}"
+        })
+
+    return {
+        'mode': 'simple', 'pastilles_actives': pastilles_actives,
+        'courses': rows_disp, 'export': rows_disp, 'attente': attente,
+        'kpis': {'formule': st_f, 'ia_borda': st_ib, 'hybride': st_hyb,
+                 'pastilles': _resume_pastilles(rows_disp)},
+    }
+
+
+# =====================================================
+# DUO (2 chevaux)
+# =====================================================
+def evaluate_duo(df, params=None, index=None, courses=None, get_pastille=get_pastille_duo):
+    params, index, courses_avec, courses_sans, pastilles_actives = _preparer(df, params, index, courses)
+    filtre_confiance_on = params.get('confiance_on', False)
+    seuil_concordance = params.get('seuil_conc', 0)
+    filtre_unanime = params.get('unanime', False)
+    table_conf = calculer_confiance_duo_lot(index, get_pastille=get_pastille)
+    conf = confiance_par_course(table_conf)
+
+    lg = _Lignes(index, ['Numero', 'classement'])
+    top_f = lg.top('SCORE', 2)
+    top_ib = lg.top('IA_Borda_Rank', 2, plus_petit=True)
+    top_h = lg.top('HYBRIDE', 2)
+
+    st_f = {'cg': 0, 'cp': 0, 'n': 0, 'skip': 0, 'total': 0}
+    st_ib = {'cg': 0, 'cp': 0, 'n': 0}
+    st_hyb = {'cg': 0, 'cp': 0, 'n': 0}
+    rows_export = []
+    details = []
+
+    for cid in courses_avec:
+        r, d, f = lg.bornes(cid)
+        top2 = lg.places(d, f, 2)
+        top3 = lg.places(d, f, 3)
+
+        duo_f, duo_ib, duo_hyb = top_f[r], top_ib[r], top_h[r]
+        sf = set(lg.nums(duo_f))
+        sib = set(lg.nums(duo_ib))
+        sh = set(lg.nums(duo_hyb))
+
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+
+        # --- Filtre concordance ---
+        if filtre_confiance_on:
+            course_jouee = unanime if filtre_unanime else concordance >= seuil_concordance
+        else:
+            course_jouee = True
+
+        # --- Filtre pastille ---
+        if pastilles_actives and conf_label not in pastilles_actives:
+            course_jouee = False
+
+        st_f['total'] += 1
+        cg_f = sf.issubset(top2)
+        cp_f = sf.issubset(top3)
+
+        if course_jouee:
+            st_f['n'] += 1
+            if cg_f:
+                st_f['cg'] += 1
+            if cp_f:
+                st_f['cp'] += 1
+        else:
+            st_f['skip'] += 1
+
+        for sx, nums in [(st_ib, sib), (st_hyb, sh)]:
+            sx['n'] += 1
+            if nums.issubset(top2):
+                sx['cg'] += 1
+            if nums.issubset(top3):
+                sx['cp'] += 1
+
+        arrivee = lg.texte_arrivee(d, f)
+        cg_ib = sib.issubset(top2)
+        cp_ib = sib.issubset(top3)
+        cg_h = sh.issubset(top2)
+        cp_h = sh.issubset(top3)
+
+        row = {
+            'Course': cid,
+            'Jouee': '✅' if course_jouee else '⏭️',
+            'Conf': conf_icon,
+            'Conf_Label': conf_label,
+            'Concordance': concordance,
+            'Unanime': '✅' if unanime else '',
+            'F_N1': lg.num(duo_f, 0),
+            'F_N2': lg.num(duo_f, 1),
+            'F_CG': "OUI" if cg_f else "NON",
+            'F_CP': "OUI" if cp_f else "NON",
+            'IB_CG': "OUI" if cg_ib else "NON",
+            'IB_CP': "OUI" if cp_ib else "NON",
+            'H_CG': "OUI" if cg_h else "NON",
+            'H_CP': "OUI" if cp_h else "NON",
+            'Arrivee': arrivee or ""
+        }
+        rows_export.append(row)
+        details.append({'row': row, 'top3': top3,
+                        'f': lg.nums(duo_f), 'ia': lg.nums(duo_ib), 'h': lg.nums(duo_hyb)})
+
+    attente = []
+    for cid in courses_sans:
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+        if filtre_confiance_on:
+            jouable = unanime if filtre_unanime else concordance >= seuil_concordance
+        else:
+            jouable = True
+        if pastilles_actives and conf_label not in pastilles_actives:
+            jouable = False
+        attente.append({
+            'Course': cid, 'Conf': conf_icon, 'Concordance': concordance, 'Unanime': unanime,
+            'Jouable': jouable,
+            'F': lg.nums(top_f[index.rang(cid)]), 'H': lg.nums(top_h[index.rang(cid)]),
+        })
+
+    return {
+        'mode': 'duo', 'pastilles_actives': pastilles_actives,
+        'courses': details, 'export': rows_export, 'attente': attente,
+        'kpis': {'formule': st_f, 'ia_borda': st_ib, 'hybride': st_hyb,
+                 'pastilles': _resume_pastilles(rows_export)},
+    }
+
+
+# =====================================================
+# TRIO + FOLIE (3+1)
+# =====================================================
+def _folie(lg, p, top3):
+    """(numéro, cote brute, numéro dans le top 3) du coup de folie, None si absent."""
+    if p is None:
+        return None
+    fn = int(lg.numero[p])
+    return fn, lg.cote_ou_0(p), fn in top3
+
+
+def evaluate_trio(df, params=None, index=None, courses=None):
+    params, index, courses_avec, courses_sans, pastilles_actives = _preparer(df, params, index, courses)
+    folie_cote_min = params.get('folie_cote_min', 10)
+    folie_taux_min = params.get('folie_taux_min', 20)
+    table_conf = calculer_confiance_trio_lot(index)
+    conf = confiance_par_course(table_conf)
+    lg = _Lignes(index, ['Numero', 'classement', 'Cote', 'Taux_Place', 'SCORE', 'ELO_Cheval_Rank'])
+    top_f = lg.top('SCORE', 3)
+    top_ib = lg.top('IA_Borda_Rank', 3, plus_petit=True)
+    top_h = lg.top('HYBRIDE', 3)
+
+    st_f = {'t3_2': 0, 't3_3': 0, 'folie_t3': 0, 'folie_n': 0, 'n': 0, 'skip': 0, 'total': 0,
+            'mise': 0, 'gains_g': 0, 'gains_p': 0}
+    st_ib = {'t3_2': 0, 't3_3': 0, 'folie_t3': 0, 'folie_n': 0, 'n': 0}
+    st_hyb = {'t3_2': 0, 't3_3': 0, 'folie_t3': 0, 'folie_n': 0, 'n': 0,
+              'mise': 0, 'gains_g': 0, 'gains_p': 0}
+    rows_export = []
+    details = []
+
+    for cid in courses_avec:
+        r, d, f = lg.bornes(cid)
+        top3 = lg.places(d, f, 3)
+        top1 = lg.places(d, f, 1)
+
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+
+        st_f['total'] += 1
+
+        # Filtre pastille
+        if pastilles_actives and conf_label not in pastilles_actives:
+            st_f['skip'] += 1
+            continue
+
+        trio_f = top_f[r]; nums_f = set(lg.nums(trio_f))
+        folie_f = lg.folie(d, f, nums_f, 'score', folie_cote_min, folie_taux_min)
+
+        trio_ib = top_ib[r]; nums_ib = set(lg.nums(trio_ib))
+        folie_ib = lg.folie(d, f, nums_ib, 'elo', folie_cote_min, folie_taux_min)
+
+        trio_hyb = top_h[r]; nums_hyb = set(lg.nums(trio_hyb))
+        folie_hyb = lg.folie(d, f, nums_hyb, 'score', folie_cote_min, folie_taux_min)
+
+        for td, sx, fp in [(trio_f, st_f, folie_f), (trio_ib, st_ib, folie_ib), (trio_hyb, st_hyb, folie_hyb)]:
+            nums = set(lg.nums(td))
+            sx['n'] += 1; hit = len(nums & top3)
+            if hit >= 2: sx['t3_2'] += 1
+            if hit == 3: sx['t3_3'] += 1
+            if fp is not None:
+                sx['folie_n'] += 1
+                if int(lg.numero[fp]) in top3: sx['folie_t3'] += 1
+
+        for td, sx in [(trio_f, st_f), (trio_hyb, st_hyb)]:
+            if len(td):
+                b1n = lg.num(td, 0)
+                b1c = lg.cote_ou_0(td[0])
+                sx['mise'] += 2
+                if b1n in top1 and b1c > 0: sx['gains_g'] += 2 * b1c
+                for b in td:
+                    sx['mise'] += 1
+                    bc = lg.cote_ou_0(b)
+                    if int(lg.numero[b]) in top3 and bc > 0: sx['gains_p'] += bc / 3
+
+        hit_f = len(nums_f & top3); hit_h = len(nums_hyb & top3); arrivee = lg.texte_arrivee(d, f)
+
+        def fi(fp):
+            if fp is None: return 0, 0, ""
+            fn = int(lg.numero[fp])
+            fc = round(float(lg.cote[fp]), 1) if pd.notna(lg.cote[fp]) else 0
+            return fn, fc, "OUI" if fn in top3 else "NON"
+
+        ff_n, ff_c, ff_ok = fi(folie_f); fh_n, fh_c, fh_ok = fi(folie_hyb)
+        row = {
+            'Course': cid, 'Conf': conf_icon, 'Conf_Label': conf_label,
+            'Concordance': concordance,
+            'F_N1': lg.num(trio_f, 0), 'F_N2': lg.num(trio_f, 1), 'F_N3': lg.num(trio_f, 2),
+            'F_Hit': f"{hit_f}/3", 'F_Folie': ff_n, 'F_Folie_C': ff_c, 'F_Folie_OK': ff_ok,
+            'H_Hit': f"{hit_h}/3", 'H_Folie': fh_n, 'H_Folie_C': fh_c, 'H_Folie_OK': fh_ok,
+            'Arrivee': arrivee or ""
+        }
+        rows_export.append(row)
+        details.append({'row': row, 'top3': top3,
+                        'f': lg.nums(trio_f), 'h': lg.nums(trio_hyb),
+                        'folie_f': _folie(lg, folie_f, top3), 'folie_h': _folie(lg, folie_hyb, top3)})
+
+    for sx in (st_f, st_hyb):
+        sx['gains'] = sx['gains_g'] + sx['gains_p']
+        sx['roi'] = _roi(sx['gains'], sx['mise'])
+
+    attente = []
+    for cid in courses_retenues(table_conf, courses_sans, pastilles_actives):
+        r, d, f = lg.bornes(cid)
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+        trio_f, trio_hyb = top_f[r], top_h[r]
+        folie_f = lg.folie(d, f, set(lg.nums(trio_f)), 'score', folie_cote_min, folie_taux_min)
+        attente.append({
+            'Course': cid, 'Conf': conf_icon, 'Concordance': concordance,
+            'F': lg.nums(trio_f), 'H': lg.nums(trio_hyb),
+            'Folie': (int(lg.numero[folie_f]), round(float(lg.cote[folie_f]), 1)) if folie_f is not None else None,
+        })
+
+    return {
+        'mode': 'trio', 'pastilles_actives': pastilles_actives,
+        'courses': details, 'export': rows_export, 'attente': attente,
+        'kpis': {'formule': st_f, 'ia_borda': st_ib, 'hybride': st_hyb,
+                 'pastilles': _resume_pastilles(rows_export)},
+    }
+
+
+# =====================================================
+# BORDA 4 CHEVAUX
+# =====================================================
+def evaluate_borda4(df, params=None, index=None, courses=None):
+    params, index, courses_avec, courses_sans, pastilles_actives = _preparer(df, params, index, courses)
+    table_conf = calculer_confiance_borda4_lot(index)
+    conf = confiance_par_course(table_conf)
+    lg = _Lignes(index, ['Numero', 'classement'])
+    top4, sans_borda = top4_borda_lot(index)
+    top4, sans_borda = top4.tolist(), sans_borda.tolist()
+
+    stats = {'couple_gagnant': 0, 'couple_place': 0, 'trio_ordre': 0,
+             'trio_desordre': 0, 'total': 0, 'skip': 0, 'played': 0}
+    rows_export = []
+
+    for cid in courses_avec:
+        r, d, f = lg.bornes(cid)
+        if sans_borda[r]:
+            continue
+
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+
+        stats['total'] += 1
+
+        # Filtre pastille
+        if pastilles_actives and conf_label not in pastilles_actives:
+            stats['skip'] += 1
+            continue
+
+        nums_borda = [n for n in top4[r] if n >= 0]
+        classes = lg.arrivee(d, f)
+        if len(classes) < 3:
+            continue
+
+        arrivee = lg.nums(classes[:3])
+        top3_set = set(arrivee)
+        stats['played'] += 1
+        set_borda_4 = set(nums_borda[:4])
+        top2_arrivee = set(arrivee[:2])
+
+        couple_gagnant = len(set_borda_4 & top2_arrivee) >= 2
+        couple_place = len(set_borda_4 & top3_set) >= 2
+
+        if couple_gagnant:
+            stats['couple_gagnant'] += 1; stats['couple_place'] += 1; couple_ok = "🥇 Gagnant"
+        elif couple_place:
+            stats['couple_place'] += 1; couple_ok = "✅ Placé"
+        else:
+            couple_ok = "❌"
+
+        trio_ordre = len(nums_borda) >= 3 and nums_borda[:3] == arrivee[:3]
+        trio_desordre = len(set_borda_4 & top3_set) >= 3
+
+        if trio_ordre:
+            stats['trio_ordre'] += 1; stats['trio_desordre'] += 1; trio_ok = "🥇 Ordre"
+        elif trio_desordre:
+            stats['trio_desordre'] += 1; trio_ok = "✅ Désordre"
+        else:
+            trio_ok = "❌"
+
+        rows_export.append({
+            'Course': cid, 'Conf': conf_icon, 'Conf_Label': conf_label,
+            'Concordance': concordance,
+            'Borda_1': nums_borda[0] if len(nums_borda) > 0 else 0,
+            'Borda_2': nums_borda[1] if len(nums_borda) > 1 else 0,
+            'Borda_3': nums_borda[2] if len(nums_borda) > 2 else 0,
+            'Borda_4': nums_borda[3] if len(nums_borda) > 3 else 0,
+            'Couplé': couple_ok, 'Trio': trio_ok,
+            'Arrivée': " - ".join(map(str, arrivee))
+        })
+
+    attente = []
+    for cid in courses_retenues(table_conf, courses_sans, pastilles_actives):
+        r = index.rang(cid)
+        concordance, unanime, conf_icon, conf_label = conf[cid]
+        if sans_borda[r]:
+            continue
+        attente.append({'Course': cid, 'Conf': conf_icon, 'Concordance': concordance,
+                        'Borda': [n for n in top4[r] if n >= 0]})
+
+    return {
+        'mode': 'borda4', 'pastilles_actives': pastilles_actives,
+        'courses': rows_export, 'export': rows_export, 'attente': attente,
+        'kpis': {'borda': stats, 'pastilles': _resume_pastilles(rows_export)},
+    }
+
+
+EVALUATEURS = {
+    'simple': evaluate_simple,
+    'duo': evaluate_duo,
+    'trio': evaluate_trio,
+    'borda4': evaluate_borda4,
+}
@@ -6,6 +6,7 @@ import json
 import os
 from datetime import datetime
 from utils_algo import FORMULES_PRESET
+from formule import variables_formule
 
 
 # Map des variables utilisables dans les formules
@@ -81,8 +82,8 @@ def generer_readme(run_query, project_root):
         lines.append(formule)
         lines.append("```")
         lines.append("")
-        # Extraire les variables utilisées
-        vars_used = [v for v in VARIABLES_DOC if v in formule]
+        # Variables réellement lues par la formule
+        vars_used = variables_formule(formule)
         if vars_used:
             lines.append("**Variables :** " + ", ".join(f"`{v}`" for v in vars_used))
             lines.append("")
@@ -100,7 +101,7 @@ def generer_readme(run_query, project_root):
             lines.append(row['formule'])
             lines.append("```")
             lines.append("")
-            vars_used = [v for v in VARIABLES_DOC if v in row['formule']]
+            vars_used = variables_formule(row['formule'])
             if vars_used:
                 lines.append("**Variables :** " + ", ".join(f"`{v}`" for v in vars_used))
                 lines.append("")
@@ -163,7 +164,7 @@ def generer_json(run_query, project_root):
         for _, row in algos_db.iterrows():
             data["custom"][row['nom']] = {
                 "formule": row['formule'],
-                "variables": [v for v in VARIABLES_DOC if v in row['formule']],
+                "variables": variables_formule(row['formule']),
             }
     
     json_path = os.path.join(project_root, "algos.json")
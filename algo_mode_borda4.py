@@ -3,85 +3,19 @@ algo_mode_borda4.py — Mode Borda 4 chevaux avec pastille concordance
 """
 import streamlit as st
 import pandas as pd
-from strategies import calculer_confiance_borda4, get_pastille_borda4
-from utils_algo import get_arrivee
+from algo_eval import evaluate_borda4
+from cache_donnees import evaluer
 
 
 def render_borda4(df, courses_avec, courses_sans, date_start, date_end,
-                  filtre_pastille=None):
+                  filtre_pastille=None, index=None, profileur=None, cle_cache=None):
 
-    if filtre_pastille is None:
-        filtre_pastille = []
-    pastille_map = {"🟢 Haute": "Haute", "🟡 Moyenne": "Moyenne", "🔴 Basse": "Basse"}
-    pastilles_actives = [pastille_map[p] for p in filtre_pastille if p in pastille_map]
+    res = evaluer(cle_cache, "evaluate_borda4", evaluate_borda4, df, {'pastille': filtre_pastille}, index, (courses_avec, courses_sans), profileur)
+    pastilles_actives = res['pastilles_actives']
+    stats = res['kpis']['borda']
+    rows_export = res['courses']
 
     if courses_avec:
-        stats = {'couple_gagnant': 0, 'couple_place': 0, 'trio_ordre': 0,
-                 'trio_desordre': 0, 'total': 0, 'skip': 0, 'played': 0}
-        rows_export = []
-
-        for cid in courses_avec:
-            df_c = df[df['ID_C'] == cid]
-            if 'Borda' in df_c.columns and df_c['Borda'].sum() > 0:
-                top4_borda = df_c.nlargest(4, 'Borda')
-            elif 'Borda_Rank' in df_c.columns:
-                top4_borda = df_c.nsmallest(4, 'Borda_Rank')
-            else:
-                continue
-
-            concordance, detail = calculer_confiance_borda4(df_c, 'SCORE')
-            unanime = detail.get('unanime', False)
-            conf_icon, conf_label = get_pastille_borda4(concordance, unanime)
-
-            stats['total'] += 1
-
-            # Filtre pastille
-            if pastilles_actives and conf_label not in pastilles_actives:
-                stats['skip'] += 1
-                continue
-
-            nums_borda = [int(r['Numero']) for _, r in top4_borda.iterrows()]
-            arrivee_df = df_c[df_c['classement'] > 0].sort_values('classement')
-            if len(arrivee_df) < 3:
-                continue
-
-            arrivee = [int(r['Numero']) for _, r in arrivee_df.head(3).iterrows()]
-            top3_set = set(arrivee)
-            stats['played'] += 1
-            set_borda_4 = set(nums_borda[:4])
-            top2_arrivee = set(arrivee[:2])
-
-            couple_gagnant = len(set_borda_4 & top2_arrivee) >= 2
-            couple_place = len(set_borda_4 & top3_set) >= 2
-
-            if couple_gagnant:
-                stats['couple_gagnant'] += 1; stats['couple_place'] += 1; couple_ok = "🥇 Gagnant"
-            elif couple_place:
-                stats['couple_place'] += 1; couple_ok = "✅ Placé"
-            else:
-                couple_ok = "❌"
-
-            trio_ordre = len(nums_borda) >= 3 and nums_borda[:3] == arrivee[:3]
-            trio_desordre = len(set_borda_4 & top3_set) >= 3
-
-            if trio_ordre:
-                stats['trio_ordre'] += 1; stats['trio_desordre'] += 1; trio_ok = "🥇 Ordre"
-            elif trio_desordre:
-                stats['trio_desordre'] += 1; trio_ok = "✅ Désordre"
-            else:
-                trio_ok = "❌"
-
-            rows_export.append({
-                'Course': cid, 'Conf': conf_icon, 'Conf_Label': conf_label,
-                'Concordance': concordance,
-                'Borda_1': nums_borda[0] if len(nums_borda) > 0 else 0,
-                'Borda_2': nums_borda[1] if len(nums_borda) > 1 else 0,
-                'Borda_3': nums_borda[2] if len(nums_borda) > 2 else 0,
-                'Borda_4': nums_borda[3] if len(nums_borda) > 3 else 0,
-                'Couplé': couple_ok, 'Trio': trio_ok,
-                'Arrivée': " - ".join(map(str, arrivee))
-            })
-
         st.markdown("### 📊 Performance Borda 4 chevaux")
 
         if pastilles_actives:
@@ -96,10 +30,8 @@ def render_borda4(df, courses_avec, courses_sans, date_start, date_end,
             k4.metric("✅ Trio Désordre", f"{stats['trio_desordre']}/{t}", p(stats['trio_desordre']))
 
         # Résumé pastilles
-        nb_v = sum(1 for r in rows_export if r['Conf_Label'] == 'Haute')
-        nb_o = sum(1 for r in rows_export if r['Conf_Label'] == 'Moyenne')
-        nb_r = sum(1 for r in rows_export if r['Conf_Label'] == 'Basse')
-        st.caption(f"🟢 {nb_v} haute | 🟡 {nb_o} moyenne | 🔴 {nb_r} basse")
+        nb = res['kpis']['pastilles']
+        st.caption(f"🟢 {nb['Haute']} haute | 🟡 {nb['Moyenne']} moyenne | 🔴 {nb['Basse']} basse")
 
         st.divider()
         st.markdown(f"### 🏁 Détail ({len(rows_export)})")
@@ -122,22 +54,11 @@ def render_borda4(df, courses_avec, courses_sans, date_start, date_end,
 
     if courses_sans:
         st.markdown(f"### ⏳ En attente ({len(courses_sans)})")
-        for cid in courses_sans:
-            df_c = df[df['ID_C'] == cid]
-            concordance, detail = calculer_confiance_borda4(df_c, 'SCORE')
-            conf_icon, conf_label = get_pastille_borda4(concordance, detail.get('unanime', False))
-            if pastilles_actives and conf_label not in pastilles_actives:
-                continue
-            if 'Borda' in df_c.columns and df_c['Borda'].sum() > 0:
-                top4 = df_c.nlargest(4, 'Borda')
-            elif 'Borda_Rank' in df_c.columns:
-                top4 = df_c.nsmallest(4, 'Borda_Rank')
-            else:
-                continue
+        for a in res['attente']:
             with st.container(border=True):
-                st.write(f"**{conf_icon} {cid}** — Conc:{concordance}")
-                st.success(f"**🔷 Borda:** {' - '.join(str(int(r['Numero'])) for _, r in top4.iterrows())}")
+                st.write(f"**{a['Conf']} {a['Course']}** — Conc:{a['Concordance']}")
+                st.success(f"**🔷 Borda:** {' - '.join(map(str, a['Borda']))}")
 
     if courses_avec:
-        st.download_button("📥 CSV Borda 4", pd.DataFrame(rows_export).to_csv(index=False, sep=';').encode('utf-8'),
-                           f"export_borda4_{date_start}_{date_end}.csv", "text/csv", use_container_width=True)
\ No newline at end of file
+        st.download_button("📥 CSV Borda 4", pd.DataFrame(res['export']).to_csv(index=False, sep=';').encode('utf-8'),
+                           f"export_borda4_{date_start}_{date_end}.csv", "text/csv", use_container_width=True)
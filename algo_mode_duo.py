@@ -3,9 +3,9 @@ algo_mode_duo.py — Mode Duo (2 chevaux) avec filtre concordance + pastille
 """
 import streamlit as st
 import pandas as pd
-from engine import safe_num
-from strategies import calculer_confiance_duo
-from utils_algo import colored_nums, nums_str, get_arrivee
+from algo_eval import evaluate_duo
+from cache_donnees import evaluer
+from utils_algo import colored_nums
 
 
 def get_pastille(concordance, unanime):
@@ -20,95 +20,15 @@ def get_pastille(concordance, unanime):
 
 def render_duo(df, courses_avec, courses_sans, date_start, date_end,
                filtre_confiance_on, seuil_concordance, filtre_unanime,
-               filtre_pastille=None):
+               filtre_pastille=None, index=None, profileur=None, cle_cache=None):
 
-    if filtre_pastille is None:
-        filtre_pastille = []
-
-    # Map pastille labels pour filtrage
-    pastille_map = {
-        "🟢 Haute": "Haute",
-        "🟡 Moyenne": "Moyenne",
-        "🔴 Basse": "Basse",
-    }
-    pastilles_actives = [pastille_map[p] for p in filtre_pastille if p in pastille_map]
+    params = {'confiance_on': filtre_confiance_on, 'seuil_conc': seuil_concordance,
+              'unanime': filtre_unanime, 'pastille': filtre_pastille}
+    res = evaluer(cle_cache, "evaluate_duo", evaluate_duo, df, params, index, (courses_avec, courses_sans), profileur, get_pastille=get_pastille)
+    pastilles_actives = res['pastilles_actives']
+    st_f, st_ib, st_hyb = res['kpis']['formule'], res['kpis']['ia_borda'], res['kpis']['hybride']
 
     if courses_avec:
-        st_f = {'cg': 0, 'cp': 0, 'n': 0, 'skip': 0, 'total': 0}
-        st_ib = {'cg': 0, 'cp': 0, 'n': 0}
-        st_hyb = {'cg': 0, 'cp': 0, 'n': 0}
-        rows_export = []
-
-        for cid in courses_avec:
-            df_c = df[df['ID_C'] == cid]
-            top2 = set(df_c[df_c['classement'].between(1, 2)]['Numero'].astype(int).tolist())
-            top3 = set(df_c[df_c['classement'].between(1, 3)]['Numero'].astype(int).tolist())
-
-            duo_f = df_c.nlargest(2, 'SCORE')
-            sf = set(duo_f['Numero'].astype(int).tolist())
-            duo_ib = df_c.nsmallest(2, 'IA_Borda_Rank') if 'IA_Borda_Rank' in df_c.columns else df_c.head(2)
-            sib = set(duo_ib['Numero'].astype(int).tolist())
-            duo_hyb = df_c.nlargest(2, 'HYBRIDE')
-            sh = set(duo_hyb['Numero'].astype(int).tolist())
-
-            concordance, detail = calculer_confiance_duo(df_c, 'SCORE')
-            unanime = detail.get('unanime', False)
-            conf_icon, conf_label = get_pastille(concordance, unanime)
-
-            # --- Filtre concordance ---
-            if filtre_confiance_on:
-                course_jouee = unanime if filtre_unanime else concordance >= seuil_concordance
-            else:
-                course_jouee = True
-
-            # --- Filtre pastille ---
-            if pastilles_actives and conf_label not in pastilles_actives:
-                course_jouee = False
-
-            st_f['total'] += 1
-            cg_f = sf.issubset(top2)
-            cp_f = sf.issubset(top3)
-
-            if course_jouee:
-                st_f['n'] += 1
-                if cg_f:
-                    st_f['cg'] += 1
-                if cp_f:
-                    st_f['cp'] += 1
-            else:
-                st_f['skip'] += 1
-
-            for sx, nums in [(st_ib, sib), (st_hyb, sh)]:
-                sx['n'] += 1
-                if nums.issubset(top2):
-                    sx['cg'] += 1
-                if nums.issubset(top3):
-                    sx['cp'] += 1
-
-            arrivee = get_arrivee(df_c)
-            cg_ib = sib.issubset(top2)
-            cp_ib = sib.issubset(top3)
-            cg_h = sh.issubset(top2)
-            cp_h = sh.issubset(top3)
-
-            rows_export.append({
-                'Course': cid,
-                'Jouee': '✅' if course_jouee else '⏭️',
-                'Conf': conf_icon,
-                'Conf_Label': conf_label,
-                'Concordance': concordance,
-                'Unanime': '✅' if unanime else '',
-                'F_N1': safe_num(duo_f, 0),
-                'F_N2': safe_num(duo_f, 1),
-                'F_CG': "OUI" if cg_f else "NON",
-                'F_CP': "OUI" if cp_f else "NON",
-                'IB_CG': "OUI" if cg_ib else "NON",
-                'IB_CP': "OUI" if cp_ib else "NON",
-                'H_CG': "OUI" if cg_h else "NON",
-                'H_CP': "OUI" if cp_h else "NON",
-                'Arrivee': arrivee or ""
-            })
-
         # --- STATS ---
         st.markdown("### 📊 Duo — Couplé Gagnant / Placé")
 
@@ -141,25 +61,19 @@ def render_duo(df, courses_avec, courses_sans, date_start, date_end,
         st.divider()
 
         # --- Résumé pastilles ---
-        nb_vert = sum(1 for r in rows_export if r['Conf_Label'] == 'Haute')
-        nb_orange = sum(1 for r in rows_export if r['Conf_Label'] == 'Moyenne')
-        nb_rouge = sum(1 for r in rows_export if r['Conf_Label'] == 'Basse')
+        nb = res['kpis']['pastilles']
         st.caption(
-            f"🟢 {nb_vert} haute | 🟡 {nb_orange} moyenne | 🔴 {nb_rouge} basse"
+            f"🟢 {nb['Haute']} haute | 🟡 {nb['Moyenne']} moyenne | 🔴 {nb['Basse']} basse"
         )
 
         # --- COURSES JOUÉES ---
-        courses_jouees = [r for r in rows_export if r['Jouee'] == '✅']
-        courses_skippees = [r for r in rows_export if r['Jouee'] == '⏭️']
+        courses_jouees = [d for d in res['courses'] if d['row']['Jouee'] == '✅']
+        courses_skippees = [d for d in res['courses'] if d['row']['Jouee'] == '⏭️']
 
         st.markdown(f"### 🏁 Courses jouées ({len(courses_jouees)})")
-        for row in courses_jouees:
+        for d in courses_jouees:
+            row, top3 = d['row'], d['top3']
             cid = row['Course']
-            df_c = df[df['ID_C'] == cid]
-            top3 = set(df_c[df_c['classement'].between(1, 3)]['Numero'].astype(int).tolist())
-            duo_f = df_c.nlargest(2, 'SCORE')
-            duo_ib = df_c.nsmallest(2, 'IA_Borda_Rank') if 'IA_Borda_Rank' in df_c.columns else df_c.head(2)
-            duo_hyb = df_c.nlargest(2, 'HYBRIDE')
             cg_f = row['F_CG'] == "OUI"
             cp_f = row['F_CP'] == "OUI"
             icon = "🥇" if cg_f else ("✅" if cp_f else "❌")
@@ -171,72 +85,51 @@ def render_duo(df, courses_avec, courses_sans, date_start, date_end,
                 )
                 c1, c2, c3, c4 = st.columns([3, 3, 3, 3])
                 with c1:
-                    nlist = [int(r['Numero']) for _, r in duo_f.iterrows()]
                     v = "🥇CG" if cg_f else ("✅CP" if cp_f else "❌")
-                    st.success(f"**🎯 F** {v}\n{colored_nums(nlist, top3)}")
+                    st.success(f"**🎯 F** {v}\n{colored_nums(d['f'], top3)}")
                 with c2:
-                    nlist = [int(r['Numero']) for _, r in duo_ib.iterrows()]
                     v = "🥇CG" if row['IB_CG'] == "OUI" else ("✅CP" if row['IB_CP'] == "OUI" else "❌")
-                    st.warning(f"**🤖 IA** {v}\n{colored_nums(nlist, top3)}")
+                    st.warning(f"**🤖 IA** {v}\n{colored_nums(d['ia'], top3)}")
                 with c3:
-                    nlist = [int(r['Numero']) for _, r in duo_hyb.iterrows()]
                     v = "🥇CG" if row['H_CG'] == "OUI" else ("✅CP" if row['H_CP'] == "OUI" else "❌")
-                    st.info(f"**⚡ H** {v}\n{colored_nums(nlist, top3)}")
+                    st.info(f"**⚡ H** {v}\n{colored_nums(d['h'], top3)}")
                 with c4:
                     st.write(f"**🏁**\n### {row['Arrivee']}")
 
         # --- COURSES SKIPPÉES ---
         if courses_skippees and (filtre_confiance_on or pastilles_actives):
             with st.expander(f"⏭️ Courses skippées ({len(courses_skippees)})", expanded=False):
-                for row in courses_skippees:
-                    cid = row['Course']
-                    df_c = df[df['ID_C'] == cid]
-                    top3 = set(df_c[df_c['classement'].between(1, 3)]['Numero'].astype(int).tolist())
-                    duo_f = df_c.nlargest(2, 'SCORE')
+                for d in courses_skippees:
+                    row = d['row']
                     cg_f = row['F_CG'] == "OUI"
                     cp_f = row['F_CP'] == "OUI"
                     icon = "🥇" if cg_f else ("✅" if cp_f else "❌")
-                    nlist = [int(r['Numero']) for _, r in duo_f.iterrows()]
                     st.caption(
-                        f"{icon} {row['Conf']} {cid} — "
-                        f"F: {colored_nums(nlist, top3)} — "
+                        f"{icon} {row['Conf']} {row['Course']} — "
+                        f"F: {colored_nums(d['f'], d['top3'])} — "
                         f"Conc: {row['Concordance']} — {row['Arrivee']}"
                     )
 
     # --- EN ATTENTE ---
     if courses_sans:
         st.markdown(f"### ⏳ En attente ({len(courses_sans)})")
-        for cid in courses_sans:
-            df_c = df[df['ID_C'] == cid]
-            duo_f = df_c.nlargest(2, 'SCORE')
-            duo_hyb = df_c.nlargest(2, 'HYBRIDE')
-            concordance, detail = calculer_confiance_duo(df_c, 'SCORE')
-            unanime = detail.get('unanime', False)
-            conf_icon, conf_label = get_pastille(concordance, unanime)
-
-            if filtre_confiance_on:
-                jouable = unanime if filtre_unanime else concordance >= seuil_concordance
-            else:
-                jouable = True
-            if pastilles_actives and conf_label not in pastilles_actives:
-                jouable = False
-
+        for a in res['attente']:
             with st.container(border=True):
-                status = "🎯 JOUER" if jouable else "⏭️ SKIP"
+                status = "🎯 JOUER" if a['Jouable'] else "⏭️ SKIP"
                 st.write(
-                    f"**{conf_icon} {cid}** — {status} — "
-                    f"Conc: {concordance} {'✅ Unanime' if unanime else ''}"
+                    f"**{a['Conf']} {a['Course']}** — {status} — "
+                    f"Conc: {a['Concordance']} {'✅ Unanime' if a['Unanime'] else ''}"
                 )
                 c1, c2 = st.columns(2)
                 with c1:
-                    st.success(f"**🎯 F** {nums_str(duo_f)}")
+                    st.success(f"**🎯 F** {' - '.join(map(str, a['F']))}")
                 with c2:
-                    st.info(f"**⚡ H** {nums_str(duo_hyb)}")
+                    st.info(f"**⚡ H** {' - '.join(map(str, a['H']))}")
 
     if courses_avec:
         st.download_button(
             "📥 CSV Duo",
-            pd.DataFrame(rows_export).to_csv(index=False, sep=';').encode('utf-8'),
+            pd.DataFrame(res['export']).to_csv(index=False, sep=';').encode('utf-8'),
             f"export_duo_{date_start}_{date_end}.csv",
             "text/csv", use_container_width=True
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,408 @@
+"""
+algo_sweep.py — Balayage des coefficients d'une formule Algo Builder
+La formule est découpée en termes additifs (coef * expression) ; chaque
+expression est évaluée une seule fois sur les données filtrées, ce qui donne
+une matrice de features X (chevaux x termes). Un jeu de coefficients w coûte
+alors un produit X @ w suivi d'un top-k par course, sans reconstruire de
+DataFrame. Les candidats sont répartis sur un pool de processus.
+
+    python -m algo_sweep --du 2026-01-01 --au 2026-03-31 --algo "📊 F11 Polyvalente" --critere trio_roi
+    python -m algo_sweep --du 2026-01-01 --au 2026-03-31 --formule "IA_Trio * 18 + Borda * 2.5" --facteurs 0 1 2 3
+
+KPIs repris de la colonne « Formule » des modes Simple / Duo / Trio, toutes
+courses terminées jouées (ni pastille, ni concordance, ni coup de folie).
+Un terme en erreur (division par zéro...) vaut 0 pour ce terme seulement,
+alors que eval_formula met toute la formule à 0 : les formules du classement
+se revérifient avec algo_cli.
+"""
+import argparse
+import ast
+import contextlib
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import CourseIndex, colonnes_requises
+from formule import compiler_formule, reecrire_formule, evaluer_formules
+from algo_eval import _roi
+from algo_cli import preparer_algo, resoudre_formule, construire_filtres, ajouter_filtres, requeteur
+
+
+KPIS = (
+    'simple_g', 'simple_t3', 'simple_roi_g', 'simple_roi_p',
+    'duo_cg', 'duo_cp',
+    'trio_t3_2', 'trio_t3_3', 'trio_roi',
+)
+
+FACTEURS_DEFAUT = (0, 0.5, 1, 1.5, 2)
+
+
+# =====================================================
+# DÉCOMPOSITION DE LA FORMULE
+# =====================================================
+def _nombre(node):
+    """Valeur d'une constante numérique (éventuellement signée), sinon None."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        v = _nombre(node.operand)
+        return None if v is None else (-v if isinstance(node.op, ast.USub) else v)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return float(node.value)
+    return None
+
+
+def _texte(node):
+    """Source d'un nœud, parenthésée si elle n'est pas atomique."""
+    src = ast.unparse(node)
+    return src if isinstance(node, (ast.Name, ast.Constant, ast.Call)) else f"({src})"
+
+
+def _coefficient(node):
+    """Terme -> (coef, expression évaluée, gabarit d'affichage)."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+        c = _nombre(node.right)
+        if c is not None:
+            return c, _texte(node.left), _texte(node.left) + " * {}"
+        c = _nombre(node.left)
+        if c is not None:
+            return c, _texte(node.right), "{} * " + _texte(node.right)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+        c = _nombre(node.left)
+        if c is not None:
+            return c, f"1 / {_texte(node.right)}", "{} / " + _texte(node.right)
+        c = _nombre(node.right)
+        if c is not None and c != 0:
+            return 1 / c, _texte(node.left), _texte(node.left) + " * {}"
+    return 1.0, _texte(node), _texte(node) + " * {}"
+
+
+def decomposer_formule(formule_raw):
+    """Formule -> (termes, constante).
+
+    termes : liste de dicts {'expr', 'coef', 'gabarit'} dans l'ordre de la
+    formule ; une même expression rencontrée deux fois est fusionnée.
+    """
+    arbre = ast.parse(reecrire_formule(formule_raw).strip(), mode='eval').body
+    termes, constante = {}, 0.0
+
+    def parcourir(node, signe):
+        nonlocal constante
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+            parcourir(node.left, signe)
+            parcourir(node.right, signe if isinstance(node.op, ast.Add) else -signe)
+            return
+        v = _nombre(node)
+        if v is not None:
+            constante += signe * v
+            return
+        coef, expr, gabarit = _coefficient(node)
+        if expr in termes:
+            termes[expr]['coef'] += signe * coef
+        else:
+            termes[expr] = {'expr': expr, 'coef': signe * coef, 'gabarit': gabarit}
+
+    parcourir(arbre, 1.0)
+    return list(termes.values()), constante
+
+
+def _fmt(c):
+    return f"{c:g}"
+
+
+def formule_candidat(termes, poids, constante=0.0):
+    """Texte Algo Builder d'un jeu de coefficients (termes à 0 omis)."""
+    morceaux = []
+    for t, w in zip(termes, poids):
+        if w == 0:
+            continue
+        m = t['gabarit'].format(_fmt(abs(w)))
+        morceaux.append(("- " if w < 0 else "+ ") + m)
+    if constante:
+        morceaux.append(("- " if constante < 0 else "+ ") + _fmt(abs(constante)))
+    if not morceaux:
+        return "0"
+    texte = " ".join(morceaux)
+    return texte[2:] if texte.startswith("+ ") else "-" + texte[2:]
+
+
+# =====================================================
+# GRILLE DE COEFFICIENTS
+# =====================================================
+def grille_poids(termes, facteurs=FACTEURS_DEFAUT, max_candidats=5000, graine=0):
+    """Matrice (candidats, termes) : coefficient d'origine x facteur, par terme.
+
+    Produit cartésien complet s'il tient dans max_candidats, sinon tirage
+    aléatoire reproductible. La formule d'origine est toujours la ligne 0.
+    Les vecteurs proportionnels (même classement par course) sont dédoublonnés.
+    """
+    base = np.array([t['coef'] for t in termes], dtype=float)
+    facteurs = np.asarray(facteurs, dtype=float)
+    p = len(base)
+    if len(facteurs) ** p <= max_candidats:
+        idx = np.array(list(itertools.product(range(len(facteurs)), repeat=p)), dtype=np.int64).reshape(-1, p)
+    else:
+        idx = np.random.default_rng(graine).integers(len(facteurs), size=(max_candidats, p))
+    W = np.vstack([base, base * facteurs[idx]])
+
+    echelle = np.abs(W).max(axis=1)
+    W = W[echelle > 0]
+    cle = np.round(W / np.abs(W).max(axis=1, keepdims=True), 9)
+    _, premiers = np.unique(cle, axis=0, return_index=True)
+    return W[np.sort(premiers)]
+
+
+# =====================================================
+# CONTEXTE + KPIs VECTORISÉS
+# =====================================================
+def _colonne(df, col):
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df.columns \
+        else np.full(len(df), np.nan)
+
+
+def construire_contexte(df, expressions):
+    """Matrice de features (une colonne par expression) + tout ce que les KPIs lisent.
+
+    Tableaux NumPy (picklables) limités aux courses terminées ; grille[i] donne
+    les positions des chevaux de la course i, jours[i] sa date.
+    """
+    index = CourseIndex(df)
+    if not index.terminees.all():
+        # Les courses en attente ne comptent dans aucun KPI
+        index = CourseIndex(index.df[np.repeat(index.terminees, index.fins - index.debuts)])
+    d = index.df
+    X = np.column_stack([v.to_numpy(dtype=float) for v in evaluer_formules(d, expressions)]) \
+        if expressions else np.zeros((len(d), 0))
+
+    cl = np.nan_to_num(_colonne(d, 'classement'), nan=0.0)
+    cote = np.nan_to_num(_colonne(d, 'Cote'), nan=0.0)
+    rsg, rsp = _colonne(d, 'Rapport_SG'), _colonne(d, 'Rapport_SP')
+    # Mêmes replis que evaluate_simple : rapport si > 0, sinon cote (ou cote/3 arrondie)
+    gain_sg = np.where(rsg > 0, rsg, cote)
+    gain_sp = np.where(rsp > 0, rsp, [round(c / 3, 1) for c in cote.tolist()])
+
+    # Grille (courses, partants max) des positions, -1 en bourrage
+    tailles = index.fins - index.debuts
+    grille = np.full((len(tailles), int(tailles.max()) if len(tailles) else 0), -1, dtype=np.int64)
+    grille[index._course, np.arange(len(d)) - np.repeat(index.debuts, tailles)] = np.arange(len(d))
+
+    return {
+        'X': X, 'grille': grille,
+        'jours': d['date'].astype(str).to_numpy()[index.debuts] if 'date' in d.columns else np.full(len(tailles), ''),
+        'cl': cl, 'cote': cote, 'gain_sg': gain_sg, 'gain_sp': gain_sp,
+    }
+
+
+def _roi_lot(gains, mises):
+    return np.array([_roi(g, m) for g, m in zip(gains.tolist(), mises.tolist())])
+
+
+def top_k_lot(S, ctx, k=3):
+    """Top k par course pour chaque colonne de S -> (courses, k, candidats), -1 en bourrage.
+
+    Les scores sont rangés en grille (courses, partants max) puis triés
+    course par course ; même ordre que CourseIndex.top_k (NaN en dernier).
+    """
+    grille = ctx['grille']
+    Sp = np.where((grille >= 0)[:, :, None], S[grille], np.nan)
+    ordre = np.argsort(-Sp, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(np.broadcast_to(grille[:, :, None], Sp.shape), ordre, axis=1)
+
+
+def kpis_lot(S, ctx):
+    """KPIs Formule (Simple / Duo / Trio) de chaque colonne de S -> (candidats, KPIS)."""
+    top = top_k_lot(S, ctx)
+    n, m = len(top), S.shape[1]
+    if not n:
+        return np.zeros((m, len(KPIS)))
+    cl, cote = ctx['cl'], ctx['cote']
+    valide = top >= 0
+    c = np.where(valide, cl[top], 0)
+    dans3 = valide & (c >= 1) & (c <= 3)
+
+    # Simple : premier du score
+    p1 = top[:, 0]
+    g1 = cl[p1] == 1
+    t31 = dans3[:, 0]
+    gain_g = np.where(g1, ctx['gain_sg'][p1], 0).sum(axis=0)
+    gain_p = np.where(t31, ctx['gain_sp'][p1], 0).sum(axis=0)
+
+    # Duo : les deux premiers dans le top 2 / top 3 de l'arrivée
+    v2 = valide[:, :2]
+    duo_cg = np.all(~v2 | ((c[:, :2] >= 1) & (c[:, :2] <= 2)), axis=1).sum(axis=0)
+    duo_cp = np.all(~v2 | dans3[:, :2], axis=1).sum(axis=0)
+
+    # Trio : 2 € gagnant sur le premier + 1 € placé par cheval
+    hit = dans3.sum(axis=1)
+    cote_top = np.where(valide, cote[top], 0.0)
+    mise = (2 + valide.sum(axis=1)).sum(axis=0)
+    gains = np.where(g1 & (cote_top[:, 0] > 0), 2 * cote_top[:, 0], 0).sum(axis=0) \
+        + np.where(dans3 & (cote_top > 0), cote_top / 3, 0).sum(axis=(0, 1))
+
+    return np.column_stack([
+        g1.sum(axis=0), t31.sum(axis=0), _roi_lot(gain_g, np.full(m, n)), _roi_lot(gain_p, np.full(m, n)),
+        duo_cg, duo_cp, (hit >= 2).sum(axis=0), (hit == 3).sum(axis=0), _roi_lot(gains, mise),
+    ]).astype(float)
+
+
+def kpis_scores(score, ctx):
+    """KPIs d'un seul vecteur de scores -> dict {kpi: valeur}."""
+    return dict(zip(KPIS, kpis_lot(np.asarray(score, dtype=float)[:, None], ctx)[0].tolist()))
+
+
+_CTX = {}
+
+
+def initialiser_worker(ctx):
+    """Initialiseur de ProcessPoolExecutor : contexte reçu une fois par processus."""
+    _CTX.clear()
+    _CTX.update(ctx)
+
+
+def contexte_worker():
+    """Contexte installé par initialiser_worker dans ce processus."""
+    return _CTX
+
+
+def _evaluer_lot(W, ctx=None):
+    ctx = ctx or contexte_worker()
+    return kpis_lot(ctx['X'] @ W.T, ctx)
+
+
+def balayer(ctx, W, workers=None, taille_lot=None):
+    """KPIs de chaque ligne de W -> tableau (candidats, KPIS).
+
+    workers=1 : dans le processus courant ; sinon pool de processus qui
+    reçoivent le contexte une fois à l'initialisation.
+    """
+    # ~4M cellules (chevaux x candidats) par lot pour borner la mémoire
+    taille_lot = taille_lot or max(1, min(256, 4_000_000 // max(len(ctx['X']), 1)))
+    lots = [W[i:i + taille_lot] for i in range(0, len(W), taille_lot)]
+    if not lots:
+        return np.zeros((0, len(KPIS)))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(lots) == 1:
+        return np.vstack([_evaluer_lot(lot, ctx) for lot in lots])
+    with ProcessPoolExecutor(max_workers=min(workers, len(lots)),
+                             initializer=initialiser_worker, initargs=(ctx,)) as pool:
+        return np.vstack(list(pool.map(_evaluer_lot, lots)))
+
+
+def typer_kpis(df):
+    """Compteurs en int (les ROI restent en float)."""
+    for k in KPIS:
+        if k in df.columns and 'roi' not in k:
+            df[k] = df[k].astype(int)
+    return df
+
+
+def classement(termes, W, resultats, constante=0.0, critere='trio_roi', top=20, n_courses=None):
+    """Leaderboard trié sur critere (décroissant, ordre de la grille à égalité)."""
+    lb = typer_kpis(pd.DataFrame(resultats, columns=list(KPIS)))
+    lb.insert(0, 'origine', np.arange(len(W)) == 0)
+    for j, t in enumerate(termes):
+        lb[t['expr']] = W[:, j]
+    lb['formule'] = [formule_candidat(termes, w, constante) for w in W]
+    if n_courses is not None:
+        lb['courses'] = n_courses
+    lb = lb.sort_values(critere, ascending=False, kind='stable')
+    return lb.head(top).reset_index(drop=True) if top else lb.reset_index(drop=True)
+
+
+# =====================================================
+# COMPARAISON DE FORMULES
+# =====================================================
+MODES_KPIS = {
+    'Simple': [('simple_g', 'Gagnant %'), ('simple_t3', 'Top3 %'), ('simple_roi_g', 'ROI SG'), ('simple_roi_p', 'ROI SP')],
+    'Duo': [('duo_cg', 'CG %'), ('duo_cp', 'CP %')],
+    'Trio': [('trio_t3_2', '2/3 %'), ('trio_t3_3', '3/3 %'), ('trio_roi', 'ROI')],
+}
+
+
+def comparer_formules(df, algos):
+    """{nom: formule} évalués sur un même df préparé -> tableau algo x « Mode KPI ».
+
+    Une évaluation de colonne par formule (sous-expressions partagées) puis
+    un seul passage top-k pour toutes ; compteurs en % des courses terminées.
+    """
+    noms = list(algos)
+    ctx = construire_contexte(df, [algos[n] for n in noms])
+    res = typer_kpis(pd.DataFrame(kpis_lot(ctx['X'], ctx), columns=list(KPIS)))
+    n = len(ctx['grille'])
+    table = {}
+    for mode, kpis in MODES_KPIS.items():
+        for k, label in kpis:
+            table[f"{mode} {label}"] = res[k] if 'roi' in k else (res[k] / n * 100).round(1) if n else 0.0
+    table = pd.DataFrame(table)
+    table.index = pd.Index(noms, name='Algo')
+    table.attrs['courses'] = n
+    return table
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def parser():
+    p = argparse.ArgumentParser(prog="python -m algo_sweep", description="Balayage des coefficients d'une formule")
+    p.add_argument("--du", default=str(pd.Timestamp.now().date()), help="Date de début (AAAA-MM-JJ)")
+    p.add_argument("--au", help="Date de fin (défaut : --du)")
+    algo = p.add_mutually_exclusive_group(required=True)
+    algo.add_argument("--algo", help="Nom d'un preset ou d'un algo sauvegardé")
+    algo.add_argument("--formule", help="Formule Algo Builder")
+    p.add_argument("--facteurs", nargs="+", type=float, default=list(FACTEURS_DEFAUT),
+                   help="Multiplicateurs appliqués à chaque coefficient d'origine")
+    p.add_argument("--max-candidats", type=int, default=5000, help="Au-delà : tirage aléatoire")
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--workers", type=int, help="Processus (défaut : nombre de CPU)")
+    p.add_argument("--critere", choices=KPIS, default="trio_roi")
+    p.add_argument("--top", type=int, default=20, help="Lignes du classement (0 = toutes)")
+    ajouter_filtres(p)
+    p.add_argument("--sortie", help="CSV (;) du classement")
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    date_start, date_end = args.du, args.au or args.du
+    run_query = requeteur(args.db)
+
+    formule_raw = args.formule or resoudre_formule(args.algo, run_query)
+    if not formule_raw:
+        print(f"Algo introuvable : {args.algo}", file=sys.stderr)
+        return 2
+    termes, constante = decomposer_formule(formule_raw)
+    if not termes:
+        print("Aucun terme à pondérer dans la formule.", file=sys.stderr)
+        return 2
+    filtres_c, filtres_ch, filtres_av = construire_filtres(args)
+
+    t0 = time.perf_counter()
+    colonnes = colonnes_requises(compiler_formule(formule_raw).variables)
+    with contextlib.redirect_stdout(sys.stderr):
+        df, _ = preparer_algo(run_query, date_start, date_end, colonnes, filtres_c, filtres_ch, filtres_av)
+    if df is None:
+        print("Aucune donnée après filtres.", file=sys.stderr)
+        return 1
+    ctx = construire_contexte(df, [t['expr'] for t in termes])
+    W = grille_poids(termes, args.facteurs, args.max_candidats, args.graine)
+    t1 = time.perf_counter()
+    resultats = balayer(ctx, W, args.workers)
+    t2 = time.perf_counter()
+
+    lb = classement(termes, W, resultats, constante, args.critere, args.top, len(ctx['grille']))
+    print(f"{len(termes)} termes, {len(W)} candidats, {len(ctx['grille'])} courses terminées "
+          f"— préparation {t1 - t0:.2f}s, balayage {t2 - t1:.2f}s", file=sys.stderr)
+    if args.sortie:
+        lb.to_csv(args.sortie, index=False, sep=';')
+        print(f"Classement écrit dans {args.sortie}", file=sys.stderr)
+    else:
+        with pd.option_context('display.max_colwidth', 120, 'display.width', 200):
+            print(lb[['origine', *KPIS, 'formule']].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+algo_walkforward.py — Validation walk-forward des algos sauvegardés
+L'historique est découpé en fenêtres glissantes train / test ; chaque algo
+(FORMULES_PRESET + table algos) est évalué sur chaque fenêtre, puis sur
+l'ensemble des fenêtres de test (hors échantillon).
+
+    python -m algo_walkforward --du 2025-06-01 --au 2026-03-31 --train 60 --test 14
+    python -m algo_walkforward --du 2025-06-01 --au 2026-03-31 --algos "📊 F11 Polyvalente" "🔷 Borda Pure" --critere simple_roi_g
+
+Une seule lecture de la base : les données filtrées sont préparées une fois,
+chaque formule est évaluée une fois sur tout l'historique (le SCORE d'un
+cheval ne dépend pas de la fenêtre), et un fold ne fait que sélectionner
+ses courses dans la grille partagée. KPIs = colonne « Formule » des modes
+Simple / Duo / Trio, comme algo_sweep.
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import colonnes_requises
+from formule import compiler_formule
+from utils_algo import FORMULES_PRESET
+from algo_cli import preparer_algo, construire_filtres, ajouter_filtres, requeteur
+from algo_sweep import (
+    KPIS, construire_contexte, contexte_worker, initialiser_worker, kpis_lot, typer_kpis
+)
+
+
+# =====================================================
+# ALGOS + FOLDS
+# =====================================================
+def lister_algos(run_query, noms=None):
+    """{nom: formule} : presets puis table algos, restreint à noms si fourni."""
+    algos = dict(FORMULES_PRESET)
+    algos_db = run_query("SELECT nom, formule FROM algos")
+    if algos_db is not None and not algos_db.empty:
+        algos.update(zip(algos_db['nom'], algos_db['formule']))
+    if noms:
+        inconnus = [n for n in noms if n not in algos]
+        if inconnus:
+            raise SystemExit(f"Algo introuvable : {', '.join(inconnus)}")
+        algos = {n: algos[n] for n in noms}
+    return algos
+
+
+def decouper_folds(jours, train_jours=60, test_jours=14, pas_jours=None):
+    """Fenêtres glissantes sur le calendrier des courses.
+
+    Fold i : train [d0 + i*pas, +train_jours[, test juste après sur test_jours.
+    Le dernier fold est le premier dont le test dépasse la dernière course.
+    Renvoie [{'fold', 'train': (du, au), 'test': (du, au)}] (bornes incluses, AAAA-MM-JJ).
+    """
+    if not len(jours):
+        return []
+    pas = pd.Timedelta(days=pas_jours or test_jours)
+    train, test = pd.Timedelta(days=train_jours), pd.Timedelta(days=test_jours)
+    d0, fin = pd.Timestamp(min(jours)), pd.Timestamp(max(jours))
+    jour = pd.Timedelta(days=1)
+    folds = []
+    while d0 + train <= fin:
+        debut_test = d0 + train
+        folds.append({
+            'fold': len(folds) + 1,
+            'train': (str(d0.date()), str((debut_test - jour).date())),
+            'test': (str(debut_test.date()), str((debut_test + test - jour).date())),
+        })
+        d0 += pas
+    return folds
+
+
+def _masque(jours, bornes):
+    return (jours >= bornes[0]) & (jours <= bornes[1])
+
+
+# =====================================================
+# ÉVALUATION
+# =====================================================
+def _kpis_periode(ctx, masque):
+    sous = {**ctx, 'grille': ctx['grille'][masque]}
+    return kpis_lot(ctx['X'], sous)
+
+
+def evaluer_fold(fold, ctx=None):
+    """KPIs train et test de chaque algo (colonne de X) -> liste de lignes."""
+    ctx = ctx or contexte_worker()
+    lignes = []
+    for periode in ('train', 'test'):
+        masque = _masque(ctx['jours'], fold[periode])
+        res = _kpis_periode(ctx, masque)
+        for j, vals in enumerate(res):
+            lignes.append({
+                'fold': fold['fold'], 'algo': j, 'periode': periode,
+                'du': fold[periode][0], 'au': fold[periode][1], 'courses': int(masque.sum()),
+                **dict(zip(KPIS, vals.tolist())),
+            })
+    return lignes
+
+
+def walk_forward(df, algos, train_jours=60, test_jours=14, pas_jours=None,
+                 critere='trio_roi', workers=None):
+    """Walk-forward de tous les algos -> (détail par fold, agrégat par algo).
+
+    Agrégat : KPIs sur l'union des fenêtres de test, moyenne / écart-type du
+    critère sur les folds de test, et écart train - test du critère.
+    """
+    noms = list(algos)
+    ctx = construire_contexte(df, [algos[n] for n in noms])
+    folds = decouper_folds(ctx['jours'], train_jours, test_jours, pas_jours)
+    if not folds:
+        return pd.DataFrame(), pd.DataFrame()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(folds) == 1:
+        lignes = [l for f in folds for l in evaluer_fold(f, ctx)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(folds)),
+                                 initializer=initialiser_worker, initargs=(ctx,)) as pool:
+            lignes = [l for res in pool.map(evaluer_fold, folds) for l in res]
+
+    detail = typer_kpis(pd.DataFrame(lignes))
+    detail['algo'] = [noms[j] for j in detail['algo']]
+    detail = detail[detail['courses'] > 0].reset_index(drop=True)
+
+    hors_echantillon = np.zeros(len(ctx['jours']), dtype=bool)
+    for f in folds:
+        hors_echantillon |= _masque(ctx['jours'], f['test'])
+    agregat = typer_kpis(pd.DataFrame(_kpis_periode(ctx, hors_echantillon), columns=list(KPIS)))
+    agregat.insert(0, 'algo', noms)
+    agregat.insert(1, 'courses_test', int(hors_echantillon.sum()))
+
+    par_periode = detail.groupby(['algo', 'periode'])[critere]
+    moy = par_periode.mean().unstack()
+    agregat[f'{critere}_moy'] = agregat['algo'].map(moy.get('test', pd.Series(dtype=float)))
+    agregat[f'{critere}_ecart_type'] = agregat['algo'].map(par_periode.std().unstack().get('test', pd.Series(dtype=float)))
+    agregat['ecart_train_test'] = agregat['algo'].map(moy.get('train', pd.Series(dtype=float)) - moy.get('test', pd.Series(dtype=float)))
+    agregat = agregat.sort_values(critere, ascending=False, kind='stable').reset_index(drop=True)
+    return detail, agregat
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def parser():
+    p = argparse.ArgumentParser(prog="python -m algo_walkforward", description="Validation walk-forward des algos")
+    p.add_argument("--du", required=True, help="Début de l'historique (AAAA-MM-JJ)")
+    p.add_argument("--au", default=str(pd.Timestamp.now().date()), help="Fin de l'historique")
+    p.add_argument("--algos", nargs="+", help="Algos à évaluer (défaut : presets + table algos)")
+    p.add_argument("--train", type=int, default=60, help="Jours de la fenêtre train")
+    p.add_argument("--test", type=int, default=14, help="Jours de la fenêtre test")
+    p.add_argument("--pas", type=int, help="Décalage entre folds en jours (défaut : --test)")
+    p.add_argument("--critere", choices=KPIS, default="trio_roi")
+    p.add_argument("--workers", type=int, help="Processus (défaut : nombre de CPU)")
+    ajouter_filtres(p)
+    p.add_argument("--sortie", help="Dossier des CSV (;) détail par fold + agrégat")
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    run_query = requeteur(args.db)
+    algos = lister_algos(run_query, args.algos)
+    filtres_c, filtres_ch, filtres_av = construire_filtres(args)
+
+    t0 = time.perf_counter()
+    colonnes = set()
+    for f in algos.values():
+        colonnes |= colonnes_requises(compiler_formule(f).variables)
+    with contextlib.redirect_stdout(sys.stderr):
+        df, _ = preparer_algo(run_query, args.du, args.au, colonnes, filtres_c, filtres_ch, filtres_av)
+    if df is None:
+        print("Aucune donnée après filtres.", file=sys.stderr)
+        return 1
+    t1 = time.perf_counter()
+    detail, agregat = walk_forward(df, algos, args.train, args.test, args.pas, args.critere, args.workers)
+    t2 = time.perf_counter()
+    if agregat.empty:
+        print("Historique trop court pour un fold (train + test).", file=sys.stderr)
+        return 1
+
+    print(f"{len(algos)} algos, {detail['fold'].nunique()} folds — chargement {t1 - t0:.2f}s, "
+          f"évaluation {t2 - t1:.2f}s", file=sys.stderr)
+    if args.sortie:
+        os.makedirs(args.sortie, exist_ok=True)
+        suffixe = f"{args.du}_{args.au}_{args.train}-{args.test}"
+        detail.to_csv(os.path.join(args.sortie, f"walkforward_folds_{suffixe}.csv"), index=False, sep=';')
+        agregat.to_csv(os.path.join(args.sortie, f"walkforward_agregat_{suffixe}.csv"), index=False, sep=';')
+        print(f"Exports écrits dans {args.sortie}", file=sys.stderr)
+    else:
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print(agregat.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+bench.py — Benchmarks de la chaîne Algo Builder sur bases synthétiques
+Chaque taille (nombre de chevaux) a sa base générée par donnees_synthetiques
+(gardée en cache dans --dossier). On chronomètre chaque étape du pipeline
+puis l'évaluation de chaque mode ; résultats en JSON, comparables d'un commit à l'autre.
+
+    python -m bench --sortie bench/$(git rev-parse --short HEAD).json
+    python -m bench --tailles 1000 100000 --modes simple duo --comparer bench/ancien.json
+
+--comparer : ratio nouveau / ancien par étape, code retour 1 si une étape
+dépasse --seuil (défaut +20 %).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import calculer_scores, colonnes_requises, CourseIndex
+from formule import compiler_formule
+from utils_algo import FORMULES_PRESET
+from algo_cli import preparer_algo, requeteur
+from algo_eval import EVALUATEURS
+from donnees_synthetiques import generer_selections, ecrire_base
+from profilage import Profileur, mesurer
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TAILLES_DEFAUT = (1000, 100000, 1000000)
+FORMULE_DEFAUT = "📊 F11 Polyvalente"
+
+
+# =====================================================
+# BASES
+# =====================================================
+def base_synthetique(taille, dossier, graine=0, features=False):
+    """Chemin de la base de taille chevaux (générée si absente) -> (chemin, durée de génération ou None)."""
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f"bench_{taille}_{graine}{'_features' if features else ''}.db")
+    if os.path.exists(chemin):
+        return chemin, None
+    t0 = time.perf_counter()
+    ecrire_base(generer_selections(taille, graine=graine), chemin, features)
+    return chemin, round(time.perf_counter() - t0, 3)
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# =====================================================
+# MESURES
+# =====================================================
+def mesurer_base(db_path, formule_raw, modes, repetitions=1):
+    """Durée de chaque étape (meilleure des répétitions) sur toute la base."""
+    run_query = requeteur(db_path)
+    bornes = run_query("SELECT MIN(date) AS du, MAX(date) AS au FROM selections")
+    du, au = bornes['du'].iloc[0], bornes['au'].iloc[0]
+    colonnes = colonnes_requises(compiler_formule(formule_raw).variables)
+
+    durees, info = {}, {}
+    for _ in range(repetitions):
+        prof = Profileur()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df, filtres_av = preparer_algo(run_query, du, au, colonnes, profileur=prof)
+            df = mesurer(prof, "calculer_scores", calculer_scores, df, formule_raw)
+            index = mesurer(prof, "CourseIndex", CourseIndex, df)
+            for mode in modes:
+                mesurer(prof, f"evaluate_{mode}", EVALUATEURS[mode], df, filtres_av, index)
+        for e in prof.etapes:
+            durees[e['etape']] = min(durees.get(e['etape'], np.inf), e['duree_s'])
+        info = {'partants': len(df), 'courses': int(df['ID_C'].nunique()), 'du': du, 'au': au}
+    return {**info, 'etapes': durees, 'total_s': round(sum(durees.values()), 4)}
+
+
+def comparer(ancien, nouveau, seuil=0.2):
+    """Tableau taille x étape : ancien_s, nouveau_s, ratio, regression (ratio > 1 + seuil)."""
+    anciens = {r['taille']: r['etapes'] for r in ancien['resultats']}
+    lignes = []
+    for r in nouveau['resultats']:
+        for etape, duree in r['etapes'].items():
+            avant = anciens.get(r['taille'], {}).get(etape)
+            lignes.append({'taille': r['taille'], 'etape': etape, 'ancien_s': avant, 'nouveau_s': duree})
+    t = pd.DataFrame(lignes, columns=['taille', 'etape', 'ancien_s', 'nouveau_s'])
+    t['ratio'] = (t['nouveau_s'] / t['ancien_s'].where(t['ancien_s'] > 0)).round(2)
+    # Écart absolu minimal de 10 ms : en dessous, le bruit de mesure domine
+    t['regression'] = (t['ratio'] > 1 + seuil) & (t['nouveau_s'] - t['ancien_s'] >= 0.01)
+    return t
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def parser():
+    p = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks Algo Builder (bases synthétiques)")
+    p.add_argument("--tailles", nargs="+", type=int, default=list(TAILLES_DEFAUT), help="Nombres de chevaux")
+    p.add_argument("--modes", nargs="+", choices=sorted(EVALUATEURS), default=sorted(EVALUATEURS))
+    p.add_argument("--algo", default=FORMULE_DEFAUT, choices=list(FORMULES_PRESET))
+    p.add_argument("--repetitions", type=int, default=1, help="Meilleure durée sur N passages")
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--features", action="store_true", help="Bases avec feature store (lecture typée)")
+    p.add_argument("--dossier", default=os.path.join(tempfile.gettempdir(), "turfpro_bench"),
+                   help="Cache des bases générées")
+    p.add_argument("--sortie", help="Fichier JSON des résultats (défaut : stdout)")
+    p.add_argument("--comparer", help="JSON d'un passage précédent")
+    p.add_argument("--seuil", type=float, default=0.2, help="Ralentissement toléré (0.2 = +20 %%)")
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    formule_raw = FORMULES_PRESET[args.algo]
+    resultats = []
+    for taille in args.tailles:
+        db_path, generation = base_synthetique(taille, args.dossier, args.graine, args.features)
+        r = mesurer_base(db_path, formule_raw, args.modes, args.repetitions)
+        resultats.append({'taille': taille, 'generation_s': generation, **r})
+        print(f"{taille:>9} chevaux : {r['courses']} courses, {r['total_s']:.2f}s "
+              f"({', '.join(f'{k} {v:.2f}s' for k, v in r['etapes'].items() if v >= 0.01)})", file=sys.stderr)
+
+    sortie = {
+        'commit': _version(), 'date': str(pd.Timestamp.now().replace(microsecond=0)),
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'machine': platform.machine(), 'cpu': os.cpu_count(),
+        'algo': args.algo, 'formule': formule_raw, 'modes': args.modes,
+        'repetitions': args.repetitions, 'features': args.features, 'graine': args.graine,
+        'resultats': resultats,
+    }
+    texte = json.dumps(sortie, ensure_ascii=False, indent=2)
+    if args.sortie:
+        os.makedirs(os.path.dirname(os.path.abspath(args.sortie)), exist_ok=True)
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            f.write(texte)
+        print(f"Résultats écrits dans {args.sortie}", file=sys.stderr)
+    else:
+        print(texte)
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as f:
+            ancien = json.load(f)
+        t = comparer(ancien, sortie, args.seuil)
+        print(f"\nComparaison avec {ancien.get('commit')} :", file=sys.stderr)
+        print(t.to_string(index=False), file=sys.stderr)
+        if t['regression'].any():
+            print(f"Régression > {args.seuil:.0%} : {', '.join(t.loc[t['regression'], 'etape'].unique())}",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+cache_donnees.py — Cache des frames de l'Algo Builder, partagé entre sessions
+Niveau 1 : charger_donnees + preparer_dataframe, clé (base, période, version
+de selections). Les clés json décodées s'accumulent : une formule qui demande
+des colonnes déjà présentes réutilise l'entrée.
+Niveau 2 : frame filtré + calculer_colonnes + calculer_scores + CourseIndex,
+clé (niveau 1, filtres qui retirent des chevaux, formule). Les filtres
+d'affichage (pastille, concordance, coup de folie) n'en font pas partie.
+Niveau 3 : résultat evaluate_<mode>, clé (niveau 2, mode, filtres d'affichage) :
+revenir à une pastille déjà vue ne relance pas l'évaluation.
+
+Les caches sont des objets du module : un seul exemplaire par serveur
+Streamlit, donc commun à tous les navigateurs. Éviction LRU par taille
+(TURFPRO_CACHE_MO, défaut 512 Mo par niveau). La version de selections est
+tenue par trigger (db.assurer_version) : un import ou une mise à jour des
+résultats change la clé, les anciennes entrées sortent par LRU.
+"""
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import db
+from engine import charger_donnees, preparer_dataframe, CourseIndex
+from filtres_avance import FILTRES_AVANCE_LIGNES
+from profilage import mesurer
+
+CACHE_MAX_MO = float(os.environ.get("TURFPRO_CACHE_MO", 512))
+
+
+def taille_mo(valeur):
+    """Empreinte mémoire approximative (DataFrame, CourseIndex, tuples de ceux-ci, résultat evaluate_*)."""
+    if isinstance(valeur, pd.DataFrame):
+        return valeur.memory_usage(index=True, deep=True).sum() / 2**20
+    if isinstance(valeur, CourseIndex):
+        return taille_mo(valeur.df)
+    if isinstance(valeur, (tuple, list)):
+        return sum(taille_mo(v) for v in valeur)
+    if isinstance(valeur, dict):
+        return len(pickle.dumps(valeur, pickle.HIGHEST_PROTOCOL)) / 2**20
+    return 0.0
+
+
+class CacheLRU:
+    """Dictionnaire borné en Mo, le moins récemment lu sort en premier (thread-safe)."""
+
+    def __init__(self, max_mo=CACHE_MAX_MO):
+        self.max_mo = max_mo
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.lectures = self.succes = 0
+
+    def get(self, cle, valide=None, defaut=None):
+        """Valeur de cle ; defaut si absente ou si valide(valeur) est faux."""
+        with self._verrou:
+            self.lectures += 1
+            if cle not in self._entrees:
+                return defaut
+            valeur = self._entrees[cle][0]
+            if valide is not None and not valide(valeur):
+                return defaut
+            self.succes += 1
+            self._entrees.move_to_end(cle)
+            return valeur
+
+    def put(self, cle, valeur, taille=None):
+        taille = taille_mo(valeur) if taille is None else taille
+        with self._verrou:
+            self._entrees.pop(cle, None)
+            # Une entrée plus grosse que le cache entier n'est pas gardée
+            if taille > self.max_mo:
+                return
+            self._entrees[cle] = (valeur, taille)
+            while self.taille() > self.max_mo:
+                self._entrees.popitem(last=False)
+
+    def taille(self):
+        return sum(t for _, t in self._entrees.values())
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def stats(self):
+        return {'entrees': len(self._entrees), 'taille_mo': round(float(self.taille()), 1),
+                'lectures': self.lectures, 'succes': self.succes}
+
+
+CACHE_PREPARE = CacheLRU()
+CACHE_SCORES = CacheLRU()
+CACHE_EVAL = CacheLRU()
+
+
+def _gelee(v):
+    return tuple(v) if isinstance(v, list) else v
+
+
+def signature_filtres(filtres, cles=None):
+    """Filtres -> tuple hashable (listes en tuples), restreint à cles si fourni."""
+    return tuple(sorted((k, _gelee(v)) for k, v in filtres.items() if cles is None or k in cles))
+
+
+def cle_periode(date_start, date_end, db_path=None):
+    """(base, du, au, version de selections) : clé du niveau 1."""
+    db_path = db_path or db.DB_PATH
+    return (os.path.abspath(db_path), str(date_start), str(date_end), db.version_selections(db_path))
+
+
+def cle_scores(periode, formule_raw, filtres_c, filtres_ch, filtres_av):
+    """Clé du niveau 2 : période versionnée, formule et filtres qui retirent des chevaux."""
+    return (periode, formule_raw, signature_filtres(filtres_c), signature_filtres(filtres_ch),
+            signature_filtres(filtres_av, FILTRES_AVANCE_LIGNES))
+
+
+def frame_prepare(run_query, periode, colonnes, profileur=None):
+    """charger_donnees + preparer_dataframe via le cache -> DataFrame (None si vide).
+
+    Copie superficielle : le pipeline remplace des colonnes entières, jamais
+    les valeurs de l'entrée partagée.
+    """
+    colonnes, deja = set(colonnes), set()
+
+    def couvre(entree):
+        deja.update(entree[1])
+        return colonnes <= entree[1]
+
+    entree = CACHE_PREPARE.get(periode, valide=couvre)
+    if entree is not None:
+        df = entree[0]
+    else:
+        # Union avec les clés déjà décodées : l'entrée sert aussi aux formules précédentes
+        colonnes |= deja
+        _, date_start, date_end, _ = periode
+        raw_data = mesurer(profileur, "charger_donnees", charger_donnees, run_query, date_start, date_end, colonnes)
+        if raw_data is None or raw_data.empty:
+            return None
+        df = mesurer(profileur, "preparer_dataframe", preparer_dataframe, raw_data, colonnes)
+        CACHE_PREPARE.put(periode, (df, frozenset(colonnes)))
+    return df.copy(deep=False)
+
+
+def evaluer(cle, nom, fn, df, params, index, courses, profileur=None, **kwargs):
+    """fn(df, params, index, courses) (un evaluate_*) via le cache de niveau 3.
+
+    cle : clé du niveau 2 (cle_scores) du frame évalué, None = pas de cache.
+    Le résultat est partagé entre sessions : les render_* ne le modifient pas.
+    """
+    if cle is None:
+        return mesurer(profileur, nom, fn, df, params, index, courses, **kwargs)
+    cle = (cle, nom, signature_filtres(params))
+    res = CACHE_EVAL.get(cle)
+    if res is None:
+        res = mesurer(profileur, nom, fn, df, params, index, courses, **kwargs)
+        CACHE_EVAL.put(cle, res)
+    else:
+        print(f"♻️ {nom} en cache")
+    return res
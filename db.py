@@ -0,0 +1,259 @@
+"""
+db.py — Accès SQLite sans Streamlit
+Partagé par les pages (via utils) et les traitements en ligne de commande.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+DB_PATH = "turf_analytics.db"
+
+# Réglages appliqués à chaque connexion. WAL : les lecteurs ne sont plus
+# bloqués par un import en cours ; synchronous NORMAL suffit en WAL.
+PRAGMAS = {
+    'journal_mode': "WAL",
+    'synchronous': "NORMAL",
+    'cache_size': -65536,        # 64 Mo de cache de pages
+    'mmap_size': 268435456,      # 256 Mo lus par mmap
+    'temp_store': "MEMORY",
+    'busy_timeout': 5000,        # ms d'attente si un écrivain tient le verrou
+}
+
+# Clé naturelle d'un partant : (date, hippodrome, course normalisée, numéro).
+# Index unique, préfixe date : sert aussi aux requêtes par période
+INDEX_SELECTIONS_CLE = "idx_selections_cle"
+# Tant que des doublons empêchent l'index unique : index simple sur la date
+INDEX_SELECTIONS_DATE = "idx_selections_date"
+# Lignes retirées par le dédoublonnage explicite, conservées pour contrôle
+TABLE_DOUBLONS = "selections_doublons"
+INDEX_PARIS_DATE = "idx_paris_date"
+
+# Version des données de selections : incrémentée par trigger à chaque
+# INSERT / UPDATE / DELETE, sert de clé aux caches de l'Algo Builder
+TABLE_META = "meta"
+CLE_VERSION_SELECTIONS = "version_selections"
+
+
+# =====================================================
+# CONNEXIONS
+# =====================================================
+def configurer(conn):
+    for pragma, valeur in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {valeur}")
+    return conn
+
+
+def get_conn(db_path=None):
+    """Nouvelle connexion configurée, à fermer par l'appelant (scripts, gros traitements)."""
+    return configurer(sqlite3.connect(db_path or DB_PATH, check_same_thread=False))
+
+
+_POOL = threading.local()
+
+
+def connexion(db_path=None):
+    """Connexion persistante du thread courant pour db_path (ne pas la fermer).
+
+    Une par thread et par base : sqlite3 ne partage pas une connexion entre
+    threads en cours d'utilisation. Recréée après un fork (ProcessPoolExecutor).
+    """
+    chemin = os.path.abspath(db_path or DB_PATH)
+    if getattr(_POOL, 'pid', None) != os.getpid():
+        _POOL.pid, _POOL.conns = os.getpid(), {}
+    conn = _POOL.conns.get(chemin)
+    if conn is None:
+        conn = _POOL.conns[chemin] = get_conn(chemin)
+    return conn
+
+
+def fermer_connexions():
+    """Ferme les connexions persistantes du thread courant."""
+    for conn in getattr(_POOL, 'conns', {}).values():
+        conn.close()
+    _POOL.conns = {}
+
+
+@contextlib.contextmanager
+def lecture(db_path=None):
+    """with lecture() as conn : connexion persistante, sans transaction."""
+    yield connexion(db_path)
+
+
+@contextlib.contextmanager
+def ecriture(db_path=None):
+    """with ecriture() as conn : transaction sur la connexion persistante,
+    commit en sortie, rollback si exception."""
+    conn = connexion(db_path)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def run_query(query, params=(), commit=False, on_error=print, db_path=None):
+    """Exécute une requête : DataFrame en lecture, None en écriture ou en erreur."""
+    conn = connexion(db_path)
+    cursor = conn.cursor()
+    result = None
+    try:
+        cursor.execute(query, params)
+        if commit:
+            conn.commit()
+        else:
+            data = cursor.fetchall()
+            if cursor.description:
+                cols = [column[0] for column in cursor.description]
+                result = pd.DataFrame(data, columns=cols)
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        if "duplicate column name" not in str(e):
+            on_error(f"Erreur SQL : {e}")
+    finally:
+        cursor.close()
+    return result
+
+
+# =====================================================
+# VERSION DES DONNÉES
+# =====================================================
+
+
+def assurer_version(conn):
+    """Table meta + triggers de version sur selections (idempotent)."""
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {TABLE_META} (
+        cle TEXT PRIMARY KEY,
+        valeur INTEGER NOT NULL DEFAULT 0)""")
+    conn.execute(f"INSERT OR IGNORE INTO {TABLE_META} (cle, valeur) VALUES (?, 0)", (CLE_VERSION_SELECTIONS,))
+    for op in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {CLE_VERSION_SELECTIONS}_{op.lower()} AFTER {op} ON selections "
+            f"BEGIN UPDATE {TABLE_META} SET valeur = valeur + 1 WHERE cle = '{CLE_VERSION_SELECTIONS}'; END"
+        )
+
+
+def version_selections(db_path=None):
+    """Version courante des données de selections (crée les triggers au premier appel)."""
+    conn = connexion(db_path)
+    try:
+        row = conn.execute(
+            f"SELECT valeur FROM {TABLE_META} WHERE cle = ?", (CLE_VERSION_SELECTIONS,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is None:
+        try:
+            with ecriture(db_path) as conn:
+                assurer_version(conn)
+        except sqlite3.OperationalError:
+            # Pas encore de table selections
+            return 0
+        row = (0,)
+    return row[0]
+
+
+# =====================================================
+# SCHÉMA
+# =====================================================
+def compter_doublons(conn):
+    """Lignes en trop pour la clé naturelle : celles qui empêchent l'index unique."""
+    return conn.execute("""
+        SELECT COALESCE(SUM(n - 1), 0) FROM (
+            SELECT COUNT(*) AS n FROM selections
+            WHERE date IS NOT NULL AND hippodrome IS NOT NULL
+              AND course_norm IS NOT NULL AND numero IS NOT NULL
+            GROUP BY date, hippodrome, course_norm, numero
+            HAVING n > 1
+        )""").fetchone()[0]
+
+
+def dedoublonner_selections(conn):
+    """Supprime les doublons de clé naturelle -> nombre de lignes supprimées.
+
+    Garde la même ligne que preparer_dataframe : classement le plus élevé,
+    puis la première importée. Les lignes supprimées sont copiées dans
+    selections_doublons.
+    """
+    from engine import parse_classement
+    conn.create_function("rang_int", 1, parse_classement, deterministic=True)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_DOUBLONS} AS SELECT * FROM selections WHERE 0")
+    cols_doublons = {r[1] for r in conn.execute(f"PRAGMA table_info({TABLE_DOUBLONS})")}
+    cols = ", ".join(r[1] for r in conn.execute("PRAGMA table_info(selections)") if r[1] in cols_doublons)
+    conn.execute("""
+        CREATE TEMP TABLE doublons_a_supprimer AS
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY date, hippodrome, course_norm, numero
+                ORDER BY rang_int(classement) DESC, id
+            ) AS rn
+            FROM selections
+        ) WHERE rn > 1""")
+    try:
+        conn.execute(f"""
+            INSERT INTO {TABLE_DOUBLONS} ({cols})
+            SELECT {cols} FROM selections WHERE id IN (SELECT id FROM doublons_a_supprimer)""")
+        return conn.execute(
+            "DELETE FROM selections WHERE id IN (SELECT id FROM doublons_a_supprimer)"
+        ).rowcount
+    finally:
+        conn.execute("DROP TABLE temp.doublons_a_supprimer")
+
+
+def migrer_selections(conn, dedoublonner=False):
+    """Colonne course_norm et index (idempotent) -> {'doublons', 'supprimes'}.
+
+    Les lignes écrites sans course_norm (outil externe) sont complétées ;
+    l'index unique est alors reconstruit. Sans dedoublonner, rien n'est
+    supprimé : s'il reste des doublons, l'index unique n'est pas posé
+    (index simple sur la date à la place) et 'doublons' en donne le nombre.
+    dedoublonner=True (bouton « Nettoyer les doublons », importeur
+    --dedoublonner) les supprime d'abord.
+    """
+    compte = {'doublons': 0, 'supprimes': 0}
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'paris' in tables:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_PARIS_DATE} ON paris(date)")
+    if 'selections' not in tables:
+        return compte
+    colonnes = {r[1] for r in conn.execute("PRAGMA table_info(selections)")}
+    for col, type_sql in (('classement', 'INTEGER'), ('course_norm', 'TEXT')):
+        if col not in colonnes:
+            conn.execute(f"ALTER TABLE selections ADD COLUMN {col} {type_sql}")
+
+    indexe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (INDEX_SELECTIONS_CLE,)
+    ).fetchone() is not None
+    a_completer = conn.execute("SELECT 1 FROM selections WHERE course_norm IS NULL LIMIT 1").fetchone() is not None
+    if indexe and not a_completer:
+        return compte
+    if a_completer:
+        from engine import normalize_course_num
+        conn.execute(f"DROP INDEX IF EXISTS {INDEX_SELECTIONS_CLE}")
+        conn.create_function("normaliser_course", 1, normalize_course_num, deterministic=True)
+        conn.execute("UPDATE selections SET course_norm = normaliser_course(course_num) WHERE course_norm IS NULL")
+    if dedoublonner:
+        compte['supprimes'] = dedoublonner_selections(conn)
+    compte['doublons'] = compter_doublons(conn)
+    if compte['doublons']:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_SELECTIONS_DATE} ON selections(date)")
+        return compte
+    conn.execute(f"DROP INDEX IF EXISTS {INDEX_SELECTIONS_DATE}")
+    conn.execute(
+        f"CREATE UNIQUE INDEX {INDEX_SELECTIONS_CLE} ON selections(date, course_norm, numero, hippodrome)"
+    )
+    return compte
+
+
+def exiger_index_selections(conn):
+    """Erreur explicite si l'index unique manque (doublons) : les imports en dépendent (ON CONFLICT)."""
+    compte = migrer_selections(conn)
+    if compte['doublons']:
+        raise ValueError(
+            f"{compte['doublons']} doublons dans selections : import impossible sans index unique. "
+            "Les supprimer via Import / Export → « Nettoyer les doublons » "
+            "ou python -m importeur --dedoublonner."
+        )
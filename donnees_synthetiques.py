@@ -0,0 +1,233 @@
+"""
+donnees_synthetiques.py — Générateur de sélections au format export turfbzh
+N jours x R réunions x C courses x 8-18 partants, json_data avec les mêmes
+clés que l'import CSV (IA_*, ELO_*, Borda, Cote, Musique, Rank, rapports...).
+Les résultats suivent une force latente par cheval : la Cote, les IA et le
+Borda la reflètent avec du bruit, l'arrivée est tirée selon cette force.
+
+    python -m donnees_synthetiques bench.db --partants 100000
+    python -m donnees_synthetiques demo.db --jours 30 --reunions 4 --courses 8 --features
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+import db
+
+HIPPODROMES = [
+    'VINCENNES', 'LONGCHAMP', 'CHANTILLY', 'DEAUVILLE', 'AUTEUIL', 'ENGHIEN', 'CAGNES SUR MER',
+    'PAU', 'SAINT CLOUD', 'CABOURG', 'LYON PARILLY', 'MARSEILLE BORELY', 'COMPIEGNE', 'LAVAL',
+]
+DISCIPLINES = ['A', 'M', 'P', 'O']
+POIDS_DISCIPLINES = [0.45, 0.1, 0.35, 0.1]
+CLASSES = ['Handicap', 'Classe 2', 'Classe 3', 'Classe 4', 'Maiden',
+           'Course D', 'Course R', 'Course B', 'Course E', 'A réclamer']
+FERRURES = ['', 'DEFERRE_ANTERIEURS', 'DEFERRE_POSTERIEURS', 'DEFERRE_ANTERIEURS_POSTERIEURS',
+            'PROTEGE_ANTERIEURS', 'PROTEGE_POSTERIEURS', 'PROTEGE_ANTERIEURS_POSTERIEURS']
+NON_CLASSES = ['D', 'DAI', 'NP', 'T']
+PARTANTS_MOYENS = 13
+
+SCHEMA_SELECTIONS = """CREATE TABLE IF NOT EXISTS selections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    hippodrome TEXT,
+    course_num TEXT,
+    cheval TEXT,
+    numero INTEGER,
+    cote REAL,
+    musique TEXT,
+    corde TEXT,
+    ferreur TEXT,
+    json_data TEXT,
+    classement INTEGER,
+    course_norm TEXT)"""
+
+
+def _virgule(x):
+    """12.5 -> '12,5' (les CSV turfbzh sont en décimale française)."""
+    return f"{x:.1f}".replace('.', ',')
+
+
+def _musiques(rng, n, disc):
+    """5 dernières performances par cheval, ex. '1a3a(25)Da5a'."""
+    places = rng.integers(0, 10, (n, 5)).astype(str)
+    places[rng.random((n, 5)) < 0.08] = 'D'
+    lettres = np.char.lower(disc.astype(str))
+    inedits = rng.random(n) < 0.03
+    return [
+        '' if ined else f"{p[0]}{l}{p[1]}{l}(25){p[2]}{l}{p[3]}{l}{p[4]}{l}"
+        for p, l, ined in zip(places, lettres, inedits)
+    ]
+
+
+def generer_selections(n_partants=None, jours=30, reunions=4, courses=8, debut="2025-01-01",
+                       partants=(8, 18), jours_a_venir=0, graine=0):
+    """DataFrame au format de la table selections (id, date, ..., json_data, classement).
+
+    n_partants : nombre de chevaux visé ; fixe jours et coupe à la fin de la
+    course qui l'atteint. jours_a_venir : derniers jours sans résultats.
+    """
+    rng = np.random.default_rng(graine)
+    par_jour = reunions * courses
+    if n_partants:
+        jours = -(-n_partants // (par_jour * PARTANTS_MOYENS)) + 1
+
+    # --- Courses ---
+    n_courses = jours * par_jour
+    jour = np.repeat(np.arange(jours), par_jour)
+    reunion = np.tile(np.repeat(np.arange(1, reunions + 1), courses), jours)
+    numero_course = np.tile(np.arange(1, courses + 1), jours * reunions)
+    nb = rng.integers(partants[0], partants[1] + 1, n_courses)
+    if n_partants:
+        garde = np.cumsum(nb) - nb < n_partants
+        jour, reunion, numero_course, nb = jour[garde], reunion[garde], numero_course[garde], nb[garde]
+        n_courses = len(nb)
+    hippo_reunion = rng.integers(0, len(HIPPODROMES), jours * reunions)
+    hippo = np.array(HIPPODROMES)[hippo_reunion[jour * reunions + reunion - 1]]
+    disc = rng.choice(DISCIPLINES, n_courses, p=POIDS_DISCIPLINES)
+    distance = rng.integers(16, 43, n_courses) * 100
+    allocation = rng.integers(5, 120, n_courses) * 1000
+    classe = rng.choice(CLASSES, n_courses)
+    dates = (pd.Timestamp(debut) + pd.to_timedelta(jour, unit='D')).strftime('%Y-%m-%d').to_numpy()
+
+    # --- Partants ---
+    n = int(nb.sum())
+    course = np.repeat(np.arange(n_courses), nb)
+    debuts = np.cumsum(nb) - nb
+    numero = np.arange(n) - debuts[course] + 1
+    force = rng.normal(0, 1, n)
+    expf = np.exp(force)
+    proba = expf / np.add.reduceat(expf, debuts)[course]
+
+    # Arrivée : force + bruit de Gumbel, rang dans la course
+    ordre = np.lexsort((-(force + rng.gumbel(0, 1, n)), course))
+    rang = np.empty(n, dtype=np.int64)
+    rang[ordre] = np.arange(n) - debuts[course[ordre]] + 1
+    non_classe = (rng.random(n) < 0.05) & (rang > 3)
+    termine = jour[course] <= jour[-1] - jours_a_venir
+
+    def bruit(x, e):
+        return x + rng.normal(0, e, n)
+
+    cote = np.clip(np.round(0.82 / np.clip(bruit(proba, 0.03), 0.005, None), 1), 1.1, 99.0)
+    ia_gagnant = np.clip(bruit(proba, 0.05), 0, 1).round(4)
+    percentile = pd.Series(bruit(force, 0.6)).groupby(course).rank(pct=True).to_numpy()
+    borda = np.round(percentile * nb[course] * 6).astype(int)
+    rapport_sg = np.where(termine & (rang == 1), [_virgule(c) for c in cote], '')
+    rapport_sp = np.where(termine & (rang <= 3), [_virgule(1 + c / 4) for c in cote], '')
+    rank = np.where(~termine, '', np.where(non_classe, rng.choice(NON_CLASSES, n), rang.astype(str)))
+
+    donnees = pd.DataFrame({
+        'date': dates[course],
+        'hippodrome': hippo[course],
+        'Course': [f"R{r}C{c}" for r, c in zip(reunion[course], numero_course[course])],
+        'Numero': numero,
+        'Cheval': [f"CHEVAL {i}" for i in range(1, n + 1)],
+        'Cote': [_virgule(c) for c in cote],
+        'Cote_BZH': np.round(cote * rng.uniform(0.8, 1.25, n), 1),
+        'IA_Gagnant': ia_gagnant,
+        'IA_Couple': np.clip(bruit(proba * 1.8, 0.06), 0, 1).round(4),
+        'IA_Trio': np.clip(bruit(proba * 2.5, 0.08), 0, 1).round(4),
+        'IA_Multi': np.clip(bruit(proba * 3, 0.1), 0, 1).round(4),
+        'IA_Quinte': np.clip(bruit(proba * 3.5, 0.1), 0, 1).round(4),
+        'Note_IA_Decimale': np.round(np.clip(bruit(percentile * 10, 1.5), 0, 10), 2),
+        'Borda': borda,
+        'ELO_Cheval': np.round(bruit(1500 + 70 * force, 50), 1),
+        'ELO_Jockey': np.round(bruit(1500 + 30 * force, 60), 1),
+        'ELO_Entraineur': np.round(bruit(1500 + 25 * force, 60), 1),
+        'ELO_Proprio': np.round(rng.normal(1500, 60, n), 1),
+        'ELO_Eleveur': np.round(rng.normal(1500, 60, n), 1),
+        'Synergie_JCh': np.round(np.clip(bruit(8 + 3 * force, 4), 0, 30), 2),
+        'Taux_Victoire': np.round(np.clip(bruit(0.1 + 0.06 * force, 0.05), 0, 1), 3),
+        'Taux_Place': np.round(np.clip(bruit(0.3 + 0.1 * force, 0.1), 0, 1), 3),
+        'Taux_Incident': np.round(rng.beta(1, 12, n), 3),
+        'Popularite': np.round(proba * 100, 2),
+        'Evo_Popul': np.round(rng.normal(0, 2, n), 2),
+        'Turf_Points': rng.integers(0, 200, n),
+        'Sigma_Horse': np.round(rng.uniform(0, 5, n), 2),
+        'Moy_Alloc': rng.integers(2, 60, n) * 500,
+        'IMDC': np.round(rng.uniform(0, 100, n), 1),
+        'Repos': rng.integers(7, 120, n),
+        'Courses_courues': rng.integers(0, 60, n),
+        'nombre_victoire': rng.integers(0, 8, n),
+        'nombre_place': rng.integers(0, 20, n),
+        'Rang_J': rng.integers(1, 400, n),
+        'Place_Corde': numero,
+        'Musique': _musiques(rng, n, disc[course]),
+        'discipline': disc[course],
+        'nombre_partants': nb[course],
+        'distance': distance[course],
+        'allocation': allocation[course],
+        'Classe_Groupe': classe[course],
+        'age': rng.integers(2, 12, n),
+        'Sexe': rng.choice(['M', 'H', 'F'], n, p=[0.3, 0.35, 0.35]),
+        'ferrure': rng.choice(FERRURES, n, p=[0.55, 0.15, 0.05, 0.15, 0.04, 0.02, 0.04]),
+        'avis_entraineur': rng.choice(['POSITIF', 'NEUTRE', 'NEGATIF'], n, p=[0.3, 0.55, 0.15]),
+        'ExFav': rng.choice(['Oui', 'Non'], n, p=[0.1, 0.9]),
+        'supplemente': rng.choice(['Oui', 'Non'], n, p=[0.05, 0.95]),
+        'Rapport_SG': rapport_sg,
+        'Rapport_SP': rapport_sp,
+        'Rank': rank,
+    })
+
+    classement = np.where(termine & ~non_classe, rang, 0)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'date': donnees['date'],
+        'hippodrome': donnees['hippodrome'],
+        'course_num': donnees['Course'],
+        'cheval': donnees['Cheval'],
+        'numero': numero,
+        'cote': cote,
+        'json_data': [json.dumps(r) for r in donnees.to_dict('records')],
+        'classement': pd.Series(classement).where(classement > 0).astype('Int64'),
+    })
+
+
+def ecrire_base(selections, db_path, features=False):
+    """(Re)crée la table selections de db_path avec ces lignes (+ feature store si features)."""
+    conn = db.get_conn(db_path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS selections")
+        conn.execute(SCHEMA_SELECTIONS)
+        conn.execute("CREATE TABLE IF NOT EXISTS algos (nom TEXT PRIMARY KEY, formule TEXT)")
+        selections.to_sql('selections', conn, if_exists='append', index=False, chunksize=50000)
+        db.migrer_selections(conn)
+        conn.commit()
+        if features:
+            from feature_store import synchroniser_features
+            synchroniser_features(conn)
+    finally:
+        conn.close()
+    return len(selections)
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m donnees_synthetiques", description="Base de sélections synthétique")
+    p.add_argument("db", help="Base SQLite à (re)créer")
+    p.add_argument("--partants", type=int, help="Nombre de chevaux visé (fixe --jours)")
+    p.add_argument("--jours", type=int, default=30)
+    p.add_argument("--reunions", type=int, default=4)
+    p.add_argument("--courses", type=int, default=8, help="Courses par réunion")
+    p.add_argument("--debut", default="2025-01-01")
+    p.add_argument("--a-venir", type=int, default=0, help="Derniers jours sans résultats")
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--features", action="store_true", help="Remplir aussi le feature store")
+    args = p.parse_args(argv)
+
+    selections = generer_selections(args.partants, args.jours, args.reunions, args.courses,
+                                    args.debut, jours_a_venir=args.a_venir, graine=args.graine)
+    ecrire_base(selections, args.db, args.features)
+    print(f"{len(selections)} partants, {selections['date'].min()} -> {selections['date'].max()} : {args.db}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,13 @@ import pandas as pd
 import numpy as np
 import json
 import re
+from formule import compiler_formule
+
+
+# Classements non numériques : non partant, disqualifié, arrêté, tombé...
+CODES_NON_CLASSES = frozenset(
+    ("", "D", "NR", "NP", "DAI", "DB", "AR", "T", "RET", "DIS", "SOL", "NONE", "NAN", "0", "0.0")
+)
 
 
 def parse_classement(val):
@@ -17,13 +24,16 @@ def parse_classement(val):
     except Exception:
         pass
     s = str(val).strip().upper()
-    if s in ("", "D", "NR", "NP", "DAI", "DB", "AR", "T", "RET", "DIS", "SOL", "NONE", "NAN", "0", "0.0"):
+    if s in CODES_NON_CLASSES:
         return 0
     m = re.search(r'\d+', s)
     return int(m.group()) if m else 0
 
 
 def to_numeric_col(s):
+    # Déjà int64/float64 (json typé, feature store) : le passage par str rendrait les mêmes valeurs
+    if len(s) and s.dtype in (np.int64, np.float64):
+        return s.fillna(0.0)
     return pd.to_numeric(s.astype(str).str.replace(',', '.').str.strip(), errors='coerce').fillna(0.0)
 
 
@@ -45,6 +55,81 @@ def safe_rapport(val):
         return 0.0
 
 
+# Versions colonne : mêmes résultats que les fonctions ci-dessus appliquées
+# valeur par valeur. Elles ne dépendent que de str(v) : calcul par opérations
+# str de pandas sur les valeurs distinctes, reporté sur les lignes par table
+# de correspondance (classements, codes course, rapports se répètent beaucoup).
+def str_col(s):
+    """str(v) pour chaque valeur (astype(str) garde les manquants en NaN depuis pandas 3)."""
+    t = s.astype(str)
+    manquants = t.isna()
+    if manquants.any():
+        t = t.astype(object)
+        t[manquants] = [str(v) for v in s[manquants]]
+    return t
+
+
+def par_valeur_distincte(s, calcul):
+    """calcul(Series des str(v) distincts) -> valeurs, reportées sur chaque ligne de s."""
+    zeros_negatifs = pd.api.types.is_float_dtype(s) and bool(np.signbit(s.to_numpy()[s.to_numpy() == 0]).any())
+    if (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s)) and not zeros_negatifs:
+        # Type homogène : on factorise les valeurs, str seulement sur les distinctes
+        # (-0.0 et 0.0 seraient confondus, d'où le passage par str s'il y en a)
+        codes, distinctes = pd.factorize(s, use_na_sentinel=False)
+        distinctes = str_col(pd.Series(distinctes))
+    else:
+        codes, distinctes = pd.factorize(str_col(s), use_na_sentinel=False)
+        distinctes = pd.Series(distinctes)
+    valeurs = np.asarray(calcul(distinctes.reset_index(drop=True)))
+    return pd.Series(valeurs[codes], index=s.index)
+
+
+def _classements(t):
+    t = t.str.strip().str.upper()
+    chiffres = t.str.extract(r'(\d+)', expand=False)
+    classe = (~t.isin(CODES_NON_CLASSES) & chiffres.notna()).to_numpy()
+    # Chiffres ASCII tenant sur 64 bits ; les autres (chiffres unicode, entiers géants) par int()
+    simples = classe & chiffres.str.fullmatch(r'[0-9]{1,18}').fillna(False).to_numpy(dtype=bool)
+    rangs = np.zeros(len(t), dtype=np.int64)
+    rangs[simples] = pd.to_numeric(chiffres[simples]).to_numpy(dtype=np.int64)
+    autres = np.flatnonzero(classe & ~simples)
+    if len(autres):
+        rangs = rangs.astype(object)
+        rangs[autres] = [int(c) for c in chiffres.iloc[autres]]
+        return pd.Series(rangs.tolist())
+    return rangs
+
+
+def parse_classement_col(s):
+    """parse_classement sur une colonne -> entiers, même index."""
+    return par_valeur_distincte(s, _classements)
+
+
+def _codes_course(t):
+    t = t.str.strip().str.upper()
+    m = t.str.extract(r'^(R\d+)?(C\d+)')
+    return (m[0].fillna('') + m[1]).where(m[1].notna(), t)
+
+
+def normalize_course_num_col(s):
+    """normalize_course_num sur une colonne."""
+    return par_valeur_distincte(s, _codes_course)
+
+
+def _rapports(t):
+    # float() sur chaque valeur distincte : to_numeric n'arrondit pas toujours
+    # au flottant le plus proche (écarts d'un ULP sur les décimales longues)
+    return np.fromiter((safe_rapport(v) for v in t), dtype=float, count=len(t))
+
+
+def safe_rapport_col(s):
+    """safe_rapport sur une colonne -> float."""
+    if s.dtype in (np.int64, np.float64):
+        # float(str(v)) == float(v) pour ces types : seul NaN ('nan') vaut 0
+        return s.astype(float).fillna(0.0)
+    return par_valeur_distincte(s, _rapports)
+
+
 def safe_num(df_sub, idx, col='Numero', default=0):
     try:
         if df_sub is None or len(df_sub) <= idx:
@@ -66,77 +151,293 @@ def safe_float(df_sub, idx, col, default=0.0):
 
 
 def eval_formula(df, formula_str):
-    f_py = formula_str.replace('?', ' if ').replace(':', ' else ').replace('""', '0')
+    """Évalue la formule sur tout le DataFrame (compilée, vectorisée)."""
+    return compiler_formule(formula_str).evaluer(df)
+
+
+COLONNES_NUMERIQUES = [
+    'IA_Trio', 'Borda', 'ELO_Cheval', 'ELO_Jockey', 'ELO_Entraineur',
+    'ELO_Proprio', 'ELO_Eleveur', 'Note_IA_Decimale', 'Synergie_JCh',
+    'Cote', 'Taux_Victoire', 'Taux_Place', 'Taux_Incident',
+    'Sigma_Horse', 'Moy_Alloc', 'IA_Gagnant', 'IA_Couple', 'IA_Multi',
+    'IA_Quinte', 'IMDC', 'Popularite', 'Evo_Popul', 'Repos',
+    'Turf_Points', 'TPch_90', 'Moy_TPch_365', 'Moy_TPch_90',
+    'TPJ_365', 'TPJ_90', 'Moy_TPJ_365', 'Moy_TPJ_90',
+    'Cote_BZH', 'Courses_courues', 'nombre_victoire', 'nombre_place',
+    'incident', 'distanceRecord_sec', 'Rang_J'
+]
+COLONNES_TAUX = ['Taux_Victoire', 'Taux_Place', 'Taux_Incident']
+
+# Feature store (table features) : colonnes lues préfixées, valeurs nettoyées
+# mais Taux_* bruts (mise en % dans calculer_colonnes, comme pour json_data)
+TABLE_FEATURES = 'features'
+TABLE_FEATURES_COLONNES = 'features_colonnes'
+TABLE_FEATURES_VERSION = 'features_version'
+# Règles de nettoyage du store ; une autre version en base -> store ignoré puis reconstruit.
+# 1 : Taux_* mis en % à l'import ; 2 : illisibles à 0.0 ; 3 : Taux_* bruts, illisibles NULL
+VERSION_FEATURES = 3
+PREFIXE_FEATURE = 'f:'
+# Colonnes des filtres poussés en SQL, créées vides si aucune ligne lue ne les porte
+ATTR_COLONNES_FILTREES = 'colonnes_filtrees'
+
+
+# Clés json toujours lues : rangs IA+Borda, modes (folie, borda4, rapports) et filtres
+COLONNES_PIPELINE = [
+    'IA_Trio', 'Borda', 'Cote', 'IA_Gagnant', 'IA_Couple', 'ELO_Cheval', 'Taux_Place',
+    'Rapport_SG', 'Rapport_SP', 'Rank', 'rank', 'discipline', 'nombre_partants',
+    'Classe_Groupe', 'distance', 'allocation', 'age', 'Sexe', 'ferrure', 'avis_entraineur',
+    'Musique', 'Courses_courues', 'ExFav', 'supplemente', 'Repos', 'ELO_Jockey', 'Rang_J',
+    'Place_Corde',
+]
+
+
+def colonnes_requises(variables):
+    """Clés json à décoder pour une formule : ses variables, la base des *_Rank et le pipeline."""
+    cols = set(COLONNES_PIPELINE)
+    for v in variables:
+        cols.add(v)
+        if v.endswith('_Rank'):
+            cols.add(v[:-len('_Rank')])
+    cols.update(f"{c}_Rank" for c in list(cols))
+    return cols
+
+
+def ident_sql(nom):
+    """Identifiant SQLite entre guillemets (les clés json ont espaces, accents...)."""
+    return '"' + str(nom).replace('"', '""') + '"'
+
+
+def _colonnes_features(run_query, params, colonnes=None):
+    """[(clé, colonne SQL)] du feature store si toute la période y est, sinon None."""
+    existe = run_query(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (TABLE_FEATURES_VERSION,)
+    )
+    if existe is None or existe.empty:
+        return None
+    version = run_query(f"SELECT MAX(version) AS v FROM {TABLE_FEATURES_VERSION}")
+    if version is None or version['v'].iloc[0] != VERSION_FEATURES:
+        return None
+    manquants = run_query(
+        f"SELECT COUNT(*) AS n FROM selections s LEFT JOIN {TABLE_FEATURES} f ON f.selection_id = s.id "
+        "WHERE s.date BETWEEN ? AND ? AND f.selection_id IS NULL", params
+    )
+    if manquants is None or int(manquants['n'].iloc[0]) > 0:
+        return None
+    reg = run_query(f"SELECT cle, colonne FROM {TABLE_FEATURES_COLONNES} ORDER BY rowid")
+    if reg is None:
+        return None
+    return [(c, col) for c, col in zip(reg['cle'], reg['colonne']) if colonnes is None or c in colonnes]
+
+
+def charger_donnees(run_query, date_start, date_end, colonnes=None, filtres=None):
+    """Charge les données brutes : feature store typé si la période y est complète, sinon json_data.
+
+    colonnes : clés à lire (voir colonnes_requises), None = toutes.
+    filtres : (filtres_c, filtres_ch, filtres_av) poussés dans le WHERE
+    (filtres_sql) ; les filtres pandas restent à appliquer ensuite.
+    """
+    params = (str(date_start), str(date_end))
+    store = _colonnes_features(run_query, params, colonnes)
+    jointure = f" JOIN {TABLE_FEATURES} f ON f.selection_id = s.id"
+    where, where_params, forcees = "", (), []
+    if filtres is not None:
+        from filtres_sql import clause_filtres
+        exprs = None if store is None else {cle: "f." + ident_sql(col) for cle, col in store}
+        where, where_params, forcees = clause_filtres(run_query, params, filtres, colonnes, exprs, jointure)
+    if store is not None:
+        select_f = "".join(
+            f", f.{ident_sql(col)} AS {ident_sql(PREFIXE_FEATURE + cle)}" for cle, col in store
+        )
+        raw_data = run_query(
+            "SELECT s.id, s.date, s.hippodrome, s.course_num, s.numero, s.cheval, s.cote, s.classement"
+            f"{select_f} FROM selections s{jointure} "
+            f"WHERE s.date BETWEEN ? AND ?{where} ORDER BY s.id", params + where_params
+        )
+    else:
+        raw_data = run_query(
+            "SELECT s.id, s.date, s.hippodrome, s.course_num, s.numero, s.cheval, s.cote, s.json_data, "
+            f"s.classement FROM selections s WHERE s.date BETWEEN ? AND ?{where} ORDER BY s.id",
+            params + where_params
+        )
+    if raw_data is not None:
+        raw_data.attrs[ATTR_COLONNES_FILTREES] = forcees
+    return raw_data
 
-    def calc(row):
-        ctx = row.to_dict()
-        ctx.update({'log': np.log, 'sqrt': np.sqrt, 'max': max, 'min': min, 'abs': abs})
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _charger_json(blob):
+    if orjson is not None:
         try:
-            return float(eval(f_py, {"__builtins__": {}}, ctx))
-        except Exception:
-            return 0.0
+            return orjson.loads(blob)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity, entiers géants... : json standard
+    return json.loads(blob)
 
-    return df.apply(calc, axis=1)
 
+def normaliser_cle(k):
+    return str(k).replace(' ', '_').replace('.', '').replace('-', '_')
 
-def charger_donnees(run_query, date_start, date_end):
-    """Charge les données brutes depuis la BDD."""
-    raw_data = run_query(
-        "SELECT id, date, hippodrome, course_num, numero, cheval, cote, json_data, classement "
-        "FROM selections WHERE date BETWEEN ? AND ?",
-        (str(date_start), str(date_end))
-    )
-    return raw_data
+
+COLONNES_FIXES = ['Numero', 'Cheval', 'ID_C', 'hippodrome', 'Cote', 'classement', 'date']
 
 
-def preparer_dataframe(raw_data):
-    """Transforme raw_data en DataFrame nettoyé avec colonnes numériques et rangs."""
-    raw_data['_classement_int'] = raw_data['classement'].apply(parse_classement)
-    raw_data['_course_norm'] = raw_data['course_num'].apply(normalize_course_num)
+def _plan_signature(cles, colonnes):
+    """Pour un jeu de clés json : {clé normalisée: clé brute source}, dans l'ordre des colonnes."""
+    sources = {}
+    for k in cles:
+        sources[normaliser_cle(k)] = k
+    alias = None
+    for k in sources:
+        if 'Borda' in k and k != 'Borda':
+            alias = k
+    if alias is not None:
+        sources['Borda'] = sources[alias]
+    if colonnes is not None:
+        sources = {k: v for k, v in sources.items() if k in colonnes}
+    return sources
+
+
+def decoder_json(blobs, colonnes=None):
+    """Décode tous les json_data en un passage et construit les colonnes une par une.
+
+    La normalisation des clés et l'alias Borda sont résolus une fois par jeu de
+    clés distinct (en pratique un ou deux par import), pas une fois par ligne.
+    Retourne ({colonne: Series}, rang_json) ; les COLONNES_FIXES y sont réservées
+    (valeur None) à leur position d'origine, rang_json = Rank sinon rank par ligne.
+    """
+    n = len(blobs)
+    dicts = [_charger_json(b) if b else {} for b in blobs]
+
+    sig_ids = {}
+    codes = np.fromiter(
+        (sig_ids.setdefault(tuple(d), len(sig_ids)) for d in dicts), dtype=np.intp, count=n
+    )
+    plans = [_plan_signature(sig, colonnes) for sig in sig_ids]
+    lignes_sig = [np.flatnonzero(codes == i) for i in range(len(plans))]
+
+    # Ordre des colonnes : première apparition, comme pd.DataFrame(liste de dicts)
+    ordre = {}
+    for plan in plans:
+        for k in plan:
+            ordre.setdefault(k, None)
+        for k in COLONNES_FIXES:
+            ordre.setdefault(k, None)
+
+    bruts = list(dict.fromkeys(src for plan in plans for src in plan.values()))
+    brut = pd.DataFrame(dicts, columns=bruts) if bruts else pd.DataFrame(index=range(n))
+
+    def colonne(cle):
+        sources = {plan.get(cle) for plan in plans}
+        uniques = sources - {None}
+        if len(uniques) == 1:
+            src = uniques.pop()
+            if all(cle in plan or src not in sig for plan, sig in zip(plans, sig_ids)):
+                return brut[src]
+        vals = np.full(n, np.nan, dtype=object)
+        for plan, lignes in zip(plans, lignes_sig):
+            if cle in plan:
+                vals[lignes] = brut[plan[cle]].to_numpy(dtype=object)[lignes]
+        return pd.Series(vals.tolist())
+
+    cols = {k: (None if k in COLONNES_FIXES else colonne(k)) for k in ordre}
+
+    rang_json = np.full(n, None, dtype=object)
+    for plan, lignes in zip(plans, lignes_sig):
+        cle_rang = 'Rank' if 'Rank' in plan else ('rank' if 'rank' in plan else None)
+        if cle_rang is not None:
+            rang_json[lignes] = brut[plan[cle_rang]].to_numpy(dtype=object)[lignes]
+    return cols, rang_json
+
+
+def _lire_features(raw_data, colonnes=None):
+    """Colonnes du feature store (préfixe PREFIXE_FEATURE) -> ({colonne: Series}, rang_json)."""
+    cols = {}
+    for c in raw_data.columns:
+        if not c.startswith(PREFIXE_FEATURE):
+            continue
+        cle = c[len(PREFIXE_FEATURE):]
+        if cle in COLONNES_FIXES or (colonnes is not None and cle not in colonnes):
+            continue
+        s = raw_data[c].reset_index(drop=True)
+        # Clé absente de toute la période : pas de colonne, comme au décodage json
+        if s.notna().any():
+            cols[cle] = s
+    rang_json = np.full(len(raw_data), None, dtype=object)
+    for cle in ('rank', 'Rank'):
+        if cle in cols:
+            v = cols[cle].to_numpy(dtype=object)
+            ok = pd.notna(v)
+            rang_json[ok] = v[ok]
+    return cols, rang_json
+
+
+def _assembler(raw_data, cols, rang_json):
+    """Ajoute Numero/Cheval/ID_C/hippodrome/Cote/classement/date (colonnes de selections)."""
+    # Classement : résultat en base, sinon Rank/rank du json
+    classement = raw_data['_classement_int'].to_numpy(copy=True)
+    a_completer = np.flatnonzero((classement == 0) & pd.notna(rang_json))
+    if len(a_completer):
+        classement[a_completer] = parse_classement_col(pd.Series(rang_json[a_completer])).to_numpy()
+
+    cols.update({
+        'Numero': pd.Series(raw_data['numero'].to_numpy().astype(int)),
+        'Cheval': pd.Series(raw_data['cheval'].tolist()),
+        'ID_C': pd.Series((
+            raw_data['date'].astype(str) + "_" +
+            raw_data['hippodrome'].astype(str) + "_" +
+            raw_data['_course_norm']
+        ).str.upper().tolist()),
+        'hippodrome': pd.Series(raw_data['hippodrome'].tolist()),
+        'Cote': pd.Series(raw_data['cote'].tolist()),
+        'classement': pd.Series(classement.tolist()),
+        'date': pd.Series(raw_data['date'].astype(str).tolist()),
+    })
+    return pd.DataFrame(cols)
+
+
+def preparer_dataframe(raw_data, colonnes=None):
+    """Transforme raw_data en DataFrame nettoyé avec colonnes numériques et rangs.
+
+    colonnes : ensemble des clés json à garder (voir colonnes_requises), None = toutes.
+    """
+    filtrees = raw_data.attrs.get(ATTR_COLONNES_FILTREES, [])
+    raw_data['_classement_int'] = parse_classement_col(raw_data['classement'])
+    raw_data['_course_norm'] = normalize_course_num_col(raw_data['course_num'])
     raw_data['_dedup_key'] = (
         raw_data['date'].astype(str) + "_" +
         raw_data['hippodrome'].astype(str) + "_" +
         raw_data['_course_norm'] + "_" +
         raw_data['numero'].astype(str)
     )
+    # Tri stable : à classement égal, ordre des id. Le doublon gardé et l'ordre
+    # des chevaux d'une course (départage des ex aequo) ne dépendent pas de la plage chargée
     raw_data = (
-        raw_data.sort_values('_classement_int', ascending=False)
+        raw_data.sort_values('_classement_int', ascending=False, kind='stable')
                 .drop_duplicates(subset='_dedup_key', keep='first')
                 .drop(columns=['_dedup_key'])
     )
 
-    data = []
-    for _, r in raw_data.iterrows():
-        d = json.loads(r['json_data']) if r['json_data'] else {}
-        clean = {str(k).replace(' ', '_').replace('.', '').replace('-', '_'): v for k, v in d.items()}
-        for k in list(clean.keys()):
-            if 'Borda' in k and k != 'Borda':
-                clean['Borda'] = clean[k]
-        cn = normalize_course_num(r['course_num'])
-        id_c = f"{r['date']}_{r['hippodrome']}_{cn}".upper()
-        val_classement = r['_classement_int']
-        if val_classement == 0:
-            rj = clean.get('Rank', clean.get('rank', None))
-            if rj is not None:
-                val_classement = parse_classement(rj)
-        clean.update({
-            'Numero': int(r['numero']),
-            'Cheval': r['cheval'],
-            'ID_C': id_c,
-            'hippodrome': r['hippodrome'],
-            'Cote': r['cote'],
-            'classement': val_classement,
-            'date': str(r['date'])
-        })
-        data.append(clean)
-
-    df = pd.DataFrame(data)
+    if 'json_data' in raw_data.columns:
+        cols, rang_json = decoder_json(raw_data['json_data'].tolist(), colonnes)
+        df = _assembler(raw_data, cols, rang_json)
+    else:
+        cols, rang_json = _lire_features(raw_data, colonnes)
+        df = _assembler(raw_data, cols, rang_json)
     df['classement'] = pd.to_numeric(df['classement'], errors='coerce').fillna(0).astype(int)
+    # Filtres poussés en SQL : la colonne existe sur la période, le filtre pandas doit s'appliquer
+    for c in filtrees:
+        if c not in df.columns:
+            df[c] = np.nan
 
     # Rapports
     for rc in ['Rapport_SG', 'Rapport_SP']:
         if rc in df.columns:
-            df[rc] = df[rc].apply(safe_rapport)
+            df[rc] = safe_rapport_col(df[rc])
         else:
             df[rc] = 0.0
 
@@ -165,22 +466,12 @@ def appliquer_filtres(df, filter_hippo, filter_disc, filter_partants):
 
 def calculer_colonnes(df):
     """Nettoie les colonnes numériques et calcule tous les rangs."""
-    num_cols = [
-        'IA_Trio', 'Borda', 'ELO_Cheval', 'ELO_Jockey', 'ELO_Entraineur',
-        'ELO_Proprio', 'ELO_Eleveur', 'Note_IA_Decimale', 'Synergie_JCh',
-        'Cote', 'Taux_Victoire', 'Taux_Place', 'Taux_Incident',
-        'Sigma_Horse', 'Moy_Alloc', 'IA_Gagnant', 'IA_Couple', 'IA_Multi',
-        'IA_Quinte', 'IMDC', 'Popularite', 'Evo_Popul', 'Repos',
-        'Turf_Points', 'TPch_90', 'Moy_TPch_365', 'Moy_TPch_90',
-        'TPJ_365', 'TPJ_90', 'Moy_TPJ_365', 'Moy_TPJ_90',
-        'Cote_BZH', 'Courses_courues', 'nombre_victoire', 'nombre_place',
-        'incident', 'distanceRecord_sec', 'Rang_J'
-    ]
-    for c in num_cols:
+    for c in COLONNES_NUMERIQUES:
         if c in df.columns:
             df[c] = to_numeric_col(df[c])
 
-    for tc in ['Taux_Victoire', 'Taux_Place', 'Taux_Incident']:
+    # Taux_* en % : décidé sur tout le frame chargé, json_data comme feature store
+    for tc in COLONNES_TAUX:
         if tc in df.columns and df[tc].max() <= 1.0:
             df[tc] = df[tc] * 100
 
@@ -219,35 +510,130 @@ def calculer_colonnes(df):
     return df
 
 
+def _norm_min_max(s, g):
+    """Min-max par course ; 0.5 quand la course n'a pas d'écart."""
+    s_min = g[s.name].transform('min')
+    s_max = g[s.name].transform('max')
+    return ((s - s_min) / (s_max - s_min)).where(s_max > s_min, 0.5)
+
+
 def calculer_scores(df, formule_raw):
     """Calcule SCORE, SCORE_Rank, HYBRIDE, HYBRIDE_Rank."""
     df['SCORE'] = eval_formula(df, formule_raw)
     df['SCORE_Rank'] = df.groupby('ID_C')['SCORE'].rank(ascending=False, method='min').astype(int)
 
-    for cid in df['ID_C'].unique():
-        mask = df['ID_C'] == cid
-        df_c = df[mask]
-
-        s_min, s_max = df_c['SCORE'].min(), df_c['SCORE'].max()
-        df.loc[mask, 'SCORE_Norm'] = (df_c['SCORE'] - s_min) / (s_max - s_min) if s_max > s_min else 0.5
-
-        if 'IA_Borda_Score' in df_c.columns:
-            ib_min, ib_max = df_c['IA_Borda_Score'].min(), df_c['IA_Borda_Score'].max()
-            df.loc[mask, 'IA_Borda_Norm'] = (df_c['IA_Borda_Score'] - ib_min) / (ib_max - ib_min) if ib_max > ib_min else 0.5
-        else:
-            df.loc[mask, 'IA_Borda_Norm'] = 0.0
+    g = df.groupby('ID_C', sort=False)
+    df['SCORE_Norm'] = _norm_min_max(df['SCORE'], g)
+    df['IA_Borda_Norm'] = _norm_min_max(df['IA_Borda_Score'], g) if 'IA_Borda_Score' in df.columns else 0.0
 
-        cmin = df_c['Cote'].min() if 'Cote' in df_c.columns else 5
-        w_ia, w_f = (0.65, 0.35) if cmin < 3 else ((0.55, 0.45) if cmin < 5 else (0.35, 0.65))
-        df.loc[mask, 'HYBRIDE'] = w_f * df.loc[mask, 'SCORE_Norm'] + w_ia * df.loc[mask, 'IA_Borda_Norm']
+    # Poids selon la cote du favori de la course
+    if 'Cote' in df.columns:
+        cmin = g['Cote'].transform('min').to_numpy()
+        w_ia = np.select([cmin < 3, cmin < 5], [0.65, 0.55], 0.35)
+        w_f = np.select([cmin < 3, cmin < 5], [0.35, 0.45], 0.65)
+    else:
+        w_ia, w_f = 0.35, 0.65
+    df['HYBRIDE'] = w_f * df['SCORE_Norm'] + w_ia * df['IA_Borda_Norm']
 
     df['HYBRIDE_Rank'] = df.groupby('ID_C')['HYBRIDE'].rank(ascending=False, method='min').astype(int)
     return df
 
 
-def get_courses(df):
+def top_k_positions(valeurs, course, debuts, fins, k, plus_petit=False):
+    """Top k par course d'un vecteur aligné sur des lignes groupées par course.
+
+    course : rang de la course de chaque ligne ; debuts/fins : bornes des courses.
+    Renvoie (courses, k) positions, -1 en bourrage ; ordre nlargest/nsmallest.
+    """
+    nan = np.isnan(valeurs)
+    tri = np.where(nan, 0.0, valeurs if plus_petit else -valeurs)
+    ordre = np.lexsort((tri, nan, course))
+    rang = np.arange(len(ordre)) - np.repeat(debuts, fins - debuts)
+    garde = rang < k
+    top = np.full((len(debuts), k), -1, dtype=np.int64)
+    top[course[garde], rang[garde]] = ordre[garde]
+    return top
+
+
+class CourseIndex:
+    """Index des courses : lignes triées par ID_C + bornes de chaque course.
+
+    Construit une fois après calculer_scores ; course(cid) renvoie la vue
+    d'une course par tranche iloc au lieu d'un df[df['ID_C'] == cid].
+    L'ordre des chevaux dans une course est celui du DataFrame d'origine.
+    """
+
+    def __init__(self, df):
+        self.df = df.sort_values('ID_C', kind='stable')
+        ids = self.df['ID_C'].to_numpy()
+        n = len(ids)
+        debuts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if n else np.zeros(0, dtype=int)
+        fins = np.r_[debuts[1:], n].astype(int)
+        self.courses = list(ids[debuts])
+        self.debuts, self.fins = debuts, fins
+        self._bornes = dict(zip(self.courses, zip(debuts.tolist(), fins.tolist())))
+        arrivee = (self.df['classement'] > 0).to_numpy()
+        self.terminees = np.logical_or.reduceat(arrivee, debuts) if n else np.zeros(0, dtype=bool)
+        self._rangs = {c: i for i, c in enumerate(self.courses)}
+        self._course = np.repeat(np.arange(len(self.courses)), fins - debuts)
+        self._numeros = self.df['Numero'].to_numpy(dtype=float) if 'Numero' in self.df.columns else np.zeros(n)
+        self._top = {}
+
+    def __len__(self):
+        return len(self.courses)
+
+    def rang(self, cid):
+        """Rang de la course cid dans courses / debuts / fins (None si inconnue)."""
+        return self._rangs.get(cid)
+
+    def course(self, cid):
+        """Chevaux de la course cid (vue vide si inconnue)."""
+        debut, fin = self._bornes.get(cid, (0, 0))
+        return self.df.iloc[debut:fin]
+
+    def top_k(self, col, k, plus_petit=False):
+        """Positions (dans self.df) des k premiers chevaux de chaque course selon col.
+
+        Tableau (courses, k), -1 en bourrage, calculé en un tri pour toutes les
+        courses et mis en cache. Même ordre que nlargest/nsmallest (keep='first') :
+        valeur, puis ordre d'origine, NaN en dernier.
+        """
+        cle = (col, k, plus_petit)
+        if cle not in self._top:
+            v = self.df[col].to_numpy(dtype=float)
+            self._top[cle] = top_k_positions(v, self._course, self.debuts, self.fins, k, plus_petit)
+        return self._top[cle]
+
+    def top_numeros(self, col, k, plus_petit=False):
+        """Numéros des k premiers de chaque course : tableau (courses, k), -1 en bourrage."""
+        pos = self.top_k(col, k, plus_petit)
+        if not len(self._numeros):
+            return pos
+        num = np.nan_to_num(self._numeros[pos], nan=-1).astype(np.int64)
+        return np.where(pos >= 0, num, -1)
+
+    def top(self, cid, col, k, plus_petit=False):
+        """Numéros des k premiers de la course cid (liste)."""
+        if cid not in self._rangs:
+            return []
+        ligne = self.top_numeros(col, k, plus_petit)[self._rangs[cid]]
+        return ligne[self.top_k(col, k, plus_petit)[self._rangs[cid]] >= 0].tolist()
+
+    def top_lignes(self, cid, col, k, plus_petit=False):
+        """Lignes des k premiers de la course cid (= df_c.nlargest / nsmallest)."""
+        if cid not in self._rangs:
+            return self.df.iloc[0:0]
+        pos = self.top_k(col, k, plus_petit)[self._rangs[cid]]
+        return self.df.iloc[pos[pos >= 0]]
+
+    def get_courses(self):
+        courses_avec = [c for c, t in zip(self.courses, self.terminees) if t]
+        courses_sans = [c for c, t in zip(self.courses, self.terminees) if not t]
+        return list(self.courses), courses_avec, courses_sans
+
+
+def get_courses(df, index=None):
     """Retourne all_courses, courses_avec (terminées), courses_sans (en attente)."""
-    all_courses = sorted(df['ID_C'].unique())
-    courses_avec = [c for c in all_courses if (df[df['ID_C'] == c]['classement'] > 0).any()]
-    courses_sans = [c for c in all_courses if c not in courses_avec]
-    return all_courses, courses_avec, courses_sans
\ No newline at end of file
+    if index is None:
+        index = CourseIndex(df)
+    return index.get_courses()
\ No newline at end of file
@@ -0,0 +1,591 @@
+"""
+equivalence.py — Harnais d'équivalence moteur de référence / moteur optimisé
+La référence est la chaîne d'origine, figée ici : json.loads ligne par ligne,
+eval() cheval par cheval, normalisation course par course, concordances
+calculées course par course (strategies.calculer_confiance_*). Le moteur
+optimisé est celui d'engine / strategies, ou un module candidat (--moteur)
+qui redéfinit tout ou partie des mêmes fonctions.
+
+    python -m equivalence --du 2026-01-01 --au 2026-01-31
+    python -m equivalence --synthetique 20000 --algos "🔷 Borda Pure" --tol 1e-6
+    python -m equivalence --du 2026-01-01 --au 2026-01-31 --moteur engine_v2
+
+Compare SCORE / HYBRIDE / normalisations / rangs cheval par cheval (tolérance
+relative --tol), les tops F / IA / H et la concordance de chaque course, puis
+affiche la première course divergente. Code retour 1 si un écart est trouvé.
+
+Écart attendu : preparer_dataframe trie de façon stable avant de dédoublonner,
+la référence garde le tri non stable d'origine. Les courses dont l'écart
+s'explique par ce seul changement (doublon à classement égal, ordre des
+chevaux à classement égal) sont comptées à part et ne font pas échouer.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import engine
+import strategies
+from engine import CourseIndex
+from formule import compiler_formule
+from utils_algo import FORMULES_PRESET
+from algo_cli import requeteur
+
+
+# =====================================================
+# RÉFÉRENCE (figée, ne pas optimiser)
+# Copies de la version d'origine d'engine : les fonctions
+# du moteur courant ne sont pas appelées ici
+# =====================================================
+def parse_classement(val):
+    if val is None:
+        return 0
+    try:
+        if pd.isna(val):
+            return 0
+    except Exception:
+        pass
+    s = str(val).strip().upper()
+    if s in ("", "D", "NR", "NP", "DAI", "DB", "AR", "T", "RET", "DIS", "SOL", "NONE", "NAN", "0", "0.0"):
+        return 0
+    m = re.search(r'\d+', s)
+    return int(m.group()) if m else 0
+
+
+def to_numeric_col(s):
+    return pd.to_numeric(s.astype(str).str.replace(',', '.').str.strip(), errors='coerce').fillna(0.0)
+
+
+def normalize_course_num(cn):
+    cn = str(cn).strip().upper()
+    m = re.match(r'(R\d+)?(C\d+)', cn)
+    if m:
+        return f"{m.group(1) or ''}{m.group(2)}"
+    return cn
+
+
+def safe_rapport(val):
+    if val is None or str(val).strip() in ('', '0', '0.0', 'nan', 'None'):
+        return 0.0
+    s = str(val).replace(',', '.').strip()
+    try:
+        return float(s)
+    except Exception:
+        return 0.0
+
+
+def eval_formula(df, formula_str):
+    f_py = formula_str.replace('?', ' if ').replace(':', ' else ').replace('""', '0')
+
+    def calc(row):
+        ctx = row.to_dict()
+        ctx.update({'log': np.log, 'sqrt': np.sqrt, 'max': max, 'min': min, 'abs': abs})
+        try:
+            return float(eval(f_py, {"__builtins__": {}}, ctx))
+        except Exception:
+            return 0.0
+
+    return df.apply(calc, axis=1)
+
+
+def charger_donnees_reference(run_query, date_start, date_end):
+    """Charge les données brutes depuis la BDD."""
+    raw_data = run_query(
+        "SELECT id, date, hippodrome, course_num, numero, cheval, cote, json_data, classement "
+        "FROM selections WHERE date BETWEEN ? AND ?",
+        (str(date_start), str(date_end))
+    )
+    return raw_data
+
+
+def preparer_dataframe_reference(raw_data):
+    raw_data = raw_data.copy()
+    raw_data['_classement_int'] = raw_data['classement'].apply(parse_classement)
+    raw_data['_course_norm'] = raw_data['course_num'].apply(normalize_course_num)
+    raw_data['_dedup_key'] = (
+        raw_data['date'].astype(str) + "_" +
+        raw_data['hippodrome'].astype(str) + "_" +
+        raw_data['_course_norm'] + "_" +
+        raw_data['numero'].astype(str)
+    )
+    raw_data = (
+        raw_data.sort_values('_classement_int', ascending=False)
+                .drop_duplicates(subset='_dedup_key', keep='first')
+                .drop(columns=['_dedup_key'])
+    )
+
+    data = []
+    for _, r in raw_data.iterrows():
+        d = json.loads(r['json_data']) if r['json_data'] else {}
+        clean = {str(k).replace(' ', '_').replace('.', '').replace('-', '_'): v for k, v in d.items()}
+        for k in list(clean.keys()):
+            if 'Borda' in k and k != 'Borda':
+                clean['Borda'] = clean[k]
+        cn = normalize_course_num(r['course_num'])
+        id_c = f"{r['date']}_{r['hippodrome']}_{cn}".upper()
+        val_classement = r['_classement_int']
+        if val_classement == 0:
+            rj = clean.get('Rank', clean.get('rank', None))
+            if rj is not None:
+                val_classement = parse_classement(rj)
+        clean.update({
+            'Numero': int(r['numero']),
+            'Cheval': r['cheval'],
+            'ID_C': id_c,
+            'hippodrome': r['hippodrome'],
+            'Cote': r['cote'],
+            'classement': val_classement,
+            'date': str(r['date'])
+        })
+        data.append(clean)
+
+    df = pd.DataFrame(data)
+    df['classement'] = pd.to_numeric(df['classement'], errors='coerce').fillna(0).astype(int)
+    for rc in ['Rapport_SG', 'Rapport_SP']:
+        if rc in df.columns:
+            df[rc] = df[rc].apply(safe_rapport)
+        else:
+            df[rc] = 0.0
+    if 'discipline' not in df.columns:
+        df['discipline'] = ''
+    if 'nombre_partants' not in df.columns:
+        df['nombre_partants'] = 0
+    df['nombre_partants'] = pd.to_numeric(
+        df['nombre_partants'].astype(str).str.strip(), errors='coerce'
+    ).fillna(0).astype(int)
+    return df
+
+
+def calculer_colonnes_reference(df):
+    num_cols = [
+        'IA_Trio', 'Borda', 'ELO_Cheval', 'ELO_Jockey', 'ELO_Entraineur',
+        'ELO_Proprio', 'ELO_Eleveur', 'Note_IA_Decimale', 'Synergie_JCh',
+        'Cote', 'Taux_Victoire', 'Taux_Place', 'Taux_Incident',
+        'Sigma_Horse', 'Moy_Alloc', 'IA_Gagnant', 'IA_Couple', 'IA_Multi',
+        'IA_Quinte', 'IMDC', 'Popularite', 'Evo_Popul', 'Repos',
+        'Turf_Points', 'TPch_90', 'Moy_TPch_365', 'Moy_TPch_90',
+        'TPJ_365', 'TPJ_90', 'Moy_TPJ_365', 'Moy_TPJ_90',
+        'Cote_BZH', 'Courses_courues', 'nombre_victoire', 'nombre_place',
+        'incident', 'distanceRecord_sec', 'Rang_J'
+    ]
+    for c in num_cols:
+        if c in df.columns:
+            df[c] = to_numeric_col(df[c])
+    for tc in ['Taux_Victoire', 'Taux_Place', 'Taux_Incident']:
+        if tc in df.columns and df[tc].max() <= 1.0:
+            df[tc] = df[tc] * 100
+
+    rank_desc = [
+        'IA_Trio', 'Borda', 'ELO_Cheval', 'ELO_Jockey', 'ELO_Entraineur',
+        'ELO_Proprio', 'ELO_Eleveur', 'Note_IA_Decimale', 'Synergie_JCh',
+        'Taux_Victoire', 'Taux_Place', 'Turf_Points', 'TPch_90',
+        'IA_Gagnant', 'IA_Couple', 'IA_Multi', 'IA_Quinte', 'Sigma_Horse',
+        'Popularite'
+    ]
+    for c in rank_desc:
+        cr = f"{c}_Rank"
+        if c in df.columns and cr not in df.columns:
+            df[cr] = df.groupby('ID_C')[c].rank(ascending=False, method='min')
+        elif cr in df.columns:
+            df[cr] = to_numeric_col(df[cr])
+    for c in ['Cote', 'Cote_BZH']:
+        cr = f"{c}_Rank"
+        if c in df.columns and cr not in df.columns:
+            df[cr] = df.groupby('ID_C')[c].rank(ascending=True, method='min')
+        elif cr in df.columns:
+            df[cr] = to_numeric_col(df[cr])
+    for c in df.columns:
+        if c.endswith('_Rank'):
+            df[c] = to_numeric_col(df[c])
+
+    if 'IA_Trio_Rank' in df.columns and 'Borda_Rank' in df.columns:
+        df['IA_Borda_Score'] = (1 / df['IA_Trio_Rank'].clip(lower=1)) + (1 / df['Borda_Rank'].clip(lower=1))
+        df['IA_Borda_Rank'] = df.groupby('ID_C')['IA_Borda_Score'].rank(ascending=False, method='min').astype(int)
+    return df
+
+
+def calculer_scores_reference(df, formule_raw):
+    df['SCORE'] = eval_formula(df, formule_raw)
+    df['SCORE_Rank'] = df.groupby('ID_C')['SCORE'].rank(ascending=False, method='min').astype(int)
+
+    for cid in df['ID_C'].unique():
+        mask = df['ID_C'] == cid
+        df_c = df[mask]
+
+        s_min, s_max = df_c['SCORE'].min(), df_c['SCORE'].max()
+        df.loc[mask, 'SCORE_Norm'] = (df_c['SCORE'] - s_min) / (s_max - s_min) if s_max > s_min else 0.5
+
+        if 'IA_Borda_Score' in df_c.columns:
+            ib_min, ib_max = df_c['IA_Borda_Score'].min(), df_c['IA_Borda_Score'].max()
+            df.loc[mask, 'IA_Borda_Norm'] = (df_c['IA_Borda_Score'] - ib_min) / (ib_max - ib_min) if ib_max > ib_min else 0.5
+        else:
+            df.loc[mask, 'IA_Borda_Norm'] = 0.0
+
+        cmin = df_c['Cote'].min() if 'Cote' in df_c.columns else 5
+        w_ia, w_f = (0.65, 0.35) if cmin < 3 else ((0.55, 0.45) if cmin < 5 else (0.35, 0.65))
+        df.loc[mask, 'HYBRIDE'] = w_f * df.loc[mask, 'SCORE_Norm'] + w_ia * df.loc[mask, 'IA_Borda_Norm']
+
+    df['HYBRIDE_Rank'] = df.groupby('ID_C')['HYBRIDE'].rank(ascending=False, method='min').astype(int)
+    return df
+
+
+# Tops comparés : (nom, colonne, k, plus_petit)
+TOPS = [
+    ('F', 'SCORE', 4, False),
+    ('H', 'HYBRIDE', 4, False),
+    ('IA', 'IA_Borda_Rank', 3, True),
+    ('Borda', 'Borda', 4, False),
+]
+
+# Mode -> (concordance par course, concordance par lot, pastille)
+CONCORDANCES = {
+    'simple': ('calculer_confiance_simple', 'calculer_confiance_simple_lot', 'get_pastille_simple'),
+    'duo': ('calculer_confiance_duo', 'calculer_confiance_duo_lot', 'get_pastille_duo'),
+    'trio': ('calculer_confiance_trio', 'calculer_confiance_trio_lot', 'get_pastille_trio'),
+    'borda4': ('calculer_confiance_borda4', 'calculer_confiance_borda4_lot', 'get_pastille_borda4'),
+}
+
+
+# Colonnes lues par les tops et les concordances : les vues par course
+# n'emportent qu'elles (mêmes tests de présence, nlargest moins coûteux)
+COLONNES_COURSE = ['ID_C', 'Numero', 'SCORE', 'HYBRIDE', 'IA_Borda_Rank', 'IA_Couple_Rank',
+                   'IA_Gagnant', 'Borda', 'Borda_Rank']
+
+
+def _par_course(df):
+    return df[[c for c in COLONNES_COURSE if c in df.columns]].groupby('ID_C', sort=False)
+
+
+def choix_reference(df):
+    """{(ID_C, top): [Numéros]} par nlargest / nsmallest course par course."""
+    choix = {}
+    for cid, df_c in _par_course(df):
+        for nom, col, k, plus_petit in TOPS:
+            if col in df_c.columns:
+                top = df_c.nsmallest(k, col) if plus_petit else df_c.nlargest(k, col)
+                choix[(cid, nom)] = top['Numero'].astype(int).tolist()
+    return choix
+
+
+def concordances_reference(df):
+    """{(ID_C, mode): (concordance, unanime, pastille_label)} course par course."""
+    res = {}
+    for cid, df_c in _par_course(df):
+        for mode, (par_course, _, pastille) in CONCORDANCES.items():
+            conc, detail = getattr(strategies, par_course)(df_c)
+            unanime = bool(detail.get('unanime', False))
+            res[(cid, mode)] = (int(conc), unanime, getattr(strategies, pastille)(conc, unanime)[1])
+    return res
+
+
+# =====================================================
+# MOTEUR OPTIMISÉ
+# =====================================================
+def moteur_optimise(module=None):
+    """Fonctions du moteur courant, remplacées par celles que module définit."""
+    fonctions = {
+        'charger_donnees': engine.charger_donnees,
+        'preparer_dataframe': engine.preparer_dataframe,
+        'calculer_colonnes': engine.calculer_colonnes,
+        'calculer_scores': engine.calculer_scores,
+        **{lot: getattr(strategies, lot) for _, lot, _ in CONCORDANCES.values()},
+    }
+    if module:
+        candidat = importlib.import_module(module)
+        fonctions.update({nom: getattr(candidat, nom) for nom in fonctions if hasattr(candidat, nom)})
+    return fonctions
+
+
+def choix_optimise(index):
+    choix = {}
+    for nom, col, k, plus_petit in TOPS:
+        if col not in index.df.columns:
+            continue
+        pos, nums = index.top_k(col, k, plus_petit), index.top_numeros(col, k, plus_petit)
+        for cid, p, n in zip(index.courses, pos, nums):
+            choix[(cid, nom)] = n[p >= 0].tolist()
+    return choix
+
+
+def concordances_optimise(index, fonctions):
+    res = {}
+    for mode, (_, lot, _) in CONCORDANCES.items():
+        table = fonctions[lot](index)
+        for cid, conc, unanime, label in zip(table.index, table['concordance'].tolist(),
+                                             table['unanime'].tolist(), table['pastille_label'].tolist()):
+            res[(cid, mode)] = (int(conc), bool(unanime), label)
+    return res
+
+
+# =====================================================
+# COMPARAISON
+# =====================================================
+def _ecarts_colonne(ref, opt, col, tol):
+    a, b = ref[col], opt[col]
+    try:
+        fa, fb = a.to_numpy(dtype=float), b.to_numpy(dtype=float)
+    except (TypeError, ValueError):
+        differe = ~((a == b) | (a.isna() & b.isna())).to_numpy()
+    else:
+        differe = ~(np.isclose(fa, fb, rtol=tol, atol=tol) | (np.isnan(fa) & np.isnan(fb)))
+    return pd.DataFrame({
+        'ID_C': ref.index.get_level_values('ID_C')[differe],
+        'Numero': ref.index.get_level_values('Numero')[differe],
+        'etape': 'cheval', 'element': col,
+        'reference': a.to_numpy()[differe], 'optimise': b.to_numpy()[differe],
+    })
+
+
+def comparer_chevaux(ref, opt, colonnes, tol=1e-9):
+    """Écarts cheval par cheval (alignés sur ID_C + Numero) sur les colonnes communes."""
+    ref = ref.set_index(['ID_C', 'Numero'])
+    opt = opt.set_index(['ID_C', 'Numero'])
+    manquants = ref.index.difference(opt.index)
+    en_trop = opt.index.difference(ref.index)
+    lignes = [pd.DataFrame({
+        'ID_C': idx.get_level_values('ID_C'), 'Numero': idx.get_level_values('Numero'),
+        'etape': 'cheval', 'element': '(ligne)', 'reference': present, 'optimise': not present,
+    }) for idx, present in ((manquants, True), (en_trop, False)) if len(idx)]
+    communs = ref.index.intersection(opt.index)
+    ref, opt = ref.loc[communs], opt.loc[communs]
+    for col in colonnes:
+        if col in ref.columns and col in opt.columns:
+            lignes.append(_ecarts_colonne(ref, opt, col, tol))
+        elif col in ref.columns or col in opt.columns:
+            lignes.append(pd.DataFrame([{'ID_C': None, 'Numero': None, 'etape': 'cheval', 'element': col,
+                                         'reference': col in ref.columns, 'optimise': col in opt.columns}]))
+    return pd.concat(lignes, ignore_index=True) if lignes else pd.DataFrame()
+
+
+def comparer_courses(ref, opt, etape):
+    """Écarts entre deux dictionnaires {(ID_C, élément): valeur}."""
+    lignes = [
+        {'ID_C': cid, 'Numero': None, 'etape': etape, 'element': el,
+         'reference': ref.get((cid, el)), 'optimise': opt.get((cid, el))}
+        for cid, el in sorted(set(ref) | set(opt))
+        if ref.get((cid, el)) != opt.get((cid, el))
+    ]
+    return pd.DataFrame(lignes, columns=['ID_C', 'Numero', 'etape', 'element', 'reference', 'optimise'])
+
+
+# =====================================================
+# ÉCARTS ATTENDUS
+# preparer_dataframe trie de façon stable avant de
+# dédoublonner ; la référence garde le tri non stable
+# d'origine, sur les lignes dans l'ordre rendu par SQLite.
+# Seules différences voulues :
+# - 'doublon' : clé en double à classement égal, lignes
+#   différentes -> la ligne gardée peut changer ;
+# - 'egalite' : chevaux à classement égal rangés autrement
+#   dans la course -> les égalités de score des tops et
+#   concordances peuvent être départagées autrement.
+# =====================================================
+ATTR_DOUBLONS_EGAUX = 'courses_doublons_egaux'
+
+
+def courses_doublons_egaux(raw):
+    """ID_C des courses dont un doublon de clé a plusieurs lignes différentes au classement maximal."""
+    raw = raw.copy()
+    raw['_classement_int'] = raw['classement'].apply(parse_classement)
+    raw['_course_norm'] = raw['course_num'].apply(normalize_course_num)
+    cle = (raw['date'].astype(str) + "_" + raw['hippodrome'].astype(str) + "_" +
+           raw['_course_norm'] + "_" + raw['numero'].astype(str))
+    tete = raw['_classement_int'] == raw.groupby(cle)['_classement_int'].transform('max')
+    lignes = raw.loc[tete, ['cheval', 'cote', 'json_data']].astype(str)
+    differentes = lignes.groupby(cle[tete]).nunique().max(axis=1) > 1
+    ambigus = raw[tete & cle.isin(differentes.index[differentes])]
+    return sorted(set(
+        (ambigus['date'].astype(str) + "_" + ambigus['hippodrome'].astype(str) + "_" +
+         ambigus['_course_norm']).str.upper()
+    ))
+
+
+def separer_attendus(ecarts, ref, opt, opt_choix, opt_conc, doublons):
+    """Écarts -> (inattendus, attendus avec 'cause').
+
+    'egalite' : course sans écart cheval dont les tops et concordances de la
+    référence, recalculés avec les chevaux dans l'ordre du moteur, sont ceux
+    du moteur.
+    """
+    cause = pd.Series(None, index=ecarts.index, dtype=object)
+    if ecarts.empty:
+        return ecarts, ecarts.assign(cause=cause)
+    cause[ecarts['ID_C'].isin(doublons)] = 'doublon'
+    restants = ecarts[cause.isna() & ecarts['ID_C'].notna()]
+    candidates = set(restants['ID_C']) - set(restants.loc[restants['etape'] == 'cheval', 'ID_C'])
+    if candidates:
+        ordre = {k: i for i, k in enumerate(zip(opt['ID_C'], opt['Numero']))}
+        sous = ref[ref['ID_C'].isin(candidates)]
+        sous = sous.iloc[np.argsort([ordre.get(k, -1) for k in zip(sous['ID_C'], sous['Numero'])], kind='stable')]
+
+        def restreint(d):
+            return {k: v for k, v in d.items() if k[0] in candidates}
+
+        encore = pd.concat([
+            comparer_courses(choix_reference(sous), restreint(opt_choix), 'top'),
+            comparer_courses(concordances_reference(sous), restreint(opt_conc), 'concordance'),
+        ])
+        expliquees = candidates - set(encore['ID_C'])
+        cause[ecarts['ID_C'].isin(expliquees) & cause.isna()] = 'egalite'
+    attendu = cause.notna().to_numpy()
+    return ecarts[~attendu].reset_index(drop=True), ecarts[attendu].assign(cause=cause[attendu])
+
+
+def colonnes_comparees(formule_raw):
+    variables = compiler_formule(formule_raw).variables
+    return ['classement', 'Cote', 'Rapport_SG', 'Rapport_SP', 'nombre_partants',
+            *sorted(set(variables) | {f"{v}_Rank" for v in variables}),
+            'IA_Borda_Score', 'IA_Borda_Rank', 'SCORE', 'SCORE_Rank', 'SCORE_Norm',
+            'IA_Borda_Norm', 'HYBRIDE', 'HYBRIDE_Rank']
+
+
+def preparer_reference(run_query, date_start, date_end):
+    """Données de référence avant formule (communes à tous les algos)."""
+    raw = charger_donnees_reference(run_query, date_start, date_end)
+    if raw is None or raw.empty:
+        return None
+    base = calculer_colonnes_reference(preparer_dataframe_reference(raw))
+    base.attrs[ATTR_DOUBLONS_EGAUX] = courses_doublons_egaux(raw)
+    return base
+
+
+def comparer_moteurs(run_query, date_start, date_end, formule_raw, tol=1e-9, fonctions=None, base_ref=None):
+    """Référence vs moteur optimisé sur une période -> {'ecarts', 'premiere_course', 'durees', ...}."""
+    fonctions = fonctions or moteur_optimise()
+    durees = {}
+
+    t0 = time.perf_counter()
+    base_ref = base_ref if base_ref is not None else preparer_reference(run_query, date_start, date_end)
+    if base_ref is None:
+        return None
+    ref = calculer_scores_reference(base_ref.copy(), formule_raw)
+    ref_choix, ref_conc = choix_reference(ref), concordances_reference(ref)
+    durees['reference_s'] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    colonnes = engine.colonnes_requises(compiler_formule(formule_raw).variables)
+    raw = fonctions['charger_donnees'](run_query, date_start, date_end, colonnes)
+    opt = fonctions['preparer_dataframe'](raw, colonnes)
+    opt = fonctions['calculer_scores'](fonctions['calculer_colonnes'](opt), formule_raw)
+    index = CourseIndex(opt)
+    opt_choix, opt_conc = choix_optimise(index), concordances_optimise(index, fonctions)
+    durees['optimise_s'] = round(time.perf_counter() - t0, 3)
+
+    ecarts = pd.concat([
+        comparer_chevaux(ref, opt, colonnes_comparees(formule_raw), tol),
+        comparer_courses(ref_choix, opt_choix, 'top'),
+        comparer_courses(ref_conc, opt_conc, 'concordance'),
+    ], ignore_index=True)
+    ecarts, attendus = separer_attendus(ecarts, ref, opt, opt_choix, opt_conc,
+                                        base_ref.attrs.get(ATTR_DOUBLONS_EGAUX, []))
+    courses = sorted(c for c in ecarts['ID_C'].dropna().unique()) if not ecarts.empty else []
+    return {
+        'chevaux': len(ref), 'courses': ref['ID_C'].nunique(),
+        'ecarts': ecarts, 'premiere_course': courses[0] if courses else None,
+        'courses_divergentes': len(courses), 'attendus': attendus,
+        'courses_attendues': attendus['ID_C'].nunique() if not attendus.empty else 0, **durees,
+    }
+
+
+_ETAT = {}
+
+
+def _init_worker(etat):
+    _ETAT.update(etat)
+
+
+def _comparer_algo(formule_raw):
+    """Un algo dans un processus : la base de référence est partagée via _init_worker."""
+    e = _ETAT
+    with contextlib.redirect_stdout(io.StringIO()):
+        return comparer_moteurs(requeteur(e['db_path']), e['du'], e['au'], formule_raw, e['tol'],
+                                moteur_optimise(e['moteur']), e['base_ref'])
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def parser():
+    p = argparse.ArgumentParser(prog="python -m equivalence", description="Équivalence moteur de référence / optimisé")
+    p.add_argument("--du", help="Début de la période (AAAA-MM-JJ)")
+    p.add_argument("--au", help="Fin de la période (défaut : --du)")
+    p.add_argument("--db", default=None, help="Base SQLite (défaut : celle de l'application)")
+    p.add_argument("--synthetique", type=int, metavar="CHEVAUX",
+                   help="Base générée par donnees_synthetiques au lieu de --db")
+    p.add_argument("--graine", type=int, default=0)
+    p.add_argument("--algos", nargs="+", choices=list(FORMULES_PRESET), help="Presets (défaut : tous)")
+    p.add_argument("--formule", action="append", default=[], help="Formule à ajouter (répétable)")
+    p.add_argument("--tol", type=float, default=1e-9, help="Tolérance relative et absolue des flottants")
+    p.add_argument("--moteur", help="Module candidat (fonctions engine / strategies de même nom)")
+    p.add_argument("--workers", type=int, help="Processus (défaut : nombre de CPU)")
+    p.add_argument("--max-lignes", type=int, default=20, help="Écarts affichés pour la première course")
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    db_path = args.db
+    if args.synthetique:
+        from donnees_synthetiques import generer_selections, ecrire_base
+        db_path = os.path.join(tempfile.mkdtemp(prefix="turfpro_equiv_"), "synthetique.db")
+        selections = generer_selections(args.synthetique, graine=args.graine)
+        ecrire_base(selections, db_path)
+        args.du, args.au = args.du or selections['date'].min(), args.au or selections['date'].max()
+    if not args.du:
+        raise SystemExit("--du ou --synthetique requis")
+    date_start, date_end = args.du, args.au or args.du
+    run_query = requeteur(db_path)
+
+    algos = {n: FORMULES_PRESET[n] for n in (args.algos or ([] if args.formule else FORMULES_PRESET))}
+    algos.update({f"formule {i + 1}": f for i, f in enumerate(args.formule)})
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_ref = preparer_reference(run_query, date_start, date_end)
+    if base_ref is None:
+        print("Aucune donnée sur la période.", file=sys.stderr)
+        return 2
+
+    # La référence course par course domine : un processus par algo
+    etat = {'db_path': db_path, 'du': date_start, 'au': date_end, 'tol': args.tol,
+            'moteur': args.moteur, 'base_ref': base_ref}
+    workers = min(args.workers or os.cpu_count() or 1, len(algos))
+    if workers <= 1:
+        _init_worker(etat)
+        resultats = map(_comparer_algo, algos.values())
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(etat,))
+        resultats = pool.map(_comparer_algo, algos.values())
+
+    divergent = False
+    for nom, res in zip(algos, resultats):
+        statut = "OK" if res['premiere_course'] is None else f"{res['courses_divergentes']} courses divergentes"
+        if res['courses_attendues']:
+            causes = ", ".join(f"{c} {n}" for c, n in
+                               res['attendus'].groupby('cause')['ID_C'].nunique().items())
+            statut += f" ; écarts attendus (tri stable) : {causes}"
+        print(f"{nom} : {res['courses']} courses / {res['chevaux']} chevaux — {statut} "
+              f"(référence {res['reference_s']:.2f}s, optimisé {res['optimise_s']:.2f}s)")
+        if res['premiere_course'] is not None:
+            divergent = True
+            ecarts = res['ecarts']
+            globaux = ecarts[ecarts['ID_C'].isna()]
+            premiere = ecarts[ecarts['ID_C'] == res['premiere_course']]
+            print(f"  Première course divergente : {res['premiere_course']}")
+            with pd.option_context('display.width', 200, 'display.max_colwidth', 40):
+                print(pd.concat([globaux, premiere]).head(args.max_lignes).to_string(index=False))
+    if workers > 1:
+        pool.shutdown()
+    return 1 if divergent else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
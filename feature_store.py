@@ -0,0 +1,161 @@
+"""
+feature_store.py — Feature store typé, alimenté à l'import
+Une ligne par cheval (selections.id) : clés numériques déjà nettoyées (REAL,
+NULL si absentes ou illisibles), autres clés json conservées telles quelles.
+Les Taux_* restent bruts : la mise en % (x100 si max <= 1) se décide dans
+calculer_colonnes sur le frame chargé, comme pour json_data.
+Lu directement par engine.charger_donnees : plus de json.loads à chaque LANCER.
+"""
+import json
+import pandas as pd
+from engine import (
+    decoder_json, to_numeric_col, ident_sql,
+    COLONNES_NUMERIQUES, TABLE_FEATURES, TABLE_FEATURES_COLONNES, TABLE_FEATURES_VERSION,
+    VERSION_FEATURES
+)
+
+
+def assurer_schema(conn):
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {TABLE_FEATURES} (selection_id INTEGER PRIMARY KEY, date TEXT)"
+    )
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_features_date ON {TABLE_FEATURES}(date)")
+    # Registre clé json -> colonne SQL (les noms de colonnes SQLite ignorent la casse)
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS {TABLE_FEATURES_COLONNES} (
+        cle TEXT PRIMARY KEY,
+        colonne TEXT NOT NULL,
+        numerique INTEGER NOT NULL DEFAULT 0)""")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_FEATURES_VERSION} (version INTEGER NOT NULL)")
+    if conn.execute(f"SELECT COUNT(*) FROM {TABLE_FEATURES_VERSION}").fetchone()[0] == 0:
+        conn.execute(f"INSERT INTO {TABLE_FEATURES_VERSION} (version) VALUES (?)", (VERSION_FEATURES,))
+
+
+def version_features(conn):
+    """Version des règles de nettoyage du store en base, None si pas de store."""
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if TABLE_FEATURES not in tables:
+        return None
+    if TABLE_FEATURES_VERSION not in tables:
+        return 1
+    r = conn.execute(f"SELECT MAX(version) FROM {TABLE_FEATURES_VERSION}").fetchone()
+    return r[0] if r and r[0] is not None else 1
+
+
+def est_numerique(cle):
+    return cle in COLONNES_NUMERIQUES or cle.endswith('_Rank')
+
+
+def _illisibles(s, v):
+    """Valeurs présentes que to_numeric_col (v) a mises à 0.0 faute de nombre."""
+    zeros = s.notna() & (v == 0)
+    texte = s[zeros].astype(str).str.replace(',', '.').str.strip()
+    return pd.to_numeric(texte, errors='coerce').isna().reindex(s.index, fill_value=False)
+
+
+def construire_features(blobs):
+    """json_data -> DataFrame de features typées, une ligne par blob.
+
+    Numériques : même nettoyage que to_numeric_col (virgule), mais NULL si
+    la clé est absente ou la valeur illisible ('', texte) : les filtres
+    appliquent leur défaut (Rang_J -> 999) comme sur json_data, et
+    calculer_colonnes remet 0.0 ensuite.
+    """
+    cols, _ = decoder_json(blobs)
+    feats = pd.DataFrame({k: v for k, v in cols.items() if v is not None})
+    for c in feats.columns:
+        if est_numerique(c):
+            v = to_numeric_col(feats[c])
+            feats[c] = v.where(feats[c].notna() & ~_illisibles(feats[c], v))
+    return feats
+
+
+def _registre(conn):
+    return {
+        cle: colonne
+        for cle, colonne in conn.execute(f"SELECT cle, colonne FROM {TABLE_FEATURES_COLONNES}")
+    }
+
+
+def _ajouter_colonnes(conn, cles, registre):
+    pris = {c.lower() for c in registre.values()} | {'selection_id', 'date'}
+    for cle in cles:
+        if cle in registre:
+            continue
+        col, i = cle, 2
+        while col.lower() in pris:
+            col, i = f"{cle}__{i}", i + 1
+        num = est_numerique(cle)
+        conn.execute(f"ALTER TABLE {TABLE_FEATURES} ADD COLUMN {ident_sql(col)}{' REAL' if num else ''}")
+        conn.execute(
+            f"INSERT INTO {TABLE_FEATURES_COLONNES} (cle, colonne, numerique) VALUES (?, ?, ?)",
+            (cle, col, int(num))
+        )
+        registre[cle] = col
+        pris.add(col.lower())
+
+
+def _valeur_sql(v):
+    return json.dumps(v) if isinstance(v, (list, dict)) else v
+
+
+def ecrire_features(conn, ids, dates, feats):
+    """Écrit (INSERT OR REPLACE) les features d'un lot de selections."""
+    registre = _registre(conn)
+    _ajouter_colonnes(conn, feats.columns, registre)
+    cols_sql = ['selection_id', 'date'] + [registre[c] for c in feats.columns]
+    valeurs = feats.astype(object).where(feats.notna(), None)
+    for c in valeurs.columns:
+        if not est_numerique(c):
+            valeurs[c] = valeurs[c].map(_valeur_sql)
+    lignes = [
+        (int(i), d, *vals)
+        for i, d, vals in zip(ids, dates, valeurs.itertuples(index=False, name=None))
+    ]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLE_FEATURES} ({', '.join(ident_sql(c) for c in cols_sql)}) "
+        f"VALUES ({', '.join('?' * len(cols_sql))})",
+        lignes
+    )
+
+
+def _supprimer(conn):
+    for t in (TABLE_FEATURES, TABLE_FEATURES_COLONNES, TABLE_FEATURES_VERSION):
+        conn.execute(f"DROP TABLE IF EXISTS {t}")
+    conn.commit()
+
+
+def synchroniser_features(conn):
+    """Construit les features des lignes de selections qui n'en ont pas encore (jour par jour).
+
+    Retourne le nombre de lignes écrites. Store construit avec d'autres
+    règles (VERSION_FEATURES) : reconstruit entièrement.
+    """
+    version = version_features(conn)
+    if version is not None and version != VERSION_FEATURES:
+        print(f"  [FEATURES] règles v{version} -> v{VERSION_FEATURES} : reconstruction")
+        _supprimer(conn)
+    assurer_schema(conn)
+    conn.execute(f"DELETE FROM {TABLE_FEATURES} WHERE selection_id NOT IN (SELECT id FROM selections)")
+    jours = [r[0] for r in conn.execute(
+        f"SELECT DISTINCT s.date FROM selections s LEFT JOIN {TABLE_FEATURES} f ON f.selection_id = s.id "
+        "WHERE f.selection_id IS NULL ORDER BY s.date"
+    )]
+    total = 0
+    for jour in jours:
+        rows = conn.execute(
+            f"SELECT s.id, s.date, s.json_data FROM selections s LEFT JOIN {TABLE_FEATURES} f "
+            "ON f.selection_id = s.id WHERE f.selection_id IS NULL AND s.date IS ? ORDER BY s.id",
+            (jour,)
+        ).fetchall()
+        ids, dates, blobs = zip(*rows)
+        ecrire_features(conn, ids, dates, construire_features(list(blobs)))
+        conn.commit()
+        total += len(rows)
+    print(f"  [FEATURES] {total} lignes synchronisées ({len(jours)} jours)")
+    return total
+
+
+def reconstruire_features(conn):
+    """Repart de zéro (après changement de règles de nettoyage)."""
+    _supprimer(conn)
+    return synchroniser_features(conn)
@@ -2,12 +2,31 @@
 filtres_avance.py — Filtres avancés
 Repos, ELO Jockey, Rang Jockey, Place Corde, Pastille, Concordance Duo
 """
-import streamlit as st
-import pandas as pd
+from filtres_plan import PlanFiltres, nombre
+
+
+FILTRES_AVANCE_DEFAUT = {
+    'repos': (0, 365),
+    'elo_jockey': 0,
+    'rang_j': 500,
+    'corde': (1, 20),
+    'pastille': [],
+    'confiance_on': False,
+    'seuil_conc': 4,
+    'unanime': False,
+    'folie_cote_min': 10,
+    'folie_taux_min': 20,
+}
+
+# Filtres qui retirent des chevaux ; les autres (pastille, concordance,
+# coup de folie) n'agissent qu'à l'évaluation du mode
+FILTRES_AVANCE_LIGNES = ('repos', 'elo_jockey', 'rang_j', 'corde')
 
 
 def render_filtres_avance(mode_affichage):
     """Affiche les widgets filtres avancés et retourne les valeurs."""
+    import streamlit as st
+
     st.markdown(
         '<p style="margin:0;padding:2px 0;font-size:0.8rem;color:#666;">⚡ Avancé</p>',
         unsafe_allow_html=True
@@ -61,43 +80,49 @@ def render_filtres_avance(mode_affichage):
     }
 
 
-def appliquer_filtres_avance(df, filtres):
-    """Applique les filtres avancés. Retourne df filtré."""
-    n_avant = len(df)
+def predicats_avance(filtres):
+    """Prédicats des filtres avancés actifs (voir filtres_plan)."""
+    p = []
 
     # Repos
-    if 'Repos' in df.columns and filtres['repos'] != (0, 365):
-        df['Repos'] = pd.to_numeric(
-            df['Repos'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['Repos'].between(filtres['repos'][0], filtres['repos'][1])]
-        print(f"  [FILTRE] Repos {filtres['repos']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['repos'] != (0, 365):
+        def repos(df, vivants, lo=filtres['repos'][0], hi=filtres['repos'][1]):
+            if 'Repos' not in df.columns:
+                return None
+            v = nombre(df['Repos'])
+            return v.between(lo, hi), {'Repos': v}
+        p.append((f"Repos {filtres['repos']}", repos))
 
     # ELO Jockey
-    if filtres['elo_jockey'] > 0 and 'ELO_Jockey' in df.columns:
-        df['ELO_Jockey'] = pd.to_numeric(
-            df['ELO_Jockey'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['ELO_Jockey'] >= filtres['elo_jockey']]
-        print(f"  [FILTRE] ELO Jockey >= {filtres['elo_jockey']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['elo_jockey'] > 0:
+        def elo_jockey(df, vivants, seuil=filtres['elo_jockey']):
+            if 'ELO_Jockey' not in df.columns:
+                return None
+            v = nombre(df['ELO_Jockey'])
+            return v >= seuil, {'ELO_Jockey': v}
+        p.append((f"ELO Jockey >= {filtres['elo_jockey']}", elo_jockey))
 
     # Rang Jockey
-    if filtres['rang_j'] < 500 and 'Rang_J' in df.columns:
-        df['Rang_J'] = pd.to_numeric(
-            df['Rang_J'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(999)
-        df = df[df['Rang_J'] <= filtres['rang_j']]
-        print(f"  [FILTRE] Rang Jockey <= {filtres['rang_j']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['rang_j'] < 500:
+        def rang_j(df, vivants, seuil=filtres['rang_j']):
+            if 'Rang_J' not in df.columns:
+                return None
+            v = nombre(df['Rang_J'], defaut=999)
+            return v <= seuil, {'Rang_J': v}
+        p.append((f"Rang Jockey <= {filtres['rang_j']}", rang_j))
 
     # Place Corde
-    if 'Place_Corde' in df.columns and filtres['corde'] != (1, 20):
-        df['Place_Corde'] = pd.to_numeric(
-            df['Place_Corde'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['Place_Corde'].between(filtres['corde'][0], filtres['corde'][1])]
-        print(f"  [FILTRE] Corde {filtres['corde']}: {n_avant} -> {len(df)}")
-
-    return df
\ No newline at end of file
+    if filtres['corde'] != (1, 20):
+        def corde(df, vivants, lo=filtres['corde'][0], hi=filtres['corde'][1]):
+            if 'Place_Corde' not in df.columns:
+                return None
+            v = nombre(df['Place_Corde'])
+            return v.between(lo, hi), {'Place_Corde': v}
+        p.append((f"Corde {filtres['corde']}", corde))
+
+    return p
+
+
+def appliquer_filtres_avance(df, filtres):
+    """Applique les filtres avancés. Retourne df filtré."""
+    return PlanFiltres(predicats_avance(filtres)).appliquer(df)
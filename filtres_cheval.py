@@ -2,10 +2,17 @@
 filtres_cheval.py — Filtres au niveau du cheval
 Âge, Sexe, Ferrure, Avis Entraîneur, D4, Inédits, ExFav, Supplémenté
 """
-import streamlit as st
-import pandas as pd
 import re
 
+import numpy as np
+
+from engine import par_valeur_distincte
+from filtres_plan import PlanFiltres, nombre
+
+
+# Incidents comptés par compter_d4 (jetons de la musique, en majuscules)
+CODES_D4 = ('D', 'DM', 'AR', 'T', 'RET', '0')
+
 
 def compter_d4(musique):
     """Compte les D/0/incidents dans les 4 dernières courses de la musique."""
@@ -18,13 +25,44 @@ def compter_d4(musique):
         return -1
     count = 0
     for r in results[:4]:
-        if r.upper() in ('D', 'DM', 'AR', 'T', 'RET', '0'):
+        if r.upper() in CODES_D4:
             count += 1
     return count
 
 
+def _d4(t):
+    # Séparateurs d'année « (24) » consommés par la première alternative (groupe
+    # vide), comme le re.sub de compter_d4. Pas de jeton ('', 'nan', 'None'...) : -1
+    jetons = t.str.findall(r'\(\d+\)|(\d+|D|Dm|Ar|T|Ret)[a-z]*', flags=re.IGNORECASE)
+    return np.array([
+        sum(j.upper() in CODES_D4 for j in js[:4]) if js else -1
+        for js in ([j for j in js if j] for js in jetons)
+    ], dtype=np.int64)
+
+
+def compter_d4_col(musiques):
+    """compter_d4 sur une colonne (une fois par musique distincte)."""
+    d4 = par_valeur_distincte(musiques, _d4)
+    # « not musique » : 0, False, None... sans musique, quel que soit leur str
+    return d4.mask(~np.asarray(musiques, dtype=object).astype(bool), -1)
+
+
+FILTRES_CHEVAL_DEFAUT = {
+    'age': (2, 12),
+    'sexe': [],
+    'ferrure': [],
+    'avis': [],
+    'd4': 4,
+    'inedits': False,
+    'exfav': "Tous",
+    'supplement': "Tous",
+}
+
+
 def render_filtres_cheval():
     """Affiche les widgets filtres cheval et retourne les valeurs."""
+    import streamlit as st
+
     st.markdown(
         '<p style="margin:0;padding:2px 0;font-size:0.8rem;color:#666;">🐴 Cheval</p>',
         unsafe_allow_html=True
@@ -71,80 +109,101 @@ def render_filtres_cheval():
     }
 
 
-def appliquer_filtres_cheval(df, filtres):
-    """Applique les filtres cheval. Retourne df filtré."""
-    n_avant = len(df)
+FERRURE_MAP = {
+    "Normal": "__NORMAL__",
+    "Déferré Ant.": "DEFERRE_ANTERIEURS",
+    "Déferré Post.": "DEFERRE_POSTERIEURS",
+    "Déferré A+P": "DEFERRE_ANTERIEURS_POSTERIEURS",
+    "Protégé Ant.": "PROTEGE_ANTERIEURS",
+    "Protégé Post.": "PROTEGE_POSTERIEURS",
+    "Protégé A+P": "PROTEGE_ANTERIEURS_POSTERIEURS",
+}
+
+
+def predicats_cheval(filtres):
+    """Prédicats des filtres cheval actifs (voir filtres_plan)."""
+    p = []
 
     # Âge
-    if filtres['age'] != (2, 12) and 'age' in df.columns:
-        df['age'] = pd.to_numeric(
-            df['age'].astype(str).str.replace(',', '.').str.strip(), errors='coerce'
-        ).fillna(0).astype(int)
-        df = df[df['age'].between(filtres['age'][0], filtres['age'][1])]
-        print(f"  [FILTRE] Âge {filtres['age']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['age'] != (2, 12):
+        def age(df, vivants, lo=filtres['age'][0], hi=filtres['age'][1]):
+            if 'age' not in df.columns:
+                return None
+            v = nombre(df['age'], strip=True).astype(int)
+            return v.between(lo, hi), {'age': v}
+        p.append((f"Âge {filtres['age']}", age))
 
     # Sexe
-    if filtres['sexe'] and 'Sexe' in df.columns:
+    if filtres['sexe']:
         sexe_codes = [s[0] for s in filtres['sexe']]
-        df = df[df['Sexe'].astype(str).str.strip().str.upper().isin(sexe_codes)]
-        print(f"  [FILTRE] Sexe {sexe_codes}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+
+        def sexe(df, vivants, codes=sexe_codes):
+            if 'Sexe' not in df.columns:
+                return None
+            return df['Sexe'].astype(str).str.strip().str.upper().isin(codes), {}
+        p.append((f"Sexe {sexe_codes}", sexe))
 
     # Ferrure
-    if filtres['ferrure'] and 'ferrure' in df.columns:
-        ferrure_map = {
-            "Normal": "__NORMAL__",
-            "Déferré Ant.": "DEFERRE_ANTERIEURS",
-            "Déferré Post.": "DEFERRE_POSTERIEURS",
-            "Déferré A+P": "DEFERRE_ANTERIEURS_POSTERIEURS",
-            "Protégé Ant.": "PROTEGE_ANTERIEURS",
-            "Protégé Post.": "PROTEGE_POSTERIEURS",
-            "Protégé A+P": "PROTEGE_ANTERIEURS_POSTERIEURS",
-        }
-        codes = [ferrure_map.get(f) for f in filtres['ferrure'] if f != "Normal"]
-        include_normal = "Normal" in filtres['ferrure']
-        mask = df['ferrure'].astype(str).str.strip().isin(codes)
-        if include_normal:
-            mask = mask | df['ferrure'].isna() | (df['ferrure'].astype(str).str.strip().isin(['', 'nan']))
-        df = df[mask]
-        print(f"  [FILTRE] Ferrure {filtres['ferrure']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['ferrure']:
+        def ferrure(df, vivants, codes=[FERRURE_MAP.get(f) for f in filtres['ferrure'] if f != "Normal"],
+                    include_normal="Normal" in filtres['ferrure']):
+            if 'ferrure' not in df.columns:
+                return None
+            txt = df['ferrure'].astype(str).str.strip()
+            mask = txt.isin(codes)
+            if include_normal:
+                mask = mask | df['ferrure'].isna() | txt.isin(['', 'nan'])
+            return mask, {}
+        p.append((f"Ferrure {filtres['ferrure']}", ferrure))
 
     # Avis Entraîneur
-    if filtres['avis'] and 'avis_entraineur' in df.columns:
-        df = df[df['avis_entraineur'].astype(str).str.strip().str.upper().isin(filtres['avis'])]
-        print(f"  [FILTRE] Avis {filtres['avis']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
-
-    # D4 (musique)
-    if filtres['d4'] < 4 and 'Musique' in df.columns:
-        df['_d4'] = df['Musique'].apply(compter_d4)
-        avant_d4 = len(df)
-        # -1 = pas de musique, on les garde sauf si on exclut les inédits
-        df = df[(df['_d4'] <= filtres['d4']) | (df['_d4'] == -1)]
-        df = df.drop(columns=['_d4'])
-        print(f"  [FILTRE] D4 max {filtres['d4']}: {avant_d4} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['avis']:
+        def avis(df, vivants, valeurs=list(filtres['avis'])):
+            if 'avis_entraineur' not in df.columns:
+                return None
+            return df['avis_entraineur'].astype(str).str.strip().str.upper().isin(valeurs), {}
+        p.append((f"Avis {filtres['avis']}", avis))
+
+    # D4 (musique) : -1 = pas de musique, on les garde sauf si on exclut les inédits
+    if filtres['d4'] < 4:
+        def d4(df, vivants, seuil=filtres['d4']):
+            if 'Musique' not in df.columns:
+                return None
+            # Seulement sur les chevaux encore retenus
+            mask = vivants.copy()
+            n = compter_d4_col(df['Musique'][vivants]).to_numpy()
+            mask[vivants] = (n <= seuil) | (n == -1)
+            return mask, {}
+        p.append((f"D4 max {filtres['d4']}", d4))
 
     # Exclure inédits
-    if filtres['inedits'] and 'Courses_courues' in df.columns:
-        df['Courses_courues'] = pd.to_numeric(
-            df['Courses_courues'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['Courses_courues'] > 0]
-        print(f"  [FILTRE] Sans inédits: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['inedits']:
+        def inedits(df, vivants):
+            if 'Courses_courues' not in df.columns:
+                return None
+            v = nombre(df['Courses_courues'])
+            return v > 0, {'Courses_courues': v}
+        p.append(("Sans inédits", inedits))
 
     # ExFav
-    if filtres['exfav'] != "Tous" and 'ExFav' in df.columns:
-        df = df[df['ExFav'].astype(str).str.strip() == filtres['exfav']]
-        print(f"  [FILTRE] ExFav={filtres['exfav']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['exfav'] != "Tous":
+        def exfav(df, vivants, valeur=filtres['exfav']):
+            if 'ExFav' not in df.columns:
+                return None
+            return df['ExFav'].astype(str).str.strip() == valeur, {}
+        p.append((f"ExFav={filtres['exfav']}", exfav))
 
     # Supplémenté
-    if filtres['supplement'] != "Tous" and 'supplemente' in df.columns:
-        df = df[df['supplemente'].astype(str).str.strip() == filtres['supplement']]
-        print(f"  [FILTRE] Supplémenté={filtres['supplement']}: {n_avant} -> {len(df)}")
+    if filtres['supplement'] != "Tous":
+        def supplement(df, vivants, valeur=filtres['supplement']):
+            if 'supplemente' not in df.columns:
+                return None
+            return df['supplemente'].astype(str).str.strip() == valeur, {}
+        p.append((f"Supplémenté={filtres['supplement']}", supplement))
+
+    return p
+
 
-    return df
\ No newline at end of file
+def appliquer_filtres_cheval(df, filtres):
+    """Applique les filtres cheval. Retourne df filtré."""
+    return PlanFiltres(predicats_cheval(filtres)).appliquer(df)
@@ -2,12 +2,23 @@
 filtres_course.py — Filtres au niveau de la course
 Hippodrome, Discipline, Partants, Classe, Distance, Allocation
 """
-import streamlit as st
-import pandas as pd
+from filtres_plan import PlanFiltres, nombre
+
+
+FILTRES_COURSE_DEFAUT = {
+    'hippo': [],
+    'disc': [],
+    'partants': (1, 20),
+    'classe': [],
+    'distance': (1000, 4000),
+    'alloc': (0, 100000),
+}
 
 
 def render_filtres_course(date_start, date_end, run_query):
     """Affiche les widgets filtres course et retourne les valeurs."""
+    import streamlit as st
+
     _raw = run_query(
         "SELECT DISTINCT hippodrome FROM selections WHERE date BETWEEN ? AND ?",
         (str(date_start), str(date_end))
@@ -51,31 +62,57 @@ def render_filtres_course(date_start, date_end, run_query):
     }
 
 
-def appliquer_filtres_course(df, filtres):
-    """Applique les filtres course sur le DataFrame. Retourne df filtré."""
-    n_avant = len(df)
+def predicats_base(filtres):
+    """Prédicats hippodrome, discipline, partants (appliquer_filtres du moteur)."""
+    p = []
+    if filtres['hippo']:
+        def hippo(df, vivants, hippos=list(filtres['hippo'])):
+            return df['hippodrome'].isin(hippos), {}
+        p.append((f"Hippodrome {filtres['hippo']}", hippo))
+    if filtres['disc']:
+        def disc(df, vivants, codes=[d[0] for d in filtres['disc']]):
+            return df['discipline'].astype(str).str.strip().str.upper().isin(codes), {}
+        p.append((f"Discipline {[d[0] for d in filtres['disc']]}", disc))
+
+    def partants(df, vivants, lo=filtres['partants'][0], hi=filtres['partants'][1]):
+        return df['nombre_partants'].between(lo, hi), {}
+    p.append((f"Partants {tuple(filtres['partants'])}", partants))
+    return p
+
+
+def predicats_course(filtres):
+    """Prédicats des filtres course actifs (voir filtres_plan)."""
+    p = []
 
     # Classe
-    if filtres['classe'] and 'Classe_Groupe' in df.columns:
-        df = df[df['Classe_Groupe'].astype(str).str.strip().isin(filtres['classe'])]
-        print(f"  [FILTRE] Classe {filtres['classe']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['classe']:
+        def classe(df, vivants, classes=list(filtres['classe'])):
+            if 'Classe_Groupe' not in df.columns:
+                return None
+            return df['Classe_Groupe'].astype(str).str.strip().isin(classes), {}
+        p.append((f"Classe {filtres['classe']}", classe))
 
     # Distance
-    if 'distance' in df.columns and filtres['distance'] != (1000, 4000):
-        df['distance'] = pd.to_numeric(
-            df['distance'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['distance'].between(filtres['distance'][0], filtres['distance'][1])]
-        print(f"  [FILTRE] Distance {filtres['distance']}: {n_avant} -> {len(df)}")
-        n_avant = len(df)
+    if filtres['distance'] != (1000, 4000):
+        def distance(df, vivants, lo=filtres['distance'][0], hi=filtres['distance'][1]):
+            if 'distance' not in df.columns:
+                return None
+            v = nombre(df['distance'])
+            return v.between(lo, hi), {'distance': v}
+        p.append((f"Distance {filtres['distance']}", distance))
 
     # Allocation
-    if 'allocation' in df.columns and filtres['alloc'] != (0, 100000):
-        df['allocation'] = pd.to_numeric(
-            df['allocation'].astype(str).str.replace(',', '.'), errors='coerce'
-        ).fillna(0)
-        df = df[df['allocation'].between(filtres['alloc'][0], filtres['alloc'][1])]
-        print(f"  [FILTRE] Allocation {filtres['alloc']}: {n_avant} -> {len(df)}")
-
-    return df
\ No newline at end of file
+    if filtres['alloc'] != (0, 100000):
+        def allocation(df, vivants, lo=filtres['alloc'][0], hi=filtres['alloc'][1]):
+            if 'allocation' not in df.columns:
+                return None
+            v = nombre(df['allocation'])
+            return v.between(lo, hi), {'allocation': v}
+        p.append((f"Allocation {filtres['alloc']}", allocation))
+
+    return p
+
+
+def appliquer_filtres_course(df, filtres):
+    """Applique les filtres course sur le DataFrame. Retourne df filtré."""
+    return PlanFiltres(predicats_course(filtres)).appliquer(df)
@@ -0,0 +1,78 @@
+"""
+filtres_plan.py — Plan de filtres : un masque combiné, une seule copie
+Chaque module de filtres (course, cheval, avancé) fournit ses prédicats ;
+le plan les évalue sur le frame complet, combine les masques et découpe une
+fois. Les colonnes converties par un filtre (distance, âge, Repos...) sont
+réécrites sur le résultat, comme le faisaient les appliquer_filtres_*.
+
+Prédicat : (libellé, fonction (df, vivants) -> None si non applicable,
+sinon (masque booléen, {colonne: valeurs converties})). vivants : lignes
+retenues par les prédicats précédents, pour les filtres ligne à ligne (D4) ;
+les prédicats vectorisés l'ignorent.
+"""
+import numpy as np
+import pandas as pd
+
+
+def nombre(s, defaut=0, strip=False):
+    """Colonne -> numérique (virgule décimale, texte -> NaN -> defaut).
+
+    Colonne déjà numérique (feature store, filtre précédent) : pas de
+    repassage par str, même résultat.
+    """
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.fillna(defaut)
+    txt = s.astype(str).str.replace(',', '.')
+    if strip:
+        txt = txt.str.strip()
+    return pd.to_numeric(txt, errors='coerce').fillna(defaut)
+
+
+class PlanFiltres:
+    """Prédicats actifs -> masque combiné.
+
+    selectivite : pour le dernier passage, lignes en entrée et en sortie de
+    chaque filtre appliqué, dans l'ordre des prédicats.
+    """
+
+    def __init__(self, predicats):
+        self.predicats = list(predicats)
+        self.selectivite = []
+
+    def masque(self, df):
+        """(masque combiné, colonnes converties), selectivite mise à jour."""
+        combine = np.ones(len(df), dtype=bool)
+        converties = {}
+        self.selectivite = []
+        for libelle, predicat in self.predicats:
+            r = predicat(df, combine)
+            if r is None:
+                continue
+            m, cols = r
+            entree = int(combine.sum())
+            combine = combine & np.asarray(m, dtype=bool)
+            converties.update(cols)
+            sortie = int(combine.sum())
+            self.selectivite.append({
+                'filtre': libelle, 'entree': entree, 'sortie': sortie,
+                'taux': round(sortie / entree, 4) if entree else None,
+            })
+        return combine, converties
+
+    def appliquer(self, df, trace=True):
+        """df filtré (une copie), colonnes converties réécrites."""
+        combine, converties = self.masque(df)
+        if trace:
+            for s in self.selectivite:
+                taux = f"{s['taux']:.0%}" if s['taux'] is not None else "-"
+                print(f"  [FILTRE] {s['filtre']}: {s['entree']} -> {s['sortie']} ({taux})")
+        if not self.selectivite:
+            return df
+        res = df[combine]
+        for c, v in converties.items():
+            res[c] = v[combine]
+        return res
+
+    def tableau(self):
+        """Sélectivité du dernier passage en DataFrame (filtre, entree, sortie, taux)."""
+        return pd.DataFrame(self.selectivite, columns=['filtre', 'entree', 'sortie', 'taux'])
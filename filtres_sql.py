@@ -0,0 +1,166 @@
+"""
+filtres_sql.py — Filtres course / cheval / avancé poussés dans la requête SQLite
+charger_donnees ajoute la clause au WHERE : les partants que les filtres
+écarteront ne sont ni lus ni décodés.
+
+La clause ne retire que des lignes que le filtre pandas retirerait : valeur
+texte, clé absente, json invalide -> la ligne est gardée et le filtre pandas,
+toujours appliqué ensuite, tranche. Tous les filtres étant ligne à ligne et
+les rangs calculés après (calculer_colonnes), le résultat est identique.
+Non traduits : D4 (regex sur la musique) et ferrure « Normal » (valeurs vides).
+"""
+from filtres_course import FILTRES_COURSE_DEFAUT
+from filtres_cheval import FILTRES_CHEVAL_DEFAUT, FERRURE_MAP
+from filtres_avance import FILTRES_AVANCE_DEFAUT
+from db import INDEX_SELECTIONS_CLE
+
+# Lignes toujours gardées : preparer_dataframe dédoublonne sur une clé
+# (str de chaque champ) que l'index unique ne couvre pas pour elles
+GARDE_DOUBLONS = (
+    "s.hippodrome IS NULL OR s.course_norm IS NULL "
+    "OR typeof(s.hippodrome) <> 'text' OR typeof(s.numero) <> 'integer'"
+)
+
+NUMERIQUE = "IN ('integer', 'real')"
+
+
+# =====================================================
+# PRÉDICATS
+# =====================================================
+def predicats(filtres_c, filtres_ch, filtres_av):
+    """Filtres actifs traduisibles -> [(clé, genre, valeurs, conditionnel)].
+
+    conditionnel : le filtre pandas ne s'applique que si la colonne existe
+    ('X' in df.columns) ; discipline et partants sont toujours appliqués.
+    """
+    fc = {**FILTRES_COURSE_DEFAUT, **(filtres_c or {})}
+    fch = {**FILTRES_CHEVAL_DEFAUT, **(filtres_ch or {})}
+    fav = {**FILTRES_AVANCE_DEFAUT, **(filtres_av or {})}
+    p = []
+    if fc['disc']:
+        p.append(('discipline', 'contient_maj', [d[0] for d in fc['disc']], False))
+    if tuple(fc['partants']) != FILTRES_COURSE_DEFAUT['partants']:
+        p.append(('nombre_partants', 'entier_entre', list(fc['partants']), False))
+    if fc['classe']:
+        p.append(('Classe_Groupe', 'contient', list(fc['classe']), True))
+    if tuple(fc['distance']) != (1000, 4000):
+        p.append(('distance', 'entre', list(fc['distance']), True))
+    if tuple(fc['alloc']) != (0, 100000):
+        p.append(('allocation', 'entre', list(fc['alloc']), True))
+
+    if tuple(fch['age']) != (2, 12):
+        p.append(('age', 'entier_entre', list(fch['age']), True))
+    if fch['sexe']:
+        p.append(('Sexe', 'contient_maj', [s[0] for s in fch['sexe']], True))
+    if fch['ferrure'] and "Normal" not in fch['ferrure']:
+        p.append(('ferrure', 'contient', [FERRURE_MAP.get(f) for f in fch['ferrure']], True))
+    if fch['avis']:
+        p.append(('avis_entraineur', 'contient_maj', list(fch['avis']), True))
+    if fch['inedits']:
+        p.append(('Courses_courues', 'min_strict', [0], True))
+    if fch['exfav'] != "Tous":
+        p.append(('ExFav', 'contient', [fch['exfav']], True))
+    if fch['supplement'] != "Tous":
+        p.append(('supplemente', 'contient', [fch['supplement']], True))
+
+    if tuple(fav['repos']) != (0, 365):
+        p.append(('Repos', 'entre', list(fav['repos']), True))
+    if fav['elo_jockey'] > 0:
+        p.append(('ELO_Jockey', 'min', [fav['elo_jockey']], True))
+    if fav['rang_j'] < 500:
+        p.append(('Rang_J', 'max', [fav['rang_j']], True))
+    if tuple(fav['corde']) != (1, 20):
+        p.append(('Place_Corde', 'entre', list(fav['corde']), True))
+    return p
+
+
+def condition(genre, valeurs, type_sql, valeur_sql):
+    """Condition SQL d'un prédicat -> (sql, params) ; vraie pour tout type non comparable."""
+    if genre.startswith('contient'):
+        # LIKE ignore la casse ASCII : sur-ensemble de strip()/upper() puis isin
+        tests = [f"{valeur_sql} LIKE ?" for v in valeurs if v is not None]
+        params = [f"%{v}%" for v in valeurs if v is not None]
+        if genre == 'contient_maj':
+            # upper() Python change aussi des caractères non ASCII (ı -> I)
+            tests.append(f"{valeur_sql} GLOB '*[^ -~]*'")
+        test = " OR ".join(tests) or "0"
+        return f"CASE WHEN {type_sql} = 'text' THEN ({test}) ELSE 1 END", params
+    v = f"CAST({valeur_sql} AS INTEGER)" if genre == 'entier_entre' else valeur_sql
+    test = {
+        'entre': f"{v} BETWEEN ? AND ?",
+        'entier_entre': f"{v} BETWEEN ? AND ?",
+        'min': f"{v} >= ?",
+        'min_strict': f"{v} > ?",
+        'max': f"{v} <= ?",
+    }[genre]
+    return f"CASE WHEN {type_sql} {NUMERIQUE} THEN {test} ELSE 1 END", list(valeurs)
+
+
+# =====================================================
+# CLAUSE
+# =====================================================
+def _chemin(cle):
+    return "'$.\"" + str(cle).replace("'", "''") + "\"'"
+
+
+def _existe(run_query, source, params, test):
+    r = run_query(f"SELECT EXISTS(SELECT 1 FROM {source} WHERE s.date BETWEEN ? AND ? AND {test}) AS e",
+                  params)
+    return r is not None and not r.empty and bool(r['e'].iloc[0])
+
+
+def clause_filtres(run_query, params, filtres, colonnes=None, store=None, jointure=""):
+    """Clause à ajouter au WHERE de charger_donnees -> (sql, params, colonnes à créer).
+
+    filtres : (filtres_c, filtres_ch, filtres_av). store : {clé: expression de la
+    colonne} du feature store (jointure f), None = lecture json_data. Rien n'est
+    poussé sans l'index unique de clé naturelle (doublons possibles, dédoublonnés en pandas).
+    Colonnes à créer : filtres conditionnels poussés ; preparer_dataframe les
+    ajoute vides si aucune ligne lue ne les porte, le filtre pandas s'applique
+    alors comme sur la période entière.
+    """
+    filtres_c, filtres_ch, filtres_av = filtres
+    hippos = list((filtres_c or {}).get('hippo') or [])
+    liste = predicats(filtres_c, filtres_ch, filtres_av)
+    if not hippos and not liste:
+        return "", (), []
+    indexe = run_query("SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?",
+                       (INDEX_SELECTIONS_CLE,))
+    if indexe is None or indexe.empty:
+        return "", (), []
+
+    source = "selections s" + (jointure if store is not None else "")
+    conditions, sql_params, forcees, poussees = [], [], [], []
+    for cle, genre, valeurs, conditionnel in liste:
+        if store is not None:
+            if cle not in store:
+                continue
+            valeur_sql = store[cle]
+            type_sql = f"typeof({valeur_sql})"
+        else:
+            if colonnes is not None and cle not in colonnes:
+                continue
+            valeur_sql = f"json_extract(s.json_data, {_chemin(cle)})"
+            type_sql = f"json_type(s.json_data, {_chemin(cle)})"
+        if conditionnel:
+            # Clé absente de la période : pas de colonne, pandas ne filtre pas
+            existe = f"{valeur_sql} IS NOT NULL" if store is not None else \
+                f"CASE WHEN json_valid(s.json_data) THEN {type_sql} END IS NOT NULL"
+            if not _existe(run_query, source, params, existe):
+                continue
+            forcees.append(cle)
+        sql, p = condition(genre, valeurs, type_sql, valeur_sql)
+        conditions.append(sql)
+        sql_params += p
+        poussees.append(cle)
+
+    if conditions and store is None:
+        conditions = [f"CASE WHEN json_valid(s.json_data) THEN ({' AND '.join(conditions)}) ELSE 1 END"]
+    if hippos:
+        conditions.insert(0, f"s.hippodrome IN ({', '.join('?' * len(hippos))})")
+        sql_params = hippos + sql_params
+    if not conditions:
+        return "", (), []
+    print(f"  [FILTRE SQL] {', '.join((['hippodrome'] if hippos else []) + poussees)}")
+    return (f" AND ({GARDE_DOUBLONS} OR ({' AND '.join(conditions)}))",
+            tuple(sql_params), forcees)
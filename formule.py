@@ -0,0 +1,354 @@
+"""
+formule.py — Compilation des formules Algo Builder
+La formule est parsée une seule fois puis évaluée en opérations NumPy sur
+colonnes entières, avec la même sémantique que l'eval() ligne par ligne.
+"""
+import ast
+import operator
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+
+FONCTIONS = {'log': np.log, 'sqrt': np.sqrt, 'max': max, 'min': min, 'abs': abs}
+
+
+def reecrire_formule(formula_str):
+    """Syntaxe Algo Builder -> Python (ternaire ?:, chaîne vide)."""
+    return formula_str.replace('?', ' if ').replace(':', ' else ').replace('""', '0')
+
+
+def eval_formula_lignes(df, formula_str):
+    """Évaluation de référence : eval() Python cheval par cheval."""
+    f_py = reecrire_formule(formula_str)
+
+    def calc(row):
+        ctx = row.to_dict()
+        ctx.update(FONCTIONS)
+        try:
+            return float(eval(f_py, {"__builtins__": {}}, ctx))
+        except Exception:
+            return 0.0
+
+    return df.apply(calc, axis=1)
+
+
+class _NonVectorisable(Exception):
+    """Syntaxe hors du sous-ensemble compilé : on repasse en ligne par ligne."""
+
+
+_OPS_ARITH = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.true_divide, ast.FloorDiv: np.floor_divide, ast.Mod: np.mod,
+}
+
+_OPS_CMP = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+
+def _colonne_float(s):
+    """Colonne -> float64 si toutes les valeurs sont des nombres Python/NumPy, sinon None."""
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind in 'biuf':
+        return s.to_numpy(dtype=float)
+    if s.dtype == object:
+        if pd.api.types.infer_dtype(s, skipna=False) in ('integer', 'floating', 'mixed-integer-float', 'boolean'):
+            return s.to_numpy().astype(float)
+    return None
+
+
+class FormuleCompilee:
+    """Formule parsée une fois, évaluable sur un DataFrame entier.
+
+    Chaque nœud produit trois tableaux : la valeur, le masque d'erreur
+    (exception Python -> 0.0) et le masque « type NumPy » (après log/sqrt,
+    la division par zéro donne inf au lieu de lever une exception).
+    Les lignes dont le résultat Python serait complexe ou en dépassement
+    sont recalculées par eval() pour rester strictement identiques.
+    """
+
+    def __init__(self, formula_str):
+        self.texte = formula_str
+        self.code_py = reecrire_formule(formula_str)
+        try:
+            # eval() ignore les espaces/tabulations de tête, ast.parse non
+            self.arbre = ast.parse(self.code_py.lstrip(' \t'), mode='eval')
+        except SyntaxError:
+            self.arbre = None
+        self.vectorisable = self.arbre is not None and self._verifier(self.arbre.body)
+        self.variables = self._analyser_variables()
+
+    # --- Analyse ---
+    def _analyser_variables(self):
+        """Noms de colonnes lus par la formule, dans l'ordre d'apparition."""
+        if self.arbre is None:
+            return ()
+        noms = sorted(
+            (n for n in ast.walk(self.arbre) if isinstance(n, ast.Name) and n.id not in FONCTIONS),
+            key=lambda n: (n.lineno, n.col_offset)
+        )
+        return tuple(dict.fromkeys(n.id for n in noms))
+
+    def _verifier(self, node):
+        try:
+            self._controle(node)
+            return True
+        except _NonVectorisable:
+            return False
+
+    def _controle(self, node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float, bool):
+                raise _NonVectorisable
+        elif isinstance(node, ast.Name):
+            pass
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _OPS_ARITH and not isinstance(node.op, ast.Pow):
+                raise _NonVectorisable
+            self._controle(node.left)
+            self._controle(node.right)
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.USub, ast.UAdd, ast.Not)):
+                raise _NonVectorisable
+            self._controle(node.operand)
+        elif isinstance(node, ast.BoolOp):
+            for v in node.values:
+                self._controle(v)
+        elif isinstance(node, ast.Compare):
+            if any(type(op) not in _OPS_CMP for op in node.ops):
+                raise _NonVectorisable
+            self._controle(node.left)
+            for c in node.comparators:
+                self._controle(c)
+        elif isinstance(node, ast.IfExp):
+            self._controle(node.test)
+            self._controle(node.body)
+            self._controle(node.orelse)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise _NonVectorisable
+            for a in node.args:
+                if isinstance(a, ast.Starred):
+                    raise _NonVectorisable
+                self._controle(a)
+        else:
+            raise _NonVectorisable
+
+    def _cles_memo(self):
+        """Clé de memo (arbre sans positions) de chaque sous-expression, calculée une fois.
+
+        id(nœud) -> (clé, contient une puissance) : seules les puissances
+        marquent des lignes « exotiques » à mémoriser avec le résultat.
+        """
+        if not hasattr(self, '_cles'):
+            self._cles = {
+                id(n): (ast.dump(n), any(isinstance(m, ast.BinOp) and isinstance(m.op, ast.Pow) for m in ast.walk(n)))
+                for n in ast.walk(self.arbre.body)
+                if not isinstance(n, (ast.Constant, ast.Name))
+            }
+        return self._cles
+
+    # --- Évaluation ---
+    def evaluer(self, df, memo=None, partagees=None):
+        """Évalue la formule sur tout le DataFrame -> Series float (erreur = 0.0).
+
+        memo : dict partagé entre formules évaluées sur le même df ; les
+        sous-expressions identiques n'y sont calculées qu'une fois.
+        partagees : clés à mémoriser (None = toutes), voir evaluer_formules.
+        """
+        n = len(df)
+        if self.arbre is None:
+            return pd.Series(0.0, index=df.index, dtype=float)
+        if not self.vectorisable:
+            return eval_formula_lignes(df, self.texte)
+
+        cols = {}
+        for v in self.variables:
+            if v in df.columns:
+                arr = _colonne_float(df[v])
+                if arr is None:
+                    return eval_formula_lignes(df, self.texte)
+                cols[v] = arr
+
+        cles = None
+        if memo is not None:
+            cles = self._cles_memo()
+            if partagees is not None:
+                cles = {i: c for i, c in cles.items() if c[0] in partagees}
+        ev = _Evaluation(n, cols, memo, cles)
+        with np.errstate(all='ignore'):
+            val, err, _ = ev.eval(self.arbre.body)
+            out = np.where(err, 0.0, val)
+
+        res = pd.Series(out, index=df.index, dtype=float)
+        if ev.exotique.any():
+            res[ev.exotique] = eval_formula_lignes(df[ev.exotique], self.texte).astype(float)
+        return res
+
+
+class _Evaluation:
+    """État d'une évaluation (la FormuleCompilee reste partagée via le cache)."""
+
+    def __init__(self, n, cols, memo=None, cles=None):
+        self._n = n
+        self._cols = cols
+        self._memo = memo
+        self._cles = cles
+        self.exotique = np.zeros(n, dtype=bool)
+
+    def _plein(self, valeur):
+        n = self._n
+        return np.full(n, float(valeur)), np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+    def _erreur(self):
+        n = self._n
+        return np.zeros(n), np.ones(n, dtype=bool), np.zeros(n, dtype=bool)
+
+    def eval(self, node):
+        cle = self._cles.get(id(node)) if self._memo is not None else None
+        if cle is None:
+            return self._eval(node)
+        cle, puissance = cle
+        if cle not in self._memo:
+            if not puissance:
+                self._memo[cle] = (*self._eval(node), None)
+            else:
+                # Lignes « exotiques » du sous-arbre mémorisées avec son résultat
+                avant, self.exotique = self.exotique, np.zeros(self._n, dtype=bool)
+                self._memo[cle] = (*self._eval(node), self.exotique)
+                self.exotique = avant
+        val, err, npy, exo = self._memo[cle]
+        if exo is not None:
+            self.exotique = self.exotique | exo
+        return val, err, npy
+
+    def _eval(self, node):
+        if isinstance(node, ast.Constant):
+            return self._plein(node.value)
+
+        if isinstance(node, ast.Name):
+            if node.id in FONCTIONS or node.id not in self._cols:
+                return self._erreur()
+            n = self._n
+            return self._cols[node.id], np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+        if isinstance(node, ast.BinOp):
+            va, ea, na = self.eval(node.left)
+            vb, eb, nb = self.eval(node.right)
+            npy = na | nb
+            err = ea | eb
+            if isinstance(node.op, ast.Pow):
+                val = np.power(va, vb)
+                ok = ~err & ~npy
+                err = err | (ok & (va == 0) & (vb < 0) & np.isfinite(vb))
+                # Base négative ^ exposant non entier (complexe) ou dépassement : eval() décide
+                self.exotique |= ok & (va < 0) & (vb != np.floor(vb))
+                self.exotique |= ok & ~np.isfinite(val) & np.isfinite(va) & np.isfinite(vb)
+                return val, err, npy
+            val = _OPS_ARITH[type(node.op)](va, vb)
+            if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)):
+                err = err | ((vb == 0) & ~npy)
+            return val, err, npy
+
+        if isinstance(node, ast.UnaryOp):
+            v, e, npy = self.eval(node.operand)
+            if isinstance(node.op, ast.USub):
+                return -v, e, npy
+            if isinstance(node.op, ast.UAdd):
+                return v, e, npy
+            return (v == 0).astype(float), e, np.zeros(self._n, dtype=bool)
+
+        if isinstance(node, ast.BoolOp):
+            val, err, npy = self.eval(node.values[0])
+            for suivant in node.values[1:]:
+                vb, eb, nb = self.eval(suivant)
+                vrai = val != 0
+                continuer = vrai if isinstance(node.op, ast.And) else ~vrai
+                val = np.where(continuer, vb, val)
+                err = err | (continuer & eb)
+                npy = np.where(continuer, nb, npy)
+            return val, err, npy
+
+        if isinstance(node, ast.Compare):
+            gauche, err, npy = self.eval(node.left)
+            res = np.ones(self._n, dtype=bool)
+            actif = np.ones(self._n, dtype=bool)
+            for op, comp in zip(node.ops, node.comparators):
+                droite, ed, nd = self.eval(comp)
+                err = err | (actif & ed)
+                npy = npy | nd
+                res = res & _OPS_CMP[type(op)](gauche, droite)
+                actif = actif & res
+                gauche = droite
+            return res.astype(float), err, npy
+
+        if isinstance(node, ast.IfExp):
+            vt, et, _ = self.eval(node.test)
+            vb, eb, nb = self.eval(node.body)
+            vo, eo, no = self.eval(node.orelse)
+            vrai = vt != 0
+            return np.where(vrai, vb, vo), et | np.where(vrai, eb, eo), np.where(vrai, nb, no)
+
+        if isinstance(node, ast.Call):
+            nom = node.func.id
+            if nom not in FONCTIONS:
+                return self._erreur()
+            args = [self.eval(a) for a in node.args]
+            if nom in ('log', 'sqrt', 'abs'):
+                if len(args) != 1:
+                    return self._erreur()
+                v, e, npy = args[0]
+                if nom == 'abs':
+                    return np.abs(v), e, npy
+                return FONCTIONS[nom](v), e, np.ones(self._n, dtype=bool)
+            # max / min natifs : garde le premier sauf si le suivant est strictement meilleur
+            if len(args) < 2:
+                return self._erreur()
+            val, err, npy = args[0]
+            for vb, eb, nb in args[1:]:
+                meilleur = vb > val if nom == 'max' else vb < val
+                val = np.where(meilleur, vb, val)
+                npy = np.where(meilleur, nb, npy)
+                err = err | eb
+            return val, err, npy
+
+        raise _NonVectorisable
+
+
+def normaliser_formule(formula_str):
+    """Clé de cache : espaces multiples / de bord ramenés à un seul espace."""
+    return " ".join(str(formula_str).split())
+
+
+@lru_cache(maxsize=256)
+def _compiler(texte):
+    return FormuleCompilee(texte)
+
+
+def compiler_formule(formula_str):
+    """Formule compilée (cache LRU sur le texte normalisé)."""
+    return _compiler(normaliser_formule(formula_str))
+
+
+def evaluer_formules(df, formules):
+    """Plusieurs formules sur le même DataFrame -> liste de Series (même ordre).
+
+    Un seul memo pour toutes : une sous-expression commune (ex. 50 / (Cote if
+    Cote > 0 else 1)) n'est calculée qu'une fois.
+    """
+    compilees = [compiler_formule(f) for f in formules]
+    # Seules les sous-expressions vues au moins deux fois sont gardées en mémoire
+    vues = Counter(
+        cle for c in compilees if c.vectorisable
+        for cle, _ in c._cles_memo().values()
+    )
+    partagees = {cle for cle, nb in vues.items() if nb > 1}
+    memo = {}
+    return [c.evaluer(df, memo, partagees) for c in compilees]
+
+
+def variables_formule(formula_str):
+    """Variables référencées par la formule (analyse syntaxique, pas de sous-chaîne)."""
+    return list(compiler_formule(formula_str).variables)
@@ -0,0 +1,379 @@
+"""
+importeur.py — Import des CSV turfbzh dans selections, en lot
+Même règles que l'ancienne boucle ligne à ligne de la page Import :
+- cheval existant (date, hippodrome, course normalisée, numéro) : classement écrit s'il
+  n'en avait pas, sinon ignoré ;
+- cheval absent : créé en import complet, ignoré en mise à jour résultats.
+Extraction vectorisée, json sérialisé en une passe, écritures executemany
+(INSERT ... ON CONFLICT sur la clé naturelle) dans la transaction de l'appelant.
+importer_csv lit le fichier par lots (parseur C) : une transaction par lot,
+mémoire bornée quelle que soit la taille du fichier.
+importer_base copie la table courses d'une base turfbzh (ATTACH) en un seul
+INSERT ... SELECT, json_data construit par SQLite, à partir du dernier jour en base.
+
+    python -m importeur exports/2025-*.csv --db turf_analytics.db
+    python -m importeur resultats.csv --resultats --rang Rang
+    python -m importeur turfbzh_database.db
+    python -m importeur --dedoublonner
+"""
+import argparse
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import db
+from engine import (
+    normalize_course_num, normalize_course_num_col, parse_classement, parse_classement_col, ident_sql
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+AUCUN_RANG = "--- Aucun ---"
+COLONNES_DEFAUT = {'date': 'date', 'hippodrome': 'hippodrome', 'course': 'Course',
+                   'numero': 'Numero', 'cheval': 'Cheval'}
+RANGS_CANDIDATS = ['Rank', 'Rang', 'Arrivee', 'Classement', 'classement']
+TAILLE_LOT = 20000
+SEP_CSV = ';'
+
+SQL_INSERT = """INSERT INTO selections
+    (date, hippodrome, course_num, course_norm, cheval, numero, cote, json_data, classement)
+    VALUES (?,?,?,?,?,?,?,?,?)
+    ON CONFLICT (date, course_norm, numero, hippodrome) DO UPDATE SET classement = excluded.classement
+    WHERE excluded.classement IS NOT NULL AND (classement IS NULL OR classement = 0)"""
+SQL_MAJ = "UPDATE selections SET classement = ? WHERE id = ?"
+
+
+# =====================================================
+# EXTRACTION
+# =====================================================
+def _texte(serie):
+    """clean_text vectorisé : majuscules sans espaces autour, '' si vide."""
+    vide = serie.isna() | ~serie.astype(bool)
+    return serie.astype(str).str.strip().str.upper().mask(vide, "")
+
+
+def _cote(serie):
+    """clean_float vectorisé : décimale française et €, arrondi 0.1, 1.0 si invalide."""
+    s = serie.astype(str).str.replace(',', '.').str.replace('€', '').str.strip()
+    cote = pd.to_numeric(s, errors='coerce').round(1)
+    return cote.where(cote > 0, 1.0)
+
+
+def _dumps(d):
+    if orjson is not None:
+        try:
+            return orjson.dumps(d).decode()
+        except orjson.JSONEncodeError:
+            pass  # entiers > 64 bits... : json standard
+    return json.dumps(d)
+
+
+def _json(df):
+    """Une chaîne json par ligne : clés sans espaces, NaN -> null."""
+    cles = [str(k).replace(' ', '_') for k in df.columns]
+    valeurs = df.astype(object).where(df.notna(), None)
+    return [_dumps(dict(zip(cles, ligne))) for ligne in valeurs.itertuples(index=False, name=None)]
+
+
+def preparer_lot(df, colonnes):
+    """CSV -> lignes à importer (ligne du CSV, date, hippodrome, course, cheval, numero, cote, rang).
+
+    colonnes : {'date', 'hippodrome', 'course', 'numero', 'cheval', 'rang'} -> nom de colonne
+    du CSV ('rang' peut valoir AUCUN_RANG). Lignes au numéro non numérique écartées.
+    Le json n'est sérialisé que pour les lignes créées (importer_selections).
+    """
+    numero = pd.to_numeric(df[colonnes['numero']], errors='coerce')
+    valide = np.isfinite(numero).to_numpy()
+    df = df[valide]
+    course = df[colonnes['course']].astype(str)
+    rang = colonnes.get('rang', AUCUN_RANG)
+    return pd.DataFrame({
+        'ligne': np.flatnonzero(valide),
+        'date': df[colonnes['date']].astype(str),
+        'hippodrome': _texte(df[colonnes['hippodrome']]),
+        'course_num': course,
+        'course_norm': normalize_course_num_col(course),
+        'cheval': _texte(df[colonnes['cheval']]),
+        'numero': numero[df.index].astype(int),
+        'cote': _cote(df['Cote'] if 'Cote' in df.columns else pd.Series(0, index=df.index)),
+        'rang': parse_classement_col(df[rang]) if rang != AUCUN_RANG else 0,
+    }).reset_index(drop=True)
+
+
+# =====================================================
+# IMPORT
+# =====================================================
+# Clé naturelle, comme l'index unique de selections (ON CONFLICT)
+CLE = ['date', 'hippodrome', 'course_norm', 'numero']
+
+
+def _existants(conn, lot):
+    """Chevaux déjà en base pour les dates du lot : id et classement par clé (premier id)."""
+    dates = sorted(lot['date'].unique())
+    lignes = []
+    # Paquets sous la limite de paramètres SQLite
+    for i in range(0, len(dates), 500):
+        paquet = dates[i:i + 500]
+        lignes += conn.execute(
+            f"SELECT id, date, hippodrome, course_norm, numero, classement FROM selections "
+            f"WHERE date IN ({','.join('?' * len(paquet))}) ORDER BY id", paquet
+        ).fetchall()
+    ex = pd.DataFrame(lignes, columns=['id', 'date', 'hippodrome', 'course_norm', 'numero', 'classement_base'])
+    ex['numero'] = pd.to_numeric(ex['numero'], errors='coerce')
+    ex = ex.dropna(subset=['numero']).astype({'numero': int})
+    return ex.drop_duplicates(CLE, keep='first')
+
+
+def importer_selections(conn, df, colonnes, resultats_seuls=False):
+    """Importe le CSV df -> {'imports', 'maj', 'ignores', 'rejetes'}.
+
+    Pas de commit : l'appelant tient la transaction (db.ecriture).
+    """
+    lot = preparer_lot(df, colonnes)
+    compte = {'imports': 0, 'maj': 0, 'ignores': 0, 'rejetes': len(df) - len(lot)}
+    if lot.empty:
+        return compte
+    lot = lot.merge(_existants(conn, lot), on=CLE, how='left')
+    cheval = lot.groupby(CLE, sort=False).ngroup()
+    existe = lot['id'].notna().to_numpy()
+    premier = (cheval.groupby(cheval).cumcount() == 0).to_numpy()
+    cree = ~existe & premier & (not resultats_seuls)
+
+    # Classement de départ de chaque cheval : celui de la base, ou celui de la ligne qui le crée
+    base = lot['classement_base']
+    vide = np.where(existe, (base.isna() | (base == 0)).to_numpy(),
+                    lot['rang'].groupby(cheval).transform('first').to_numpy() == 0)
+    # Première ligne suivante avec un rang : complète le classement (comme une ligne déjà en base)
+    candidat = pd.Series(vide & (lot['rang'] > 0).to_numpy() & (existe | (~premier & (not resultats_seuls))))
+    maj = (candidat & (candidat.groupby(cheval).cumsum() == 1)).to_numpy()
+
+    # Lignes créées : rang de la ligne, à défaut celui d'une ligne suivante du CSV
+    suivant = lot[maj & ~existe][CLE + ['rang']].rename(columns={'rang': 'rang_suivant'})
+    nouveaux = lot[cree].merge(suivant, on=CLE, how='left')
+    classement = nouveaux['rang'].where(nouveaux['rang'] > 0, nouveaux['rang_suivant'])
+    blobs = _json(df.iloc[nouveaux['ligne']])
+    conn.executemany(SQL_INSERT, (
+        (r.date, r.hippodrome, r.course_num, r.course_norm, r.cheval, int(r.numero), float(r.cote),
+         blob, None if pd.isna(c) else int(c))
+        for r, blob, c in zip(nouveaux.itertuples(index=False), blobs, classement)
+    ))
+    a_jour = lot[maj & existe]
+    conn.executemany(SQL_MAJ, zip(a_jour['rang'].astype(int).tolist(), a_jour['id'].astype(int).tolist()))
+
+    compte['imports'] = len(nouveaux)
+    compte['maj'] = int(maj.sum())
+    compte['ignores'] = len(lot) - compte['imports'] - compte['maj']
+    return compte
+
+
+# =====================================================
+# IMPORT EN FLUX
+# =====================================================
+def colonnes_csv(source, sep=SEP_CSV):
+    """Noms de colonnes du CSV (en-tête seul), source rembobinée."""
+    source.seek(0)
+    cols = pd.read_csv(source, sep=sep, nrows=0).columns.tolist()
+    source.seek(0)
+    return cols
+
+
+def lire_csv(source, taille_lot=TAILLE_LOT, sep=SEP_CSV):
+    """Itère (lot, lignes invalides sautées dans ce lot) avec le parseur C.
+
+    Les lignes au mauvais nombre de champs sont sautées ; pandas les signale
+    par ParserWarning (« Skipping line N »), comptées ici.
+    """
+    lecteur = pd.read_csv(source, sep=sep, chunksize=taille_lot, on_bad_lines='warn')
+    while True:
+        with warnings.catch_warnings(record=True) as alertes:
+            warnings.simplefilter("always", pd.errors.ParserWarning)
+            lot = next(lecteur, None)
+        invalides = sum(str(a.message).count("Skipping line") for a in alertes
+                        if issubclass(a.category, pd.errors.ParserWarning))
+        if lot is None:
+            if invalides:
+                yield pd.DataFrame(), invalides
+            return
+        yield lot, invalides
+
+
+def _taille(source):
+    position = source.tell()
+    taille = source.seek(0, 2)
+    source.seek(position)
+    return taille
+
+
+def importer_csv(source, colonnes, resultats_seuls=False, taille_lot=TAILLE_LOT,
+                 db_path=None, progression=None):
+    """Import en flux d'un CSV (fichier ouvert en binaire ou texte) -> compte cumulé.
+
+    Chaque lot est importé par importer_selections dans sa propre transaction :
+    un lot déjà écrit reste en base si un lot suivant échoue.
+    progression(etat) est appelé après chaque lot avec le compte, 'avancement' (0-1),
+    'lignes_s' et 'duree_s'.
+    """
+    with db.ecriture(db_path) as conn:
+        db.exiger_index_selections(conn)
+    total = {'lignes': 0, 'imports': 0, 'maj': 0, 'ignores': 0, 'rejetes': 0, 'invalides': 0,
+             'duree_s': 0.0, 'lignes_s': 0}
+    taille, t0 = _taille(source), time.perf_counter()
+    for lot, invalides in lire_csv(source, taille_lot):
+        total['invalides'] += invalides
+        if not lot.empty:
+            with db.ecriture(db_path) as conn:
+                compte = importer_selections(conn, lot, colonnes, resultats_seuls)
+            total['lignes'] += len(lot)
+            for cle, n in compte.items():
+                total[cle] += n
+        duree = time.perf_counter() - t0
+        total['duree_s'] = round(duree, 2)
+        total['lignes_s'] = round(total['lignes'] / duree) if duree > 0 else 0
+        if progression is not None:
+            progression({**total, 'avancement': min(source.tell() / taille, 1.0) if taille else 1.0})
+    return total
+
+
+# =====================================================
+# IMPORT D'UNE BASE TURFBZH
+# =====================================================
+TABLE_TURFBZH = "courses"
+JSON_MAX_ARGS = 120  # limite SQLite : 127 arguments par fonction
+
+
+def _texte_sql(v):
+    """clean_text pour SQLite (UPPER de SQLite ignore les accents)."""
+    return str(v).strip().upper() if v else ""
+
+
+def _expr_json(cols):
+    """json_object des colonnes source, clés sans espaces ; json_insert au-delà de la limite d'arguments."""
+    # Cellule vide -> null, comme une cellule vide du CSV
+    paires = [(c.replace(' ', '_').replace("'", "''"), f"NULLIF(src.{ident_sql(c)}, '')") for c in cols]
+    n = JSON_MAX_ARGS // 2
+    expr = "json_object(" + ", ".join(f"'{k}', {v}" for k, v in paires[:n]) + ")"
+    for i in range(n, len(paires), n):
+        expr = f"json_insert({expr}, " + ", ".join(
+            f"""'$."{k}"', {v}""" for k, v in paires[i:i + n]) + ")"
+    return expr
+
+
+def importer_base(source, db_path=None, depuis=None, table=TABLE_TURFBZH, colonnes=None, rang=None):
+    """Copie les jours récents d'une base turfbzh dans selections -> compte.
+
+    depuis : première date copiée ; défaut = dernier jour déjà en base (ses
+    résultats arrivent au téléchargement suivant), tout si selections est vide.
+    Même règles que l'import CSV : création des chevaux absents, classement
+    écrit s'il manquait. json_data = json_object des colonnes de la table.
+    """
+    colonnes = {**COLONNES_DEFAUT, **(colonnes or {})}
+    t0 = time.perf_counter()
+    with db.ecriture(db_path) as conn:
+        db.exiger_index_selections(conn)
+    # Connexion dédiée : l'ATTACH ne doit pas rester sur la connexion persistante
+    conn = db.get_conn(db_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src_turfbzh", (source,))
+        cols = [r[1] for r in conn.execute(f"PRAGMA src_turfbzh.table_info({ident_sql(table)})")]
+        if not cols:
+            raise ValueError(f"{source} : table {table} introuvable")
+        manquantes = [c for c in colonnes.values() if c not in cols]
+        if manquantes:
+            raise ValueError(f"{source} : colonnes absentes {manquantes}")
+        rang = rang or next((c for c in RANGS_CANDIDATS if c in cols), None)
+        if depuis is None:
+            depuis = conn.execute("SELECT MAX(date) FROM selections").fetchone()[0] or ""
+        for nom, fn in (("normaliser_course", normalize_course_num), ("rang_int", parse_classement),
+                        ("texte_propre", _texte_sql)):
+            conn.create_function(nom, 1, fn, deterministic=True)
+
+        c = {k: f"src.{ident_sql(v)}" for k, v in colonnes.items()}
+        cote = "CAST(REPLACE(src.\"Cote\", ',', '.') AS REAL)" if 'Cote' in cols else "0"
+        avant = conn.execute("SELECT COALESCE(MAX(id), 0) FROM selections").fetchone()[0]
+        ecrits = conn.execute(f"""
+            INSERT INTO selections
+                (date, hippodrome, course_num, course_norm, cheval, numero, cote, json_data, classement)
+            SELECT CAST({c['date']} AS TEXT), texte_propre({c['hippodrome']}), CAST({c['course']} AS TEXT),
+                   normaliser_course({c['course']}), texte_propre({c['cheval']}), CAST({c['numero']} AS INTEGER),
+                   CASE WHEN {cote} > 0 THEN ROUND({cote}, 1) ELSE 1.0 END,
+                   {_expr_json(cols)},
+                   {f"NULLIF(rang_int(src.{ident_sql(rang)}), 0)" if rang else "NULL"}
+            FROM src_turfbzh.{ident_sql(table)} AS src
+            WHERE {c['date']} >= ? AND CAST({c['numero']} AS INTEGER) > 0
+            ORDER BY {c['date']}, src.rowid
+            ON CONFLICT (date, course_norm, numero, hippodrome) DO UPDATE SET classement = excluded.classement
+            WHERE excluded.classement IS NOT NULL AND (classement IS NULL OR classement = 0)
+        """, (depuis,)).rowcount
+        imports = conn.execute("SELECT COUNT(*) FROM selections WHERE id > ?", (avant,)).fetchone()[0]
+        conn.commit()
+        lus = conn.execute(
+            f"SELECT COUNT(*) FROM src_turfbzh.{ident_sql(table)} AS src WHERE {c['date']} >= ?", (depuis,)
+        ).fetchone()[0]
+        conn.execute("DETACH DATABASE src_turfbzh")
+    finally:
+        conn.close()
+    return {'depuis': depuis, 'lignes': lus, 'imports': imports, 'maj': ecrits - imports,
+            'ignores': lus - ecrits, 'duree_s': round(time.perf_counter() - t0, 3)}
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m importeur", description="Import de CSV turfbzh dans selections")
+    p.add_argument("fichiers", nargs="*", help="CSV séparés par ; ou base turfbzh (.db)")
+    p.add_argument("--db", default=db.DB_PATH, help="Base SQLite")
+    p.add_argument("--resultats", action="store_true", help="CSV : mise à jour des résultats uniquement")
+    p.add_argument("--rang", help="Colonne résultat (défaut : Rank, Rang, Arrivee...)")
+    p.add_argument("--lot", type=int, default=TAILLE_LOT, help="Lignes par transaction")
+    p.add_argument("--depuis", help="Base turfbzh : première date copiée (défaut : dernier jour en base)")
+    p.add_argument("--dedoublonner", action="store_true",
+                   help=f"Supprime d'abord les doublons de selections (copiés dans {db.TABLE_DOUBLONS})")
+    args = p.parse_args(argv)
+    if not args.fichiers and not args.dedoublonner:
+        p.error("aucun fichier à importer")
+
+    if args.dedoublonner:
+        with db.ecriture(args.db) as conn:
+            compte = db.migrer_selections(conn, dedoublonner=True)
+        print(f"{compte['supprimes']} doublons supprimés (copiés dans {db.TABLE_DOUBLONS})", file=sys.stderr)
+
+    for chemin in args.fichiers:
+        if chemin.endswith(".db"):
+            compte = importer_base(chemin, args.db, args.depuis, rang=args.rang)
+            print(f"{chemin} depuis {compte['depuis'] or 'le début'} : {compte['imports']} imports, "
+                  f"{compte['maj']} résultats, {compte['ignores']} ignorés ({compte['duree_s']}s)", file=sys.stderr)
+            continue
+        with open(chemin, 'rb') as f:
+            cols = colonnes_csv(f)
+            manquantes = [c for c in COLONNES_DEFAUT.values() if c not in cols]
+            if manquantes:
+                print(f"{chemin} : colonnes absentes {manquantes}", file=sys.stderr)
+                return 2
+            rang = args.rang or next((c for c in RANGS_CANDIDATS if c in cols), AUCUN_RANG)
+            compte = importer_csv(
+                f, {**COLONNES_DEFAUT, 'rang': rang}, args.resultats, args.lot, args.db,
+                progression=lambda e: print(f"\r  {e['avancement']:.0%} {e['lignes']} lignes "
+                                            f"({e['lignes_s']} lignes/s)", end="", file=sys.stderr),
+            )
+        print(f"\n{chemin} : {compte['imports']} imports, {compte['maj']} résultats, {compte['ignores']} ignorés, "
+              f"{compte['invalides'] + compte['rejetes']} lignes écartées ({compte['duree_s']}s)", file=sys.stderr)
+
+    from feature_store import synchroniser_features
+    conn = db.get_conn(args.db)
+    try:
+        synchroniser_features(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
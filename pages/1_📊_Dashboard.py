@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import get_conn
+from utils import lecture
 
 # Configuration de la page
 st.set_page_config(layout="wide")
@@ -26,8 +26,8 @@ st.markdown("""
 
 st.markdown('<p class="main-title">📊 Tableau de Bord Financier</p>', unsafe_allow_html=True)
 
-conn = get_conn()
-df = pd.read_sql("SELECT * FROM paris ORDER BY date DESC", conn)
+with lecture() as conn:
+    df = pd.read_sql("SELECT * FROM paris ORDER BY date DESC", conn)
 
 if not df.empty:
     # --- FILTRAGE DES DONNÉES ---
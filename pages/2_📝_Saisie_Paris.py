@@ -1,7 +1,5 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-from utils import get_conn
+from utils import run_query, ecriture
 
 st.set_page_config(layout="wide")
 
@@ -16,36 +14,14 @@ st.markdown("""
 
 st.markdown('<p class="main-title">📝 Gestion des Paris Pro</p>', unsafe_allow_html=True)
 
-# --- FONCTION SQL SÉCURISÉE ---
-def run_query(query, params=(), commit=False):
-    conn = get_conn()
-    cursor = conn.cursor()
-    result = None
-    try:
-        cursor.execute(query, params)
-        if commit:
-            conn.commit()
-        else:
-            result = cursor.fetchall()
-            if cursor.description:
-                cols = [column[0] for column in cursor.description]
-                result = pd.DataFrame(result, columns=cols)
-    except Exception as e:
-        st.error(f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        conn.close()
-    return result
-
 # --- INITIALISATION ---
-with get_conn() as conn:
+with ecriture() as conn:
     cursor = conn.cursor()
     cursor.execute("PRAGMA table_info(paris)")
     existing_cols = [col[1] for col in cursor.fetchall()]
     for col in ["type_pari", "mode_pari"]:
         if col not in existing_cols:
             cursor.execute(f"ALTER TABLE paris ADD COLUMN {col} TEXT DEFAULT '-'")
-    conn.commit()
 
 # --- FORMULAIRE DE SAISIE ---
 with st.expander("➕ Placer un nouveau pari", expanded=True):
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import json
 import numpy as np
-from utils import run_query, get_conn
+from utils import run_query
 
 st.set_page_config(layout="wide")
 
@@ -20,7 +20,7 @@ st.markdown('<p class="main-title">🎯 Sélections Personnalisées & Analyse IA
 
 # --- FILTRE DATE ---
 date_sel = st.date_input("Choisir une date", value=pd.Timestamp.now())
-raw_data = run_query("SELECT * FROM selections WHERE date = ?", (str(date_sel),))
+raw_data = run_query("SELECT * FROM selections WHERE date = ? ORDER BY id", (str(date_sel),))
 
 if raw_data is not None and not raw_data.empty:
     
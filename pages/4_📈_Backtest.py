@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils import get_conn
+from utils import lecture
 
 # Configuration de la page
 st.set_page_config(layout="wide")
@@ -18,8 +18,8 @@ st.markdown("""
 st.markdown('<p class="main-title">📈 Backtest Stratégique</p>', unsafe_allow_html=True)
 
 # Chargement des données de paris (résultats réels)
-conn = get_conn()
-df = pd.read_sql("SELECT * FROM paris", conn)
+with lecture() as conn:
+    df = pd.read_sql("SELECT * FROM paris", conn)
 
 if not df.empty:
     st.sidebar.header("⚙️ Paramètres du Test")
@@ -1,8 +1,7 @@
 import streamlit as st
-import pandas as pd
-import json
-import re
-from utils import get_conn, clean_float, clean_text
+from utils import ecriture, migrer_selections, TABLE_DOUBLONS
+from importeur import importer_csv, colonnes_csv
+from feature_store import synchroniser_features, reconstruire_features
 
 st.set_page_config(layout="wide", page_title="Importation & Résultats")
 
@@ -18,10 +17,9 @@ file = st.file_uploader("Charger le fichier CSV (Courses ou Résultats)", type=[
 
 if file:
     try:
-        df = pd.read_csv(file, sep=';', engine='python', on_bad_lines='skip')
-        st.success(f"✅ Fichier chargé : {len(df)} lignes.")
-        
-        cols = df.columns.tolist()
+        # En-tête seul : le fichier est lu par lots au lancement (importer_csv)
+        cols = colonnes_csv(file)
+        st.success(f"✅ Fichier chargé : {len(cols)} colonnes.")
         
         # --- Auto-détection de la colonne Rank ---
         def find_col(candidates, columns):
@@ -57,79 +55,34 @@ if file:
         ])
 
         if st.button("🚀 Lancer", type="primary", use_container_width=True):
-            conn = get_conn()
-            success_import = 0
-            success_update = 0
-            skipped = 0
-
-            for _, row in df.iterrows():
-                try:
-                    val_num = int(row[m_num])
-                    val_date = str(row[m_date])
-                    val_course = str(row[m_course])
-                    
-                    # Vérifier si le cheval existe déjà
-                    check = conn.execute(
-                        "SELECT id, classement FROM selections WHERE date=? AND course_num=? AND numero=?", 
-                        (val_date, val_course, val_num)
-                    ).fetchone()
-
-                    # --- Extraction du classement depuis la colonne choisie ---
-                    rang_val = 0
-                    if m_rang != "--- Aucun ---":
-                        raw_rang = row.get(m_rang, None)
-                        if raw_rang is not None and pd.notna(raw_rang):
-                            s = str(raw_rang).strip().upper()
-                            if s not in ("", "D", "NR", "NP", "DAI", "DB", "AR", "T", "RET", "DIS", "SOL"):
-                                match = re.search(r'\d+', s)
-                                if match:
-                                    rang_val = int(match.group())
-
-                    if check:
-                        # Le cheval existe déjà → mettre à jour le classement si on en a un
-                        existing_classement = check[1]
-                        if rang_val > 0 and (existing_classement is None or existing_classement == 0 or pd.isna(existing_classement)):
-                            conn.execute(
-                                "UPDATE selections SET classement = ? WHERE id = ?",
-                                (rang_val, check[0])
-                            )
-                            success_update += 1
-                        else:
-                            skipped += 1
-                    
-                    elif mode.startswith("🔄"):
-                        # Mode import complet : créer la ligne
-                        raw_dict = row.to_dict()
-                        clean_dict = {str(k).replace(' ', '_'): v for k, v in raw_dict.items()}
-                        # Nettoyer les NaN du JSON
-                        clean_dict = {k: (v if pd.notna(v) else None) for k, v in clean_dict.items()}
-                        full_row_json = json.dumps(clean_dict)
-                        
-                        conn.execute("""INSERT INTO selections 
-                            (date, hippodrome, course_num, cheval, numero, cote, json_data, classement) 
-                            VALUES (?,?,?,?,?,?,?,?)""",
-                            (val_date, clean_text(row[m_hippo]), val_course, 
-                             clean_text(row[m_cheval]), val_num, clean_float(str(row.get('Cote', 0))), 
-                             full_row_json, rang_val if rang_val > 0 else None))
-                        success_import += 1
-                    else:
-                        # Mode résultats uniquement : on skip si le cheval n'existe pas
-                        skipped += 1
-
-                except Exception as e:
-                    continue
-            
-            conn.commit()
-            conn.close()
+            # Import en flux : lots de TAILLE_LOT lignes, une transaction par lot
+            barre = st.progress(0.0, text="Import en cours…")
+            compte = importer_csv(
+                file,
+                {'date': m_date, 'hippodrome': m_hippo, 'course': m_course,
+                 'numero': m_num, 'cheval': m_cheval, 'rang': m_rang},
+                resultats_seuls=not mode.startswith("🔄"),
+                progression=lambda e: barre.progress(
+                    e['avancement'], text=f"{e['lignes']:,} lignes — {e['lignes_s']:,} lignes/s".replace(',', ' ')),
+            )
+            barre.empty()
+            success_import, success_update, skipped = compte['imports'], compte['maj'], compte['ignores']
+            with ecriture() as conn:
+                n_features = synchroniser_features(conn)
 
             # --- Résumé ---
             col_r1, col_r2, col_r3 = st.columns(3)
             col_r1.metric("📥 Nouveaux imports", success_import)
             col_r2.metric("🏁 Résultats mis à jour", success_update)
             col_r3.metric("⏭️ Ignorés (doublons)", skipped)
+            st.caption(f"⏱️ {compte['lignes']:,} lignes en {compte['duree_s']}s ({compte['lignes_s']:,} lignes/s)".replace(',', ' '))
+            if compte['rejetes'] or compte['invalides']:
+                st.caption(f"⚠️ {compte['invalides']} lignes mal formées sautées, "
+                           f"{compte['rejetes']} lignes sans numéro valide écartées")
             
             if success_update > 0 or success_import > 0:
                 st.success(f"✨ Terminé !")
+                st.caption(f"🧱 Feature store : {n_features} chevaux ajoutés")
                 if success_update > 0:
                     st.balloons()
             else:
@@ -137,29 +90,20 @@ if file:
 
         # --- OUTIL DE NETTOYAGE DOUBLONS ---
         with st.expander("🧹 Nettoyer les doublons existants en base"):
-            st.caption("Supprime les lignes en double pour une même date/course/numéro en gardant celle avec le classement.")
+            st.caption("Supprime les lignes en double pour une même date/hippodrome/course/numéro en gardant celle avec le classement, "
+                       f"puis pose l'index unique. Les lignes supprimées sont copiées dans la table {TABLE_DOUBLONS}.")
             if st.button("🧹 Nettoyer les doublons", type="secondary"):
-                conn = get_conn()
-                # Garde l'ID avec le meilleur classement (non null > null, plus grand id en cas d'égalité)
-                deleted = conn.execute("""
-                    DELETE FROM selections 
-                    WHERE id NOT IN (
-                        SELECT id FROM (
-                            SELECT id,
-                                ROW_NUMBER() OVER (
-                                    PARTITION BY date, course_num, numero 
-                                    ORDER BY 
-                                        CASE WHEN classement IS NOT NULL AND classement != 0 THEN 0 ELSE 1 END,
-                                        id DESC
-                                ) as rn
-                            FROM selections
-                        ) WHERE rn = 1
-                    )
-                """).rowcount
-                conn.commit()
-                conn.close()
+                with ecriture() as conn:
+                    deleted = migrer_selections(conn, dedoublonner=True)['supprimes']
                 st.success(f"🧹 {deleted} doublons supprimés !")
-                st.rerun()
+
+        # --- FEATURE STORE ---
+        with st.expander("🧱 Feature store"):
+            st.caption("Colonnes typées extraites de json_data à l'import, lues directement par l'Algo Builder.")
+            if st.button("🔄 Reconstruire le feature store", type="secondary"):
+                with ecriture() as conn:
+                    n = reconstruire_features(conn)
+                st.success(f"🧱 {n} chevaux indexés.")
 
     except Exception as e:
         st.error(f"Erreur : {e}")
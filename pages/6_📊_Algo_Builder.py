@@ -8,18 +8,23 @@ sys.path.insert(0, _root)
 
 from utils import run_query
 from engine import (
-    charger_donnees, preparer_dataframe, appliquer_filtres,
-    calculer_colonnes, calculer_scores, get_courses
+    calculer_colonnes, calculer_scores, get_courses,
+    colonnes_requises, CourseIndex
 )
+from formule import compiler_formule
 from utils_algo import FORMULES_PRESET, DISC_MAP, disc_txt
 from algo_mode_simple import render_simple
 from algo_mode_duo import render_duo
 from algo_mode_trio import render_trio
 from algo_mode_borda4 import render_borda4
-from filtres_course import render_filtres_course, appliquer_filtres_course
-from filtres_cheval import render_filtres_cheval, appliquer_filtres_cheval
-from filtres_avance import render_filtres_avance, appliquer_filtres_avance
+from filtres_course import render_filtres_course
+from filtres_cheval import render_filtres_cheval
+from filtres_avance import render_filtres_avance
 from algo_export import auto_save_readme, generer_readme, generer_json
+from algo_cli import preparer_algo, plan_filtres
+from algo_sweep import comparer_formules
+from profilage import Profileur, mesurer
+from cache_donnees import CACHE_PREPARE, CACHE_SCORES, CACHE_EVAL, cle_periode, cle_scores, frame_prepare
 
 PROJECT_ROOT = _root
 
@@ -120,11 +125,53 @@ with bc:
         )
 with bd:
     btn_run = st.button("🚀 LANCER", type="primary", use_container_width=True)
+    profil_memoire = st.checkbox("⏱️ Profilage mémoire", help="Pic mémoire par étape (tracemalloc) : ralentit le calcul. "
+                                   "Une étape mesurée à la fois pour toutes les sessions ; "
+                                   "pic approximatif si d'autres sessions calculent en même temps")
+
+algos_dispo = dict(FORMULES_PRESET)
+if not algos_df.empty:
+    algos_dispo.update(zip(algos_df['nom'], algos_df['formule']))
+with st.expander("⚖️ Comparer plusieurs algos"):
+    choix_algos = st.multiselect("Algos", list(algos_dispo), default=list(FORMULES_PRESET))
+    btn_comparer = st.button("⚖️ COMPARER", use_container_width=True)
+
+# =====================================================
+# COMPARAISON (un chargement, N colonnes)
+# =====================================================
+if btn_comparer:
+    algos_cmp = {n: algos_dispo[n] for n in choix_algos}
+    if formule_raw and formule_raw not in algos_cmp.values():
+        algos_cmp["✏️ Formule courante"] = formule_raw
+    if not algos_cmp:
+        st.warning("Aucun algo sélectionné.")
+        st.stop()
+    colonnes = set()
+    for f in algos_cmp.values():
+        colonnes |= colonnes_requises(compiler_formule(f).variables)
+    df_cmp, _ = preparer_algo(run_query, date_start, date_end, colonnes, filtres_c, filtres_ch, filtres_av)
+    if df_cmp is None:
+        st.warning("Aucune donnée après filtres.")
+        st.stop()
+    table = comparer_formules(df_cmp, algos_cmp)
+    st.caption(f"⚖️ {len(algos_cmp)} algos | {table.attrs['courses']} courses terminées | "
+               f"% des courses, ROI en % (Simple 1€ SG/SP, Trio 2€ G + 3×1€ P)")
+    st.dataframe(table, use_container_width=True)
 
 # =====================================================
 # MOTEUR
 # =====================================================
+# Le dernier LANCER reste affiché tant que période, formule et filtres qui
+# retirent des chevaux ne changent pas : pastille, concordance et coup de folie
+# se rejouent sur le frame scoré en cache (évaluation elle-même en cache par réglage)
+periode = cle_periode(date_start, date_end)
+cle_lancement = cle_scores(periode, formule_raw, filtres_c, filtres_ch, filtres_av)
 if btn_run:
+    st.session_state['algo_lance'] = cle_lancement
+elif 'algo_lance' in st.session_state and st.session_state['algo_lance'] != cle_lancement:
+    st.info("🔄 Période, formule ou filtres modifiés : LANCER pour recalculer.")
+
+if st.session_state.get('algo_lance') == cle_lancement:
     print("\n" + "=" * 60)
     print("🚀 ALGO BUILDER - LANCEMENT")
     print("=" * 60)
@@ -132,62 +179,45 @@ if btn_run:
     print(f"  Mode: {mode_affichage}")
     print(f"  Formule: {formule_raw[:80]}...")
 
-    raw_data = charger_donnees(run_query, date_start, date_end)
-    if raw_data.empty:
-        st.warning("Aucune donnée.")
-        st.stop()
-
-    print(f"\n📦 Données brutes: {len(raw_data)} lignes")
+    prof = Profileur(memoire=profil_memoire)
+    formule_c = compiler_formule(formule_raw)
+    colonnes = colonnes_requises(formule_c.variables)
 
     try:
-        df = preparer_dataframe(raw_data)
-        print(f"📦 Après preparer_dataframe: {len(df)} lignes")
-
-        # Colonnes disponibles
-        print(f"📋 Colonnes dispo ({len(df.columns)}): {sorted(df.columns.tolist())[:30]}...")
-
-        # Filtres de base (hippo, disc, partants)
-        df = appliquer_filtres(
-            df, filtres_c['hippo'], filtres_c['disc'], filtres_c['partants']
-        )
-        print(f"\n🔍 Après filtres de base (hippo/disc/partants): {len(df)} lignes")
-
-        if df.empty:
-            st.warning("Aucune course après filtres de base.")
-            st.stop()
-
-        # Filtres course avancés
-        print("\n--- FILTRES COURSE ---")
-        df = appliquer_filtres_course(df, filtres_c)
-        print(f"  => Après filtres course: {len(df)} lignes")
-
-        if df.empty:
-            st.warning("Aucune donnée après filtres course.")
-            st.stop()
-
-        # Filtres cheval
-        print("\n--- FILTRES CHEVAL ---")
-        df = appliquer_filtres_cheval(df, filtres_ch)
-        print(f"  => Après filtres cheval: {len(df)} lignes")
-
-        if df.empty:
-            st.warning("Aucune donnée après filtres cheval.")
-            st.stop()
-
-        # Filtres avancés
-        print("\n--- FILTRES AVANCÉS ---")
-        df = appliquer_filtres_avance(df, filtres_av)
-        print(f"  => Après filtres avancés: {len(df)} lignes")
-
-        if df.empty:
-            st.warning("Aucune donnée après filtres avancés.")
-            st.stop()
-
-        # Calculs
-        print("\n⚙️ Calcul colonnes + scores...")
-        df = calculer_colonnes(df)
-        df = calculer_scores(df, formule_raw)
-        all_courses, courses_avec, courses_sans = get_courses(df)
+        calcul = CACHE_SCORES.get(cle_lancement)
+        if calcul is not None:
+            df, index, selectivite = calcul
+            print(f"♻️ Frame scoré en cache: {len(df)} lignes")
+        else:
+            df = frame_prepare(run_query, periode, colonnes, prof)
+            if df is None:
+                st.warning("Aucune donnée.")
+                st.stop()
+            print(f"  Variables formule: {', '.join(formule_c.variables)}")
+            print(f"📦 Après preparer_dataframe: {len(df)} lignes")
+
+            # Colonnes disponibles
+            print(f"📋 Colonnes dispo ({len(df.columns)}): {sorted(df.columns.tolist())[:30]}...")
+
+            # Tous les filtres en un passage : un masque combiné, une copie
+            print("\n--- FILTRES ---")
+            plan = plan_filtres(filtres_c, filtres_ch, filtres_av)
+            df = mesurer(prof, "filtres", plan.appliquer, df)
+            selectivite = plan.tableau()
+            print(f"  => Après filtres: {len(df)} lignes")
+
+            if df.empty:
+                st.warning("Aucune donnée après filtres.")
+                st.stop()
+
+            # Calculs
+            print("\n⚙️ Calcul colonnes + scores...")
+            df = mesurer(prof, "calculer_colonnes", calculer_colonnes, df)
+            df = mesurer(prof, "calculer_scores", calculer_scores, df, formule_raw)
+            index = mesurer(prof, "CourseIndex", CourseIndex, df)
+            CACHE_SCORES.put(cle_lancement, (df, index, selectivite))
+
+        all_courses, courses_avec, courses_sans = mesurer(prof, "get_courses", get_courses, df, index)
 
         print(f"✅ {len(all_courses)} courses ({len(courses_avec)} terminées, {len(courses_sans)} en attente)")
 
@@ -206,6 +236,10 @@ if btn_run:
         ])
         badge = f" | 🔧 {nb_filtres} filtres" if nb_filtres else ""
 
+        if not selectivite.empty:
+            with st.expander(f"🔍 Sélectivité des filtres — {len(selectivite)} appliqués"):
+                st.dataframe(selectivite, use_container_width=True, hide_index=True)
+
         st.caption(
             f"📊 {len(all_courses)} courses "
             f"({len(courses_avec)} terminées) | "
@@ -222,27 +256,31 @@ if btn_run:
             render_simple(
                 df, courses_avec, courses_sans,
                 date_start, date_end,
-                filtre_pastille=filtres_av['pastille']
+                filtre_pastille=filtres_av['pastille'],
+                index=index, profileur=prof, cle_cache=cle_lancement
             )
         elif mode_affichage == "Duo (2 chevaux)":
             render_duo(
                 df, courses_avec, courses_sans,
                 date_start, date_end,
                 filtres_av['confiance_on'], filtres_av['seuil_conc'],
-                filtres_av['unanime'], filtres_av['pastille']
+                filtres_av['unanime'], filtres_av['pastille'],
+                index=index, profileur=prof, cle_cache=cle_lancement
             )
         elif mode_affichage == "Trio + Folie (3+1)":
             render_trio(
                 df, courses_avec, courses_sans,
                 date_start, date_end,
                 filtres_av['folie_cote_min'], filtres_av['folie_taux_min'],
-                filtre_pastille=filtres_av['pastille']
+                filtre_pastille=filtres_av['pastille'],
+                index=index, profileur=prof, cle_cache=cle_lancement
             )
         elif mode_affichage == "Borda 4 chevaux":
             render_borda4(
                 df, courses_avec, courses_sans,
                 date_start, date_end,
-                filtre_pastille=filtres_av['pastille']
+                filtre_pastille=filtres_av['pastille'],
+                index=index, profileur=prof, cle_cache=cle_lancement
             )
 
     except Exception as e:
@@ -250,4 +288,15 @@ if btn_run:
         st.error(f"Erreur : {e}")
         import traceback
         st.code(traceback.format_exc())
-        print(traceback.format_exc())
\ No newline at end of file
+        print(traceback.format_exc())
+    finally:
+        prof.fin()
+
+    if prof.etapes:
+        with st.expander(f"⏱️ Profilage — {prof.total():.2f}s"):
+            st.dataframe(prof.tableau(), use_container_width=True, hide_index=True)
+            cp, cs, ce = CACHE_PREPARE.stats(), CACHE_SCORES.stats(), CACHE_EVAL.stats()
+            st.caption(f"♻️ Cache préparé : {cp['entrees']} entrées, {cp['taille_mo']} Mo, {cp['succes']}/{cp['lectures']} | "
+                       f"scoré : {cs['entrees']} entrées, {cs['taille_mo']} Mo, {cs['succes']}/{cs['lectures']} | "
+                       f"évaluation : {ce['entrees']} entrées, {ce['taille_mo']} Mo, {ce['succes']}/{ce['lectures']}")
+        print("⏱️ Profil par étape :\n" + prof.texte())
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+profilage.py — Mesure par étape de la chaîne Algo Builder
+Temps, lignes en entrée / sortie et pic mémoire (tracemalloc) de chaque
+étape : charger_donnees, preparer_dataframe, filtres, calculer_colonnes,
+calculer_scores, évaluation du mode.
+
+    prof = Profileur(memoire=True)
+    df = mesurer(prof, "preparer_dataframe", preparer_dataframe, raw_data, colonnes)
+    prof.tableau()
+
+Sans profileur (None), mesurer() appelle directement la fonction.
+
+tracemalloc est global au processus, partagé par les sessions Streamlit :
+démarré par le premier profileur mémoire actif, arrêté par le dernier, et
+les étapes mesurées en mémoire passent une à la fois (reset_peak commun).
+Le pic d'une étape compte aussi ce qu'allouent pendant ce temps les autres
+threads (sessions sans profilage mémoire) : ordre de grandeur, pas un
+chiffre exact quand plusieurs sessions calculent en même temps.
+"""
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+def _lignes(x):
+    """Nombre de lignes d'un résultat d'étape (DataFrame, résultat evaluate_*, tuple)."""
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        return len(x)
+    if isinstance(x, dict) and 'courses' in x:
+        return len(x['courses'])
+    if isinstance(x, tuple) and x:
+        return _lignes(x[0])
+    return None
+
+
+# Profileurs mémoire actifs ; tracemalloc démarré par ce module (pas par -X tracemalloc)
+_VERROU = threading.Lock()
+_ACTIFS = 0
+_DEMARRE_ICI = False
+# Une étape mesurée en mémoire à la fois, toutes sessions confondues
+_MESURE = threading.RLock()
+
+
+def _ouvrir_memoire():
+    global _ACTIFS, _DEMARRE_ICI
+    with _VERROU:
+        if _ACTIFS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _DEMARRE_ICI = True
+        _ACTIFS += 1
+
+
+def _fermer_memoire():
+    global _ACTIFS, _DEMARRE_ICI
+    with _VERROU:
+        _ACTIFS -= 1
+        if _ACTIFS == 0 and _DEMARRE_ICI:
+            tracemalloc.stop()
+            _DEMARRE_ICI = False
+
+
+class Profileur:
+    """Journal des étapes d'un lancement.
+
+    memoire=True : pic mémoire par étape via tracemalloc (actif jusqu'à fin()) ;
+    coûteux, à réserver au diagnostic. Les étapes ne s'imbriquent pas.
+    """
+
+    def __init__(self, memoire=False):
+        self.memoire = memoire
+        self.etapes = []
+        self._ouvert = False
+        if memoire:
+            _ouvrir_memoire()
+            self._ouvert = True
+
+    def mesurer(self, nom, fn, *args, **kwargs):
+        entree = _lignes(args[0]) if args else None
+        if self._ouvert:
+            with _MESURE:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                t0 = time.perf_counter()
+                res = fn(*args, **kwargs)
+                duree = time.perf_counter() - t0
+                pic = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        else:
+            t0 = time.perf_counter()
+            res = fn(*args, **kwargs)
+            duree = time.perf_counter() - t0
+            pic = None
+        self.etapes.append({
+            'etape': nom, 'duree_s': round(duree, 4),
+            'lignes_entree': entree, 'lignes_sortie': _lignes(res),
+            'pic_mo': round(pic, 1) if pic is not None else None,
+        })
+        return res
+
+    def fin(self):
+        """Libère le profilage mémoire (tracemalloc s'arrête avec le dernier profileur actif)."""
+        if self._ouvert:
+            self._ouvert = False
+            _fermer_memoire()
+
+    def total(self):
+        return round(sum(e['duree_s'] for e in self.etapes), 4)
+
+    def tableau(self):
+        """DataFrame des étapes (+ part du temps total en %)."""
+        t = pd.DataFrame(self.etapes, columns=['etape', 'duree_s', 'lignes_entree', 'lignes_sortie', 'pic_mo'])
+        total = self.total()
+        t['part_%'] = (t['duree_s'] / total * 100).round(1) if total else 0.0
+        if not self.memoire:
+            t = t.drop(columns=['pic_mo'])
+        return t
+
+    def texte(self):
+        """Résumé une ligne par étape (logs, stderr)."""
+        lignes = []
+        for e in self.etapes:
+            io = f"{e['lignes_entree'] if e['lignes_entree'] is not None else '-'} -> " \
+                 f"{e['lignes_sortie'] if e['lignes_sortie'] is not None else '-'}"
+            mem = f"  pic {e['pic_mo']} Mo" if e['pic_mo'] is not None else ""
+            lignes.append(f"  {e['etape']:<28} {e['duree_s']:>8.3f}s  {io:>16}{mem}")
+        lignes.append(f"  {'TOTAL':<28} {self.total():>8.3f}s")
+        return "\n".join(lignes)
+
+
+def mesurer(profileur, nom, fn, *args, **kwargs):
+    """profileur.mesurer(...) si un profileur est actif, sinon appel direct."""
+    if profileur is None:
+        return fn(*args, **kwargs)
+    return profileur.mesurer(nom, fn, *args, **kwargs)
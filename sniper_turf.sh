@@ -5,6 +5,9 @@ cd ~/D/turfpro/
 # 1. Télécharger la nouvelle base
 curl -s -O https://www.turf.bzh/downloads/turfbzh_database.db
 
+# 1b. Copier les nouveaux jours (et les résultats de la veille) dans la base de l'app
+python -m importeur turfbzh_database.db
+
 # 2. Créer le fichier de résultats du jour
 echo "--- PRONOSTICS DU $(date +%Y-%m-%d) ---" > pronos_du_jour.txt
 
@@ -4,6 +4,7 @@ Concordance F/IA/H pour tous les modes
 """
 import pandas as pd
 import numpy as np
+from engine import CourseIndex
 
 
 # =====================================================
@@ -185,6 +186,186 @@ def get_pastille_borda4(concordance, unanime):
         return "🔴", "Basse"
 
 
+# =====================================================
+# CONCORDANCE PAR LOT (toutes les courses d'un coup)
+# Mêmes règles que les fonctions par course ci-dessus,
+# calculées sur les tableaux top-k du CourseIndex.
+# Une ligne par ID_C : concordance, unanime, pastille,
+# pastille_label + détail (tops en tableaux de Numéros).
+# =====================================================
+def _index(df):
+    return df if isinstance(df, CourseIndex) else CourseIndex(df)
+
+
+def _vide(index, k):
+    return np.full((len(index), k), -1, dtype=np.int64)
+
+
+def _uniques(a):
+    """Masque des Numéros comptés dans le set (hors bourrage -1, doublons exclus)."""
+    m = a >= 0
+    for j in range(1, a.shape[1]):
+        m[:, j] &= ~(a[:, :j] == a[:, j:j + 1]).any(axis=1)
+    return m
+
+
+def _taille(a):
+    return _uniques(a).sum(axis=1)
+
+
+def _communs(a, b):
+    """len(set(a) & set(b)) ligne par ligne."""
+    return (_uniques(a) & (a[:, :, None] == b[:, None, :]).any(axis=2)).sum(axis=1)
+
+
+def _egaux(a, b):
+    """set(a) == set(b) ligne par ligne."""
+    na = _taille(a)
+    return (na == _taille(b)) & (_communs(a, b) == na)
+
+
+def _en_sets(a):
+    return [np.unique(r[r >= 0]) for r in a]
+
+
+def _pastilles(table, get_pastille):
+    """Applique get_pastille une fois par couple (concordance, unanime) distinct."""
+    couples = {c: get_pastille(*c) for c in zip(table['concordance'].tolist(), table['unanime'].tolist())}
+    res = [couples[c] for c in zip(table['concordance'].tolist(), table['unanime'].tolist())]
+    table['pastille'] = [r[0] for r in res]
+    table['pastille_label'] = [r[1] for r in res]
+    return table
+
+
+def _table(index, actives, colonnes, get_pastille):
+    table = pd.DataFrame(colonnes, index=pd.Index(index.courses, name='ID_C'))
+    table['concordance'] = np.where(actives, table['concordance'], 0).astype(int)
+    table['unanime'] = actives & table['unanime'].to_numpy(dtype=bool)
+    return _pastilles(table, get_pastille)
+
+
+def _partants(index):
+    return index.fins - index.debuts
+
+
+def calculer_confiance_simple_lot(df, col_score='SCORE', get_pastille=None):
+    index = _index(df)
+    cols = index.df.columns
+    actives = _partants(index) >= 2
+    n1_f = index.top_numeros(col_score, 1)[:, 0]
+    if 'IA_Borda_Rank' in cols:
+        n1_ia = index.top_numeros('IA_Borda_Rank', 1, plus_petit=True)[:, 0]
+    elif 'IA_Gagnant' in cols:
+        n1_ia = index.top_numeros('IA_Gagnant', 1)[:, 0]
+    else:
+        n1_ia = np.full(len(index), -1)
+    n1_h = index.top_numeros('HYBRIDE', 1)[:, 0] if 'HYBRIDE' in cols else np.full(len(index), -1)
+
+    accord = (n1_f == n1_ia).astype(int) + (n1_f == n1_h) + ((n1_ia == n1_h) & (n1_ia != -1))
+    unanime = (n1_f == n1_ia) & (n1_ia == n1_h) & (n1_ia != -1)
+
+    # Écart de score entre N°1 et N°2 (bonus 0-2)
+    pos = index.top_k(col_score, 2)
+    v = index.df[col_score].to_numpy(dtype=float)
+    s0 = np.where(pos[:, 0] >= 0, v[pos[:, 0]], np.nan) if len(v) else np.zeros(len(index))
+    s1 = np.where(pos[:, 1] >= 0, v[pos[:, 1]], np.nan) if len(v) else np.zeros(len(index))
+    with np.errstate(all='ignore'):
+        ecart_pct = np.where((pos[:, 1] >= 0) & (s0 != 0), (s0 - s1) / np.abs(s0) * 100, 0.0)
+    bonus_ecart = np.select([ecart_pct > 20, ecart_pct > 10], [2, 1], 0)
+
+    return _table(index, actives, {
+        'concordance': accord + bonus_ecart, 'unanime': unanime,
+        'n1_f': n1_f, 'n1_ia': n1_ia, 'n1_h': n1_h,
+        'ecart_pct': np.round(ecart_pct, 1), 'accord': accord, 'bonus_ecart': bonus_ecart,
+    }, get_pastille or get_pastille_simple)
+
+
+def _concordance_k(index, k, top_f, top_ia, top_h, actives, get_pastille, prefixe):
+    f_ia, f_h, ia_h = _communs(top_f, top_ia), _communs(top_f, top_h), _communs(top_ia, top_h)
+    avec_ia_h = (_taille(top_ia) > 0) & (_taille(top_h) > 0)
+    unanime = avec_ia_h & _egaux(top_f, top_ia) & _egaux(top_ia, top_h)
+    return _table(index, actives, {
+        'concordance': f_ia + f_h + ia_h, 'unanime': unanime,
+        f'{prefixe}_f': _en_sets(top_f), f'{prefixe}_ia': _en_sets(top_ia), f'{prefixe}_h': _en_sets(top_h),
+        'f_ia': f_ia, 'f_h': f_h, 'ia_h': ia_h,
+    }, get_pastille)
+
+
+def calculer_confiance_duo_lot(df, col_score='SCORE', get_pastille=None):
+    index = _index(df)
+    cols = index.df.columns
+    top_f = index.top_numeros(col_score, 2)
+    if 'IA_Borda_Rank' in cols:
+        top_ia = index.top_numeros('IA_Borda_Rank', 2, plus_petit=True)
+    elif 'IA_Couple_Rank' in cols:
+        top_ia = index.top_numeros('IA_Couple_Rank', 2, plus_petit=True)
+    else:
+        top_ia = _vide(index, 2)
+    top_h = index.top_numeros('HYBRIDE', 2) if 'HYBRIDE' in cols else _vide(index, 2)
+    table = _concordance_k(index, 2, top_f, top_ia, top_h, _partants(index) >= 3,
+                           get_pastille or get_pastille_duo, 'duo')
+    table['nb_uniques'] = _taille(np.hstack([top_f, top_ia, top_h]))
+    return table
+
+
+def calculer_confiance_trio_lot(df, col_score='SCORE', get_pastille=None):
+    index = _index(df)
+    cols = index.df.columns
+    top_f = index.top_numeros(col_score, 3)
+    top_ia = index.top_numeros('IA_Borda_Rank', 3, plus_petit=True) if 'IA_Borda_Rank' in cols else _vide(index, 3)
+    top_h = index.top_numeros('HYBRIDE', 3) if 'HYBRIDE' in cols else _vide(index, 3)
+    return _concordance_k(index, 3, top_f, top_ia, top_h, _partants(index) >= 4,
+                          get_pastille or get_pastille_trio, 'trio')
+
+
+def top4_borda_lot(index):
+    """Top 4 Borda de chaque course : Borda si la somme de la course est > 0, sinon Borda_Rank.
+
+    Retourne (Numéros (courses, 4), masque des courses sans Borda exploitable).
+    """
+    cols = index.df.columns
+    top = _vide(index, 4)
+    par_borda = np.zeros(len(index), dtype=bool)
+    if 'Borda' in cols and len(index):
+        somme = np.add.reduceat(np.nan_to_num(index.df['Borda'].to_numpy(dtype=float)), index.debuts)
+        par_borda = somme > 0
+        top[par_borda] = index.top_numeros('Borda', 4)[par_borda]
+    if 'Borda_Rank' in cols:
+        top[~par_borda] = index.top_numeros('Borda_Rank', 4, plus_petit=True)[~par_borda]
+        return top, np.zeros(len(index), dtype=bool)
+    return top, ~par_borda
+
+
+def calculer_confiance_borda4_lot(df, col_score='SCORE', get_pastille=None):
+    index = _index(df)
+    cols = index.df.columns
+    top_b, sans_borda = top4_borda_lot(index)
+    top_f = index.top_numeros(col_score, 4)
+    top_h = index.top_numeros('HYBRIDE', 4) if 'HYBRIDE' in cols else _vide(index, 4)
+    b_f, b_h = _communs(top_b, top_f), _communs(top_b, top_h)
+    unanime = (_taille(top_h) > 0) & _egaux(top_b, top_f) & _egaux(top_f, top_h)
+    return _table(index, (_partants(index) >= 5) & ~sans_borda, {
+        'concordance': b_f + b_h, 'unanime': unanime,
+        'top4_borda': _en_sets(top_b), 'top4_f': _en_sets(top_f), 'top4_h': _en_sets(top_h),
+    }, get_pastille or get_pastille_borda4)
+
+
+def confiance_par_course(table):
+    """{ID_C: (concordance, unanime, pastille, pastille_label)} en types Python."""
+    return dict(zip(table.index, zip(
+        table['concordance'].tolist(), table['unanime'].tolist(),
+        table['pastille'].tolist(), table['pastille_label'].tolist()
+    )))
+
+
+def courses_retenues(table, courses, pastilles_actives):
+    """Courses dont la pastille est dans pastilles_actives (toutes si filtre vide)."""
+    if not pastilles_actives:
+        return list(courses)
+    retenue = table['pastille_label'].isin(pastilles_actives)
+    return [c for c in courses if retenue.get(c, False)]
+
+
 # =====================================================
 # UTILITAIRES
 # =====================================================
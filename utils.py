@@ -1,16 +1,22 @@
-import sqlite3
 import re
 import pandas as pd
 import streamlit as st
 import json
 
-DB_PATH = "turf_analytics.db"
+from db import (
+    DB_PATH, get_conn, connexion, lecture, ecriture,
+    assurer_version, migrer_selections, run_query as _run_query, TABLE_DOUBLONS
+)
 
-def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+# API des pages : fonctions d'ici et accès SQLite re-exportés depuis db
+__all__ = [
+    'DB_PATH', 'get_conn', 'connexion', 'lecture', 'ecriture', 'assurer_version',
+    'migrer_selections', 'TABLE_DOUBLONS',
+    'init_db', 'clean_text', 'get_course_label', 'clean_float', 'run_query',
+]
 
 def init_db():
-    with get_conn() as conn:
+    with ecriture() as conn:
         cursor = conn.cursor()
         # On ajoute json_data pour stocker "tout" l'import
         cursor.execute("""CREATE TABLE IF NOT EXISTS selections (
@@ -24,7 +30,9 @@ def init_db():
             musique TEXT, 
             corde TEXT, 
             ferreur TEXT,
-            json_data TEXT)""") # <--- NOUVEAU
+            json_data TEXT,
+            classement INTEGER,
+            course_norm TEXT)""") # <--- NOUVEAU
         
         cursor.execute("""CREATE TABLE IF NOT EXISTS paris (
             id INTEGER PRIMARY KEY AUTOINCREMENT, 
@@ -40,7 +48,15 @@ def init_db():
             gain_net REAL,
             type_pari TEXT DEFAULT 'Simple Gagnant',
             mode_pari TEXT DEFAULT '-')""")
-        conn.commit()
+
+        # Feature store typé (rempli à l'import, lu par l'Algo Builder)
+        from feature_store import assurer_schema
+        assurer_schema(conn)
+        assurer_version(conn)
+        doublons = migrer_selections(conn)['doublons']
+    if doublons:
+        st.warning(f"⚠️ {doublons} doublons dans selections : index unique non posé, imports bloqués. "
+                   "Import / Export → « Nettoyer les doublons » pour les supprimer.")
 
 def clean_text(text):
     return str(text).strip().upper() if text and not pd.isna(text) else ""
@@ -63,22 +79,4 @@ def clean_float(value):
     except: return 1.0
 
 def run_query(query, params=(), commit=False):
-    conn = get_conn()
-    cursor = conn.cursor()
-    result = None
-    try:
-        cursor.execute(query, params)
-        if commit:
-            conn.commit()
-        else:
-            data = cursor.fetchall()
-            if cursor.description:
-                cols = [column[0] for column in cursor.description]
-                result = pd.DataFrame(data, columns=cols)
-    except Exception as e:
-        if "duplicate column name" not in str(e):
-            st.error(f"Erreur SQL : {e}")
-    finally:
-        cursor.close()
-        conn.close()
-    return result
\ No newline at end of file
+    return _run_query(query, params, commit, on_error=st.error)
\ No newline at end of file